@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+# Python Library Imports
+import csv
+import json
+
+# Other Imports
+from django.db.models import Q
+
+from finances.models import Deposit, Withdrawal, Statutory, Transfer
+
+# Defined Functions:
+# ledger_rows - Yields the deposits, withdrawals, statutory entries and transfers of a user
+# csv_lines - Formats the ledger rows as CSV (with a header)
+# ndjson_lines - Formats the ledger rows as newline delimited JSON objects
+# EXPORT_FORMATS - Format name to (formatter, content type)
+
+EXPORT_COLUMNS = ('type', 'id', 'date', 'account', 'account_to', 'budget_group', 'category', 'location',
+                  'description', 'amount', 'group')
+# Rows fetched from the database at a time (and lines per chunk of the formatted output)
+CHUNK_SIZE = 2000
+
+
+def ledger_rows(user, start_date=None, end_date=None, account_id=None, budget_group=None, chunk_size=CHUNK_SIZE):
+    """ Yields the ledger of the user as tuples in EXPORT_COLUMNS order, one entry type at a time (ordered by date).
+
+    start_date (inclusive) and end_date (exclusive) limit the dates. account_id limits the entries to the ones of
+    the account (either side for transfers), so the statutory entries are skipped. budget_group limits the entries
+    to the withdrawals and transfers of the group.
+
+    The entries are read chunk_size rows at a time, so memory does not grow with the size of the ledger.
+    """
+    sources = [
+        ('deposit', Deposit.objects.filter(account__user=user), 'account',
+         ('id', 'date', 'account__name', None, None, 'category', 'location', 'description', 'amount', 'group')),
+        ('withdrawal', Withdrawal.objects.filter(account__user=user), 'account',
+         ('id', 'date', 'account__name', None, 'budget_group', 'category', 'location', 'description', 'amount',
+          'group')),
+        ('statutory', Statutory.objects.filter(user=user), None,
+         ('id', 'date', None, None, None, 'category', 'location', 'description', 'amount', None)),
+        ('transfer', Transfer.objects.filter(account_from__user=user), 'transfer',
+         ('id', 'date', 'account_from__name', 'account_to__name', 'budget_group', 'category', 'location',
+          'description', 'amount', 'group')),
+    ]
+
+    for entry_type, queryset, account_field, fields in sources:
+        if account_id is not None:
+            if account_field is None:
+                continue
+            if account_field == 'transfer':
+                queryset = queryset.filter(Q(account_from_id=account_id) | Q(account_to_id=account_id))
+            else:
+                queryset = queryset.filter(account_id=account_id)
+        if budget_group is not None:
+            if 'budget_group' not in fields:
+                continue
+            queryset = queryset.filter(budget_group=budget_group)
+        if start_date is not None:
+            queryset = queryset.filter(date__gte=start_date)
+        if end_date is not None:
+            queryset = queryset.filter(date__lt=end_date)
+
+        selected = [field for field in fields if field is not None]
+        for values in queryset.order_by('date', 'pk').values_list(*selected).iterator(chunk_size=chunk_size):
+            values = iter(values)
+            yield (entry_type,) + tuple(next(values) if field is not None else None for field in fields)
+
+
+class _Echo:
+    """ File-like object whose write returns the written value (so csv.writer formats a single line)."""
+
+    def write(self, value):
+        return value
+
+
+def _chunked(lines, chunk_size):
+    """ Joins the lines into chunks of chunk_size lines."""
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= chunk_size:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def csv_lines(rows, chunk_size=CHUNK_SIZE):
+    """ Yields the rows as CSV text (header first) in chunks of chunk_size lines."""
+    writer = csv.writer(_Echo())
+
+    def lines():
+        yield writer.writerow(EXPORT_COLUMNS)
+        for row in rows:
+            yield writer.writerow(row)
+
+    return _chunked(lines(), chunk_size)
+
+
+def ndjson_lines(rows, chunk_size=CHUNK_SIZE):
+    """ Yields the rows as newline delimited JSON objects in chunks of chunk_size lines."""
+    lines = (json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=str) + '\n' for row in rows)
+
+    return _chunked(lines, chunk_size)
+
+
+EXPORT_FORMATS = {
+    'csv': (csv_lines, 'text/csv'),
+    'ndjson': (ndjson_lines, 'application/x-ndjson'),
+}
@@ -6,7 +6,8 @@ from django.forms import modelformset_factory
 from datetime import datetime
 
 from finances.models import User, Withdrawal, Transfer, Deposit, Statutory, DebtAccount, TradingAccount, RetirementAccount, \
-    MonthlyBudget, CheckingAccount, BUDGET_GROUP_MANDATORY, BUDGET_GROUP_MORTGAGE, BUDGET_GROUP_DGR, BUDGET_GROUP_DISC
+    MonthlyBudget, CheckingAccount, TransactionFacet, BUDGET_GROUP_MANDATORY, BUDGET_GROUP_MORTGAGE, BUDGET_GROUP_DGR, \
+    BUDGET_GROUP_DISC
 
 FORM_BUDGET_GROUP_CHOICES = (
     (None, None),
@@ -135,6 +136,8 @@ class UserExpenseLookupForm(forms.Form):
     category = forms.CharField(label='Category', required=False)
     description = forms.CharField(label='Description', required=False)
     where_bought = forms.CharField(label='Location', required=False)
+    search = forms.CharField(label='Search', required=False,
+                             help_text='Words of the description, location or category (partial words match).')
 
     def __init__(self, *args, **kwargs):
         user = kwargs.pop('user')
@@ -148,24 +151,18 @@ class UserExpenseLookupForm(forms.Form):
             year_choices.append((year, year))
         self.fields['start_year'] = forms.ChoiceField(choices=year_choices, required=False)
         self.fields['end_year'] = forms.ChoiceField(choices=year_choices, required=False)
-        user_accounts = user.return_all_accounts()
-        user_withdrawals = Withdrawal.objects.filter(account__in=user_accounts)
-        # Fill in choices for category
+        # Fill in choices for category, description and location (most recently used first)
+        facets = TransactionFacet.return_values(user, TransactionFacet.KIND_WITHDRAWAL)
         category_choices = [(None, None)]
-        user_categories = list(user_withdrawals.values_list('category', flat=True).distinct())
-        for cat in user_categories:
+        for cat in facets['category']:
             category_choices.append((cat, cat))
         self.fields['category'] = forms.ChoiceField(choices=category_choices, required=False)
-        # Fill in choices for description
         description_choices = [(None, None)]
-        user_description = list(user_withdrawals.values_list('description', flat=True).distinct())
-        for desc in user_description:
+        for desc in facets['description']:
             description_choices.append((desc, desc))
         self.fields['description'] = forms.ChoiceField(choices=description_choices, required=False)
-        # Fill in choices for location
         location_choices = [(None, None)]
-        location = list(user_withdrawals.values_list('location', flat=True).distinct())
-        for loc in location:
+        for loc in facets['location']:
             location_choices.append((loc, loc))
         self.fields['where_bought'] = forms.ChoiceField(choices=location_choices, required=False)
 
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+# Python Library Imports
+from datetime import date
+from typing import NamedTuple
+
+# Other Imports
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+from django.utils.text import slugify
+
+from finances.models import Deposit, Withdrawal, UserMonthlyRollup, TransactionFacet, first_of_month, to_ledger_date
+
+# Defined Functions:
+# LedgerImportRow - Deposit or withdrawal parsed from an import file
+# ImportResult - Numbers of entries created, updated and skipped by an import
+# import_ledger_rows - Upserts the rows of an account one at a time (update_or_create)
+# bulk_import_ledger_rows - Upserts the rows of an account in bulk, in one transaction
+
+
+class LedgerImportRow(NamedTuple):
+    """ Deposit or withdrawal (model) parsed from an import file.
+
+    (date, description, amount) identify the entry within the account (as the unique_together of the ledger models)
+    and fields holds the others (e.g., category), which are updated on existing entries.
+    """
+    model: type
+    date: date
+    description: str
+    amount: float
+    fields: dict
+
+
+class ImportResult(NamedTuple):
+    """ Numbers of entries created, updated and skipped (unchanged or repeated in the file) by an import."""
+    created: int
+    updated: int
+    skipped: int
+
+
+def import_ledger_rows(account, rows):
+    """ Upserts the rows into the account with one update_or_create per row, in one transaction.
+
+    Every existing entry is saved again, so none is skipped.
+    """
+    created = updated = 0
+    with transaction.atomic():
+        for row in rows:
+            _, row_created = row.model.objects.update_or_create(account=account, date=row.date,
+                                                                description=row.description, amount=row.amount,
+                                                                defaults=row.fields)
+            created += row_created
+            updated += not row_created
+
+    return ImportResult(created, updated, 0)
+
+
+def bulk_import_ledger_rows(account, rows, batch_size=1000):
+    """ Upserts the rows into the account in bulk, in one transaction.
+
+    The rows are diffed against the account's entries over their date range with one query per ledger model. New
+    entries are inserted with bulk_create, changed ones are updated with bulk_update and the rest are skipped. An entry
+    inserted concurrently with one of the new ones raises an IntegrityError, which rolls the whole import back.
+
+    The bulk operations bypass the save functions of the entries, so the account's monthly balances, the user's
+    monthly rollups over the range and the user's transaction facets are rebuilt afterwards (the rollups and facets
+    only if the user has them), which bumps the ledger and report versions.
+    """
+    rows_by_key = dict()
+    skipped = 0
+    for row in rows:
+        key = (row.model, to_ledger_date(row.date), row.description, float(row.amount))
+        skipped += key in rows_by_key
+        rows_by_key[key] = row
+    if not rows_by_key:
+        return ImportResult(0, 0, skipped)
+
+    start_date = min(key[1] for key in rows_by_key)
+    end_date = max(key[1] for key in rows_by_key)
+    created = updated = 0
+    with transaction.atomic():
+        for model in (Withdrawal, Deposit):
+            model_rows = {key[1:]: row for key, row in rows_by_key.items() if key[0] is model}
+            if not model_rows:
+                continue
+            fields = sorted({field for row in model_rows.values() for field in row.fields})
+
+            changed = list()
+            existing = model.objects.filter(account=account, date__gte=start_date, date__lte=end_date)
+            for entry in existing.only('date', 'description', 'amount', *fields):
+                row = model_rows.pop((entry.date, entry.description, entry.amount), None)
+                if row is None:
+                    continue
+                if all(getattr(entry, field) == value for field, value in row.fields.items()):
+                    skipped += 1
+                    continue
+                for field, value in row.fields.items():
+                    setattr(entry, field, value)
+                changed.append(entry)
+
+            new = [model(account=account, date=entry_date, description=description, amount=amount,
+                         slug_field=slugify(description), **row.fields)
+                   for (entry_date, description, amount), row in model_rows.items()]
+            model.objects.bulk_create(new, batch_size=batch_size)
+            if changed:
+                model.objects.bulk_update(changed, fields, batch_size=batch_size)
+            created += len(new)
+            updated += len(changed)
+
+        if created or updated:
+            account.rebuild_monthly_balances()
+            if UserMonthlyRollup.objects.filter(user_id=account.user_id).exists():
+                UserMonthlyRollup.rebuild(user_ids=[account.user_id], start_month=first_of_month(start_date),
+                                          end_month=first_of_month(end_date) + relativedelta(months=+1))
+            if TransactionFacet.objects.filter(user_id=account.user_id).exists():
+                TransactionFacet.rebuild(user_ids=[account.user_id])
+
+    return ImportResult(created, updated, skipped)
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+
+# Python Library Imports
+
+# Other Imports
+from django.core.management.base import BaseCommand
+
+from finances.models import User, UserMonthlyRollup
+
+# Defined Functions:
+# backfill_monthly_rollups - Recreates the user monthly rollups from the ledger in bulk
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the monthly rollups (income, statutory, spending by budget group, transfers) for all users ' \
+           '(or a single user)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=str, help='User name (case-sensitive). Defaults to all users.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of rollups per insert.')
+
+    def handle(self, *args, **kwargs):
+        user_ids = None
+
+        if kwargs['user']:
+            try:
+                user = User.objects.get(name=kwargs['user'])
+            except User.DoesNotExist:
+                print(f"User {kwargs['user']} does not exist. Here are the valid options: ")
+                for user in User.objects.all():
+                    print(user.name)
+                return
+            user_ids = [user.pk]
+
+        number_of_rollups = UserMonthlyRollup.rebuild(user_ids=user_ids, batch_size=kwargs['batch_size'])
+        User.bump_report_version(*(user_ids or User.objects.values_list('pk', flat=True)))
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {number_of_rollups} monthly rollups.'))
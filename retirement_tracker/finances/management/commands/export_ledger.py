@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+# Python Library Imports
+from pathlib import Path
+
+# Other Imports
+from django.core.management.base import BaseCommand, CommandError
+from django.core.exceptions import ValidationError
+from django.db import models
+
+from finances.models import User, Account, BUDGET_GROUP_CHOICES
+from finances.exports import ledger_rows, EXPORT_FORMATS
+
+# Defined Functions:
+# export_ledger - Writes the deposits, withdrawals, statutory entries and transfers of a user as CSV or NDJSON
+
+
+class Command(BaseCommand):
+    help = 'Exports the ledger (deposits, withdrawals, statutory entries and transfers) of a user as CSV or NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('user', type=str, help='User name (case-sensitive).')
+        parser.add_argument('--format', type=str, default='csv', choices=sorted(EXPORT_FORMATS.keys()),
+                            help='Output format. Defaults to csv.')
+        parser.add_argument('--output', type=Path, help='Output file. Defaults to stdout.')
+        parser.add_argument('--start', type=str, help='Earliest date (YYYY-MM-DD, inclusive).')
+        parser.add_argument('--end', type=str, help='Latest date (YYYY-MM-DD, exclusive).')
+        parser.add_argument('--account', type=str, help='Account name (case-sensitive).')
+        parser.add_argument('--budget_group', type=str, choices=[choice[0] for choice in BUDGET_GROUP_CHOICES],
+                            help='Only the withdrawals and transfers of the budget group.')
+
+    def handle(self, *args, **kwargs):
+        try:
+            user = User.objects.get(name=kwargs['user'])
+        except User.DoesNotExist:
+            print(f"User {kwargs['user']} does not exist. Here are the valid options: ")
+            for user in User.objects.all():
+                print(user.name)
+            return
+
+        try:
+            start_date = models.DateField().to_python(kwargs['start'])
+            end_date = models.DateField().to_python(kwargs['end'])
+        except ValidationError as error:
+            raise CommandError(f'Invalid date: {error}')
+
+        account_id = None
+        if kwargs['account']:
+            account_id = Account.objects.filter(user=user, name=kwargs['account']).values_list('pk', flat=True).first()
+            if account_id is None:
+                raise CommandError(f"Account {kwargs['account']} does not exist for {user.name}")
+
+        formatter, content_type = EXPORT_FORMATS[kwargs['format']]
+        chunks = formatter(ledger_rows(user, start_date, end_date, account_id, kwargs['budget_group']))
+
+        if kwargs['output'] is None:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+
+        with open(kwargs['output'], 'w', encoding='utf-8', newline='') as fileobj:
+            for chunk in chunks:
+                fileobj.write(chunk)
+
+        self.stderr.write(self.style.SUCCESS(f"Exported the ledger of {user.name} to {kwargs['output']}"))
@@ -6,6 +6,7 @@ from datetime import datetime
 import csv
 
 from finances.models import User, RetirementAccount, Deposit, Withdrawal, BUDGET_GROUP_DGR
+from finances.imports import LedgerImportRow, import_ledger_rows, bulk_import_ledger_rows
 
 # Other Imports
 from django.core.management.base import BaseCommand
@@ -25,6 +26,9 @@ class Command(BaseCommand):
         parser.add_argument('--lookup_transaction', type=str, default='Description',
                             help='Header item containing withdrawal or deposit items.')
         parser.add_argument('--lookup_amount', type=str, help='Header text for the amount', default='Amount')
+        parser.add_argument('--bulk', action='store_true',
+                            help='Diff the whole file against the account and apply it with bulk inserts/updates in '
+                                 'one transaction (faster for long histories).')
 
 
     def handle(self, *args, **kwargs):
@@ -67,6 +71,7 @@ class Command(BaseCommand):
                     f"ERROR: lookup for amount ({kwargs['lookup_amount']}) does not exist in data. Cannot continue.")
                 return
 
+            rows = list()
             for row in dr:
                 date = row[kwargs['lookup_date']]
                 date_dt = datetime.strptime(date, kwargs['lookup_date_format'])
@@ -84,32 +89,28 @@ class Command(BaseCommand):
                 transaction = row[kwargs['lookup_transaction']]
 
                 if amount < 0.0:
-                    withdrawal, created = Withdrawal.objects.update_or_create(
-                        account=account,
-                        date=date_dt,
-                        description=transaction,
-                        amount=amount_input,
-                        defaults={'budget_group': BUDGET_GROUP_DGR,
-                                  'category': 'Retirement',
-                                  'location': 'Work'}
-                    )
-                    withdrawal.save()
+                    rows.append(LedgerImportRow(Withdrawal, date_dt, transaction, amount_input,
+                                                {'budget_group': BUDGET_GROUP_DGR,
+                                                 'category': 'Retirement',
+                                                 'location': 'Work'}))
                     difference -= amount
                     number_of_entries += 1
 
                 if amount >= 0.0:
-                    deposit, created = Deposit.objects.update_or_create(account=account,
-                                                                        date=date_dt,
-                                                                        amount=amount_input,
-                                                                        description=transaction,
-                                                                        defaults={'category': 'Retirement',
-                                                                                  'location': 'Work'}
-                                                                        )
-                    deposit.save()
+                    rows.append(LedgerImportRow(Deposit, date_dt, transaction, amount_input,
+                                                {'category': 'Retirement',
+                                                 'location': 'Work'}))
                     difference += amount
                     number_of_entries += 1
+
+        if kwargs['bulk']:
+            result = bulk_import_ledger_rows(account, rows)
+        else:
+            result = import_ledger_rows(account, rows)
         self.stdout.write(self.style.SUCCESS(
             f'Min date: {min_date}. Max date: {max_date}'))
         self.stdout.write(self.style.SUCCESS(
             f'Processed {number_of_entries} entries for {account.name}. Difference between deposits and withdrawals: {difference}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {result.created}, updated {result.updated} and skipped {result.skipped} entries.'))
 
@@ -11,6 +11,7 @@ import json
 import csv
 
 from finances.models import User, RetirementAccount, Deposit, Withdrawal, BUDGET_GROUP_DGR
+from finances.imports import LedgerImportRow, import_ledger_rows, bulk_import_ledger_rows
 
 # Other Imports
 from django.core.management.base import BaseCommand, CommandError
@@ -36,6 +37,9 @@ class Command(BaseCommand):
         parser.add_argument('--lookup_amount', type=str, help='Header text for the amount', default='Dollar Amount')
         parser.add_argument('--deposit_description', type=str,
                             help='This text will be used as the input for a deposit.')
+        parser.add_argument('--bulk', action='store_true',
+                            help='Diff the whole file against the account and apply it with bulk inserts/updates in '
+                                 'one transaction (faster for long histories).')
 
     def handle(self, *args, **kwargs):
         user_input = kwargs['user']
@@ -77,6 +81,7 @@ class Command(BaseCommand):
                     f"ERROR: lookup for amount ({kwargs['lookup_amount']}) does not exist in data. Cannot continue.")
                 return
 
+            rows = list()
             for row in dr:
                 date = row[kwargs['lookup_date']]
                 date_dt = datetime.strptime(date, kwargs['lookup_date_format'])
@@ -91,18 +96,10 @@ class Command(BaseCommand):
                 amount = float(row[kwargs['lookup_amount']])
                 transaction = row[kwargs['lookup_transaction']]
                 if transaction == kwargs['lookup_withdrawal']:
-                    withdrawal, created = Withdrawal.objects.update_or_create(
-                        account=account,
-                        date=date_dt,
-                        description=transaction,
-                        amount=amount,
-                        defaults={'budget_group': BUDGET_GROUP_DGR,
-                                  'category': 'Retirement',
-                                  'location': 'Work'}
-                    )
-                    if created:
-                        print(f'Created withdrawal {withdrawal}')
-                    withdrawal.save()
+                    rows.append(LedgerImportRow(Withdrawal, date_dt, transaction, amount,
+                                                {'budget_group': BUDGET_GROUP_DGR,
+                                                 'category': 'Retirement',
+                                                 'location': 'Work'}))
                     difference -= amount
                     number_of_entries += 1
 
@@ -111,19 +108,19 @@ class Command(BaseCommand):
                         dep_description = kwargs['deposit_description']
                     else:
                         dep_description = transaction
-                    deposit, created = Deposit.objects.update_or_create(account=account,
-                                                                        date=date_dt,
-                                                                        amount=amount,
-                                                                        description=dep_description,
-                                                                        defaults={'category': 'Retirement',
-                                                                                  'location': 'Work'}
-                                                                        )
-                    if created:
-                        print(f'Created deposit: {deposit}')
-                    deposit.save()
+                    rows.append(LedgerImportRow(Deposit, date_dt, dep_description, amount,
+                                                {'category': 'Retirement',
+                                                 'location': 'Work'}))
                     difference += amount
                     number_of_entries += 1
+
+        if kwargs['bulk']:
+            result = bulk_import_ledger_rows(account, rows)
+        else:
+            result = import_ledger_rows(account, rows)
         self.stdout.write(self.style.SUCCESS(
             f'Min date: {min_date}. Max date: {max_date}'))
         self.stdout.write(self.style.SUCCESS(
             f'Processed {number_of_entries} entries for {account.name}. Difference between deposits and withdrawals: {difference}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {result.created}, updated {result.updated} and skipped {result.skipped} entries.'))
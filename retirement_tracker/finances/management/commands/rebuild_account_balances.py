@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+
+# Python Library Imports
+
+# Other Imports
+from django.core.management.base import BaseCommand
+
+from finances.models import User, Account
+
+# Defined Functions:
+# rebuild_account_balances - Recreates the monthly balance snapshots from the deposits and withdrawals
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the monthly balance snapshots for all accounts (or the accounts of a single user)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=str, help='User name (case-sensitive). Defaults to all users.')
+        parser.add_argument('--account', type=str, help='Account name (case-sensitive). Requires --user.')
+
+    def handle(self, *args, **kwargs):
+        accounts = Account.objects.all()
+
+        if kwargs['user']:
+            try:
+                user = User.objects.get(name=kwargs['user'])
+            except User.DoesNotExist:
+                print(f"User {kwargs['user']} does not exist. Here are the valid options: ")
+                for user in User.objects.all():
+                    print(user.name)
+                return
+            accounts = accounts.filter(user=user)
+            if kwargs['account']:
+                accounts = accounts.filter(name=kwargs['account'])
+
+        number_of_snapshots = 0
+        for account in accounts:
+            number_of_snapshots += account.rebuild_monthly_balances()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {number_of_snapshots} monthly balances for {accounts.count()} accounts.'))
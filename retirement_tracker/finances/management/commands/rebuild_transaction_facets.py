@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+
+# Python Library Imports
+
+# Other Imports
+from django.core.management.base import BaseCommand
+
+from finances.models import User, TransactionFacet
+
+# Defined Functions:
+# rebuild_transaction_facets - Recreates the category/description/location/group facets from the ledger in bulk
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the transaction facets (distinct categories, descriptions, locations and groups of the ' \
+           'withdrawals and deposits) for all users (or a single user)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=str, help='User name (case-sensitive). Defaults to all users.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of facets per insert.')
+
+    def handle(self, *args, **kwargs):
+        user_ids = None
+
+        if kwargs['user']:
+            try:
+                user = User.objects.get(name=kwargs['user'])
+            except User.DoesNotExist:
+                print(f"User {kwargs['user']} does not exist. Here are the valid options: ")
+                for user in User.objects.all():
+                    print(user.name)
+                return
+            user_ids = [user.pk]
+
+        number_of_facets = TransactionFacet.rebuild(user_ids=user_ids, batch_size=kwargs['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {number_of_facets} transaction facets.'))
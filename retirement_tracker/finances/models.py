@@ -1,6 +1,6 @@
-from django.db import models
-from django.db.models import Sum, Max, F, Window
-from django.db.models.functions import TruncDay
+from django.db import models, transaction, connection
+from django.db.models import Sum, Min, Max, Avg, F, Q, Window, Case, When, Value
+from django.db.models.functions import TruncDay, TruncMonth, Greatest
 from django.utils import timezone
 from django.utils.timezone import now, get_current_timezone
 from django.utils.text import slugify
@@ -11,6 +11,11 @@ import scipy.interpolate
 from datetime import date
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
+from typing import NamedTuple
+
+from finances.utils.monte_carlo import simulate_retirement
+from finances.utils.projection_cache import LRUCache
+from finances.utils.prefix_index import PrefixIndex
 
 BUDGET_GROUP_CHOICES = (
     ('Mandatory', 'Mandatory'),
@@ -23,6 +28,11 @@ BUDGET_GROUP_MORTGAGE = BUDGET_GROUP_CHOICES[1][0]
 BUDGET_GROUP_DGR = BUDGET_GROUP_CHOICES[2][0]
 BUDGET_GROUP_DISC = BUDGET_GROUP_CHOICES[3][0]
 
+# Fitted projection functions of the accounts, keyed on (account, fit parameters, ledger version, today)
+PROJECTION_CACHE = LRUCache(maxsize=256)
+# Prefix indexes of the transaction facets, keyed on the user's report_version (see TransactionFacet.return_prefix_index)
+AUTOCOMPLETE_CACHE = LRUCache(maxsize=256)
+
 
 def dt_to_milliseconds_after_epoch(dt):
     """ Converts a given datetime to milliseconds after epoch.
@@ -36,6 +46,67 @@ def dt_to_milliseconds_after_epoch(dt):
     return tdelta.total_seconds() * 1000
 
 
+def datetime64_to_milliseconds_after_epoch(dates):
+    """ Vectorized form of dt_to_milliseconds_after_epoch for an array of naive numpy datetime64 values.
+
+    dt_to_milliseconds_after_epoch shifts naive datetimes by a fixed time zone offset, so the offset is
+    calculated once and applied to the whole array.
+    """
+    offset = dt_to_milliseconds_after_epoch(datetime(1970, 1, 1))
+    dates_ms = dates.astype('datetime64[ms]').astype(np.int64).astype(np.float64)
+    return dates_ms + offset
+
+
+def dts_to_milliseconds_after_epoch(dts):
+    """ Vectorized form of dt_to_milliseconds_after_epoch for a sequence of dates/datetimes."""
+    naive_dts = [dt.replace(tzinfo=None) if isinstance(dt, datetime) else dt for dt in dts]
+    return datetime64_to_milliseconds_after_epoch(np.array(naive_dts, dtype='datetime64[ms]'))
+
+
+def to_ledger_date(value):
+    """ Converts a date, datetime or string into the date used by the ledger date fields.
+
+    Mirrors the conversion done by DateField lookups (aware datetimes are localized first)
+    so that comparisons against the monthly snapshots match the comparisons done in the database.
+    """
+    return models.DateField().to_python(value)
+
+
+def first_of_month(value):
+    """ Returns the first day of the month for the given date/datetime."""
+    ledger_date = to_ledger_date(value)
+    return ledger_date.replace(day=1)
+
+
+class NetWorth(NamedTuple):
+    """ Account type totals and net worth (checking + retirement + trading - debt) at a point in time."""
+    checking: float
+    retirement: float
+    trading: float
+    debt: float
+    net_worth: float
+
+    @classmethod
+    def from_totals(cls, checking, retirement, trading, debt):
+        """ Returns a list of NetWorth (rounded to cents) from arrays of the account type totals at each date."""
+        net_worths = checking + retirement + trading - debt
+        return [cls(round(float(tot_checking), 2), round(float(tot_retirement), 2), round(float(tot_trading), 2),
+                    round(float(tot_debt), 2), round(float(net_worth), 2))
+                for tot_checking, tot_retirement, tot_trading, tot_debt, net_worth
+                in zip(checking, retirement, trading, debt, net_worths)]
+
+
+class SpendingBreakdown(NamedTuple):
+    """ Top expenses of a dimension (e.g., category): top holds {dimension: value, 'sum': total} dicts, largest first,
+    and other the total of the remaining values."""
+    top: list
+    other: float
+
+
+# Dimensions of User.return_spending_breakdown
+SPENDING_DIMENSIONS = ('category', 'description', 'location')
+
+
 class User(models.Model):
     """ User class for the retirement tracker.
 
@@ -54,6 +125,7 @@ class User(models.Model):
     Functions:
     return_retirement_timestamp
     estimate_retirement_finances
+    estimate_retirement_monte_carlo
     estimate_budget_for_month_year
     get_total_for_month_year
     get_cumulative_incomes_expenses
@@ -70,6 +142,10 @@ class User(models.Model):
     retirement_age = models.DecimalField(verbose_name='Retirement Age', decimal_places=2, max_digits=4, default=65.0)
     percent_withdrawal_at_retirement = models.DecimalField(verbose_name='Percent withdrawal at retirement',
                                                            decimal_places=2, default=4.0, max_digits=5)
+    # Incremented whenever the user's accounts, ledger or budgets change (invalidates the cached reports)
+    report_version = models.PositiveIntegerField(default=0, editable=False)
+    # When report_version was last incremented (the Last-Modified of the user's plot payloads)
+    report_updated = models.DateTimeField(default=timezone.now, editable=False)
 
     # TODO: Determine way to generate input files for sankey diagram and add button to open sankey page with the
     #  inputs. Or through monthly budget portions and expenses.
@@ -88,51 +164,24 @@ class User(models.Model):
                 where account balance is the checking + retirement + trading - debts
         """
 
-        tot_checking_start = 0.0
-        tot_checking_end = 0.0
-        tot_checking_diff = 0.0
-        tot_retirement_start = 0.0
-        tot_retirement_end = 0.0
-        tot_retirement_diff = 0.0
-        tot_trading_start = 0.0
-        tot_trading_end = 0.0
-        tot_trading_diff = 0.0
-        tot_debt_start = 0.0
-        tot_debt_end = 0.0
-        tot_debt_diff = 0.0
-
-        user_checking_accts = self.return_checking_accts()
-        user_ret_accts = [acct for acct in RetirementAccount.objects.filter(user=self)]
-        user_trade_accts = [acct for acct in TradingAccount.objects.filter(user=self)]
-        user_debt_accts = [acct for acct in DebtAccount.objects.filter(user=self)]
-
         if not start_dt:
             start_date, dummy_end_date = self.get_earliest_latest_dates()
-            start_dt = datetime.combine(start_date, datetime.time().min)
+            start_dt = datetime.combine(start_date, datetime.min.time())
 
         if not end_dt:
             dummy_start_date, end_date = self.get_earliest_latest_dates()
-            end_dt = datetime.combine(end_date, datetime.time().min)
-
-        for account in user_checking_accts:
-            tot_checking_start += account.return_balance_up_to_dt(start_dt)
-            tot_checking_end += account.return_balance_up_to_dt(end_dt)
-            tot_checking_diff = tot_checking_end - tot_checking_start
-
-        for account in user_ret_accts:
-            tot_retirement_start += account.return_balance_up_to_dt(start_dt)
-            tot_retirement_end += account.return_balance_up_to_dt(end_dt)
-            tot_retirement_diff = tot_retirement_end - tot_retirement_start
+            end_dt = datetime.combine(end_date, datetime.min.time())
 
-        for account in user_trade_accts:
-            tot_trading_start += account.return_balance_up_to_dt(start_dt)
-            tot_trading_end += account.return_balance_up_to_dt(end_dt)
-            tot_trading_diff = tot_trading_end - tot_trading_start
+        start, end = self.return_net_worth_at_dts([start_dt, end_dt])
 
-        for account in user_debt_accts:
-            tot_debt_start += account.return_balance_up_to_dt(start_dt)
-            tot_debt_end += account.return_balance_up_to_dt(end_dt)
-            tot_debt_diff = tot_debt_end - tot_debt_start
+        tot_checking_start, tot_checking_end = start.checking, end.checking
+        tot_checking_diff = tot_checking_end - tot_checking_start
+        tot_retirement_start, tot_retirement_end = start.retirement, end.retirement
+        tot_retirement_diff = tot_retirement_end - tot_retirement_start
+        tot_trading_start, tot_trading_end = start.trading, end.trading
+        tot_trading_diff = tot_trading_end - tot_trading_start
+        tot_debt_start, tot_debt_end = start.debt, end.debt
+        tot_debt_diff = tot_debt_end - tot_debt_start
 
         net_diff = tot_checking_diff + tot_retirement_diff + tot_trading_diff - tot_debt_diff
 
@@ -187,63 +236,95 @@ class User(models.Model):
 
         return False
 
-    def return_net_worth_month_year(self, month: str, year: int) -> (float, float, float, float):
+    def return_net_worth_month_year(self, month: str, year: int) -> NetWorth:
         """ Returns the net worth of the user at a given point in time."""
-        tot_checking = 0.0
-        tot_retirement = 0.0
-        tot_trading = 0.0
-        tot_debt = 0.0
+        datetime_inclusive = datetime.strptime(f'{year}-{month}-01', '%Y-%B-%d')
+        datetime_inclusive = datetime_inclusive + relativedelta(months=+1)
 
-        user_checking_accts = self.return_checking_accts()
-        user_ret_accts = [acct for acct in RetirementAccount.objects.filter(user=self)]
-        user_trade_accts = [acct for acct in TradingAccount.objects.filter(user=self)]
-        user_debt_accts = [acct for acct in DebtAccount.objects.filter(user=self)]
+        return self.return_net_worth_at_dts([datetime_inclusive])[0]
 
-        for account in user_checking_accts:
-            tot_checking += account.return_balance_including_month_year(month, year)
+    def return_net_worth_at_dts(self, dts) -> [NetWorth]:
+        """ Returns the account type totals and net worth before each of the given dates/datetimes.
 
-        for account in user_ret_accts:
-            tot_retirement += account.return_balance_including_month_year(month, year)
+        The balances of every account at every date come from a single UNION ALL query: one part lists the
+        accounts with their type and starting balance, the other two sum the deposits and withdrawals with
+        one conditional aggregate per date. Debt balances are floored at zero per account, the same as
+        DebtAccount.return_balance_up_to_dt.
 
-        for account in user_trade_accts:
-            tot_trading += account.return_balance_including_month_year(month, year)
+        Retirement account balances after the current month are projected with
+        RetirementAccount.return_projected_balances.
+        """
+        cutoffs = [to_ledger_date(dt) for dt in dts]
+        columns = [f'net_{i}' for i in range(len(cutoffs))]
+
+        account_kind = Case(When(checkingaccount__isnull=False, then=Value('checking')),
+                            When(retirementaccount__isnull=False, then=Value('retirement')),
+                            When(tradingaccount__isnull=False, then=Value('trading')),
+                            When(debtaccount__isnull=False, then=Value('debt')),
+                            default=Value(''), output_field=models.CharField())
+        no_kind = Value('', output_field=models.CharField())
+        zero = Value(0.0, output_field=models.FloatField())
+
+        accounts = Account.objects.filter(user=self).values('id').annotate(
+            kind=account_kind, opening=F('starting_balance'), **{column: zero for column in columns})
+        incomes = Deposit.objects.filter(account__user=self).values('account').annotate(
+            kind=no_kind, opening=zero,
+            **{column: Sum('amount', filter=Q(date__lt=cutoff)) for column, cutoff in zip(columns, cutoffs)})
+        expenses = Withdrawal.objects.filter(account__user=self).values('account').annotate(
+            kind=no_kind, opening=zero,
+            **{column: Sum('amount', filter=Q(date__lt=cutoff)) * -1 for column, cutoff in zip(columns, cutoffs)})
+
+        # Per account: [type, starting balance, net at each date]
+        balances = {}
+        for row in accounts.order_by().union(incomes.order_by(), expenses.order_by(), all=True):
+            account = balances.setdefault(row['id'], ['', 0.0, np.zeros(len(cutoffs))])
+            if row['kind']:
+                account[0] = row['kind']
+            account[1] += float(row['opening'])
+            account[2] += [float(row[column] or 0.0) for column in columns]
+
+        first_projected_date = (np.datetime64(timezone.localtime(now()).date(), 'M') + 1).astype(date)
+        future = [i for i, cutoff in enumerate(cutoffs) if cutoff >= first_projected_date]
+        retirement_accts = {}
+        if future and any(kind == 'retirement' for kind, *dummy in balances.values()):
+            retirement_accts = RetirementAccount.objects.filter(user=self).in_bulk()
+
+        totals = {kind: np.zeros(len(cutoffs)) for kind in ('checking', 'retirement', 'trading', 'debt')}
+        for account_id, (kind, starting_balance, net) in balances.items():
+            if kind == 'debt':
+                account_balances = np.maximum(np.round(starting_balance - net, 2), 0.0)
+            elif kind:
+                account_balances = np.round(starting_balance + net, 2)
+            else:
+                continue
 
-        for account in user_debt_accts:
-            tot_debt += account.return_balance_including_month_year(month, year)
+            if kind == 'retirement' and future:
+                account_balances[future] = retirement_accts[account_id].return_projected_balances(
+                    [cutoffs[i] for i in future])
 
-        net_worth = tot_checking + tot_retirement + tot_trading - tot_debt
+            totals[kind] += account_balances
 
-        return round(tot_checking, 2), round(tot_retirement, 2), round(tot_trading, 2), round(tot_debt, 2), round(
-            net_worth, 2)
+        return NetWorth.from_totals(totals['checking'], totals['retirement'], totals['trading'], totals['debt'])
 
-    def estimate_net_worth_month_year(self, month: str, year: int) -> (float, float, float, float):
+    def estimate_net_worth_month_year(self, month: str, year: int) -> NetWorth:
         """ Returns the net worth of the user at a given point in time."""
-        tot_checking = 0.0
-        tot_retirement = 0.0
-        tot_trading = 0.0
-        tot_debt = 0.0
-
-        user_checking_accts = [acct for acct in CheckingAccount.objects.filter(user=self)]
-        user_ret_accts = [acct for acct in RetirementAccount.objects.filter(user=self)]
-        user_trade_accts = [acct for acct in TradingAccount.objects.filter(user=self)]
-        user_debt_accts = [acct for acct in DebtAccount.objects.filter(user=self)]
-
-        for account in user_checking_accts:
-            tot_checking += account.estimate_balance_month_year(month, year)
-
-        for account in user_ret_accts:
-            tot_retirement += account.estimate_balance_month_year(month, year)
+        req_dt = datetime.strptime(f'{month}, 1, {year}', '%B, %d, %Y')
 
-        for account in user_trade_accts:
-            tot_trading += account.estimate_balance_month_year(month, year)
+        return self.estimate_net_worth_series([req_dt])[0]
 
-        for account in user_debt_accts:
-            tot_debt += account.estimate_balance_month_year(month, year)
+    def estimate_net_worth_series(self, dts) -> [NetWorth]:
+        """ Returns the estimated account type totals and net worth at each of the given dates/datetimes.
 
-        net_worth = tot_checking + tot_retirement + tot_trading - tot_debt
+        Each account is fit once (see Account.estimate_balances) and evaluated at all the dates.
+        """
+        totals = {}
+        for kind, account_class in (('checking', CheckingAccount), ('retirement', RetirementAccount),
+                                    ('trading', TradingAccount), ('debt', DebtAccount)):
+            totals[kind] = np.zeros(len(dts))
+            for account in account_class.objects.filter(user=self):
+                totals[kind] += account.estimate_balances(dts)
 
-        return round(tot_checking, 2), round(tot_retirement, 2), round(tot_trading, 2), \
-            round(tot_debt, 2), round(net_worth, 2)
+        return NetWorth.from_totals(totals['checking'], totals['retirement'], totals['trading'], totals['debt'])
 
     def return_statutory_including_month_year(self, month, year):
         """ Returns the total statutory for the user up to the end of the requested month and year"""
@@ -382,6 +463,33 @@ class User(models.Model):
 
         return ret_balances
 
+    def estimate_retirement_monte_carlo(self, num_paths=10000, num_years=50, seed=None, yearly_volatility_pct=15.0):
+        """ Runs a Monte Carlo simulation of the combined retirement accounts from today (see utils/monte_carlo.py).
+
+        The mean monthly return is the average monthly_interest_pct of the retirement accounts and the monthly
+        contribution is the average over the last year. Withdrawals of percent_withdrawal_at_retirement start at the
+        retirement date.
+
+        Returns the start date and the MonteCarloResult.
+        """
+        today = timezone.localtime(now()).date()
+        year_ago, current = self.return_net_worth_at_dts([today + relativedelta(years=-1), today])
+        monthly_contribution = (current.retirement - year_ago.retirement) / 12
+
+        mean_monthly_pct = RetirementAccount.objects.filter(user=self).aggregate(
+            mean=Avg('monthly_interest_pct'))['mean']
+        mean_monthly_pct = float(mean_monthly_pct) if mean_monthly_pct is not None else 0.0
+
+        until_retirement = relativedelta(self.return_retirement_datetime(), today)
+        retirement_month = max(until_retirement.years * 12 + until_retirement.months, 0)
+
+        result = simulate_retirement(current.retirement, monthly_contribution, retirement_month,
+                                     float(self.percent_withdrawal_at_retirement), mean_monthly_pct / 100,
+                                     yearly_volatility_pct / 100 / np.sqrt(12), num_years=num_years,
+                                     num_paths=num_paths, seed=seed)
+
+        return today, result
+
     def return_budget_group_balances_up_to_month_year(self, month, year):
         """ Calculates how much of each budget group is left over up to a certain month and year.
 
@@ -431,22 +539,58 @@ class User(models.Model):
         all_accounts = Account.objects.filter(user=self)
         return all_accounts
 
+    def return_spending_breakdown(self, start_dt, end_dt, dimensions=SPENDING_DIMENSIONS, num_of_entries=5):
+        """ Returns the top expenses of the checking accounts for several dimensions (e.g., category and location) in
+        a single query, as {dimension: SpendingBreakdown}. Mortgage expenses are left out.
+
+        Postgres totals every dimension in one scan with GROUPING SETS. Other databases group the expenses by all the
+        dimensions at once and the totals of each dimension are summed from those groups.
+        """
+        dimensions = tuple(dimensions)
+        expenses = Withdrawal.objects.filter(account__in=self.return_checking_accts(),
+                                             date__gte=start_dt, date__lt=end_dt)
+        expenses = expenses.exclude(budget_group=BUDGET_GROUP_MORTGAGE).order_by()
+
+        totals = {dimension: dict() for dimension in dimensions}
+        if connection.vendor == 'postgresql':
+            sql, params = expenses.values(*dimensions, 'amount').query.sql_with_params()
+            columns = ', '.join(connection.ops.quote_name(dimension) for dimension in dimensions)
+            grouping_sets = ', '.join(f'({connection.ops.quote_name(dimension)})' for dimension in dimensions)
+            # GROUPING() sets the bit of each column left out of the grouping set (the last column is the lowest bit)
+            all_bits = 2 ** len(dimensions) - 1
+            set_dimensions = {all_bits ^ (1 << (len(dimensions) - 1 - index)): index
+                              for index in range(len(dimensions))}
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT {columns}, GROUPING({columns}), SUM(amount) FROM ({sql}) expenses '
+                               f'GROUP BY GROUPING SETS ({grouping_sets})', params)
+                for row in cursor:
+                    index = set_dimensions[row[-2]]
+                    totals[dimensions[index]][row[index]] = float(row[-1])
+        else:
+            for row in expenses.values(*dimensions).annotate(total=Sum('amount')):
+                for dimension in dimensions:
+                    dimension_totals = totals[dimension]
+                    dimension_totals[row[dimension]] = dimension_totals.get(row[dimension], 0.0) + row['total']
+
+        breakdowns = dict()
+        for dimension in dimensions:
+            ranked = sorted(totals[dimension].items(), key=lambda item: (-item[1], str(item[0])))
+            breakdowns[dimension] = SpendingBreakdown(
+                top=[{dimension: value, 'sum': total} for value, total in ranked[:num_of_entries]],
+                other=round(sum(total for _, total in ranked[num_of_entries:]), 2))
+
+        return breakdowns
+
     def return_top_items_dt_to_dt(self, start_dt, end_dt, expense_filter, num_of_entries=5):
         """ Returns the top expenses from the checking accounts based on given input parameters."""
-        checking_accounts = self.return_checking_accts()
-        expenses = Withdrawal.objects.filter(account__in=checking_accounts,
-                                             date__gte=start_dt, date__lt=end_dt)
-        expenses = expenses.exclude(budget_group=BUDGET_GROUP_MORTGAGE)
-        filtered_expenses = expenses.values(expense_filter).distinct().annotate(sum=Sum('amount'))
-        filtered_expenses = filtered_expenses.order_by('-sum')[:num_of_entries]
-        return filtered_expenses
+        breakdown = self.return_spending_breakdown(start_dt, end_dt, (expense_filter,), num_of_entries)
+        return breakdown[expense_filter].top
 
     def return_top_items(self, month, year, expense_filter, num_of_entries=5):
         """ Returns the top expenses from the checking accounts based on given input parameters. """
-        checking_accounts = self.return_checking_accts()
         beg_of_month = datetime.strptime(f'{month}, 1, {year}', '%B, %d, %Y')
-        end_of_month = beg_of_month + relativedelta(months=+1, seconds=-1)
-        return self.return_top_items(beg_of_month, end_of_month, expense_filter, num_of_entries)
+        end_of_month = beg_of_month + relativedelta(months=+1)
+        return self.return_top_items_dt_to_dt(beg_of_month, end_of_month, expense_filter, num_of_entries)
 
     def return_top_category(self, month, year, num_of_entries=5):
         """ Finds the maximum expenses by category. By default, finds the top five for a given month/year"""
@@ -488,13 +632,16 @@ class User(models.Model):
         """ Returns the checking expenses for a given month/year segregated by budget group.
 
         """
-        beg_of_month = datetime.strptime(f'{month}, 1, {year}', '%B, %d, %Y')
-        end_of_month = beg_of_month + relativedelta(months=+1, seconds=-1)
+        totals = self.return_rollup_totals_month_year(month, year)
+
+        return totals['mandatory'], totals['mortgage'], totals['debts_goals_retirement'], totals['discretionary'], \
+            totals['statutory']
 
-        mand_exp, mort_exp, dgr_exp, disc_exp, stat_exp = self.return_tot_expenses_by_budget_startdt_to_enddt(
-            beg_of_month, end_of_month)
+    def return_rollup_totals_month_year(self, month, year):
+        """ Returns the UserMonthlyRollup totals (income, statutory, budget groups, transfers) of the month/year."""
+        beg_of_month = datetime.strptime(f'{month}, 1, {year}', '%B, %d, %Y').date()
 
-        return mand_exp, mort_exp, dgr_exp, disc_exp, stat_exp
+        return UserMonthlyRollup.return_totals(self.pk, beg_of_month, beg_of_month + relativedelta(months=+1))
 
     def return_tot_expenses_by_budget_startdt_to_enddt(self, start_dt, end_dt) -> (float, float, float, float, float):
         """ Returns the user expenses filtered by monthly budget types. """
@@ -528,14 +675,10 @@ class User(models.Model):
     def estimate_budget_for_month_year(self, month: str, year: int):
         """ Estimates and sets monthly budget values based on takehome pay and budget expenses."""
 
-        # Get accounts associated with the user
-        user_accounts = self.return_checking_accts()
-        statutory = self.return_statutory_month_year(month, year)
-
-        # Get the total income from base accounts for the current month/year
-        total_income = 0.0
-        for account in user_accounts:
-            total_income += account.return_income_month_year(month, year)
+        # Get the total income from the checking accounts and the statutory spending for the current month/year
+        totals = self.return_rollup_totals_month_year(month, year)
+        statutory = totals['statutory']
+        total_income = totals['income']
 
         takehome = total_income - statutory
         budget_mort = takehome * self.DEFAULT_MORTGAGE_BUDGET_PCT / 100.0
@@ -574,23 +717,12 @@ class User(models.Model):
 
     def return_takehome_pay_month_year(self, month, year):
         """ Calculates the take home pay for a given month and year."""
-        income = 0
-        stat_expenses = self.return_statutory_month_year(month, year)
-        user_accounts = self.return_checking_accts()
-        for acct in user_accounts:
-            income += acct.return_income_month_year(month, year)
+        totals = self.return_rollup_totals_month_year(month, year)
 
-        return round(income - stat_expenses, 2)
+        return round(totals['income'] - totals['statutory'], 2)
 
     def return_statutory_month_year(self, month: str, year: int):
-        start_datetime = datetime.strptime(f'{month}-1-{year}', '%B-%d-%Y')
-        end_datetime = start_datetime + relativedelta(months=+1, seconds=-1)
-
-        month_expense = Statutory.objects.filter(user=self, date__gte=start_datetime, date__lte=end_datetime)
-        month_expense = month_expense.aggregate(total=Sum('amount'))['total']
-        month_expense = month_expense if month_expense is not None else 0.0
-
-        return float(month_expense)
+        return self.return_rollup_totals_month_year(month, year)['statutory']
 
     def set_budget_month_year(self, month, year, budget_mand, budget_mort, budget_dgr, budget_disc):
         """ Set monthly budget based on user inputs."""
@@ -625,17 +757,41 @@ class User(models.Model):
         latest_rt_dt = self.date_of_birth + relativedelta(months=840)
         return latest_rt_dt
 
+    def save(self, *args, **kwargs):
+        updating = self.pk is not None
+        if updating:
+            self.report_version = F('report_version') + 1
+            self.report_updated = now()
+        with transaction.atomic():
+            super(User, self).save(*args, **kwargs)
+            if updating:
+                # The projections of the accounts depend on the user (e.g., the retirement date), so refit them
+                Account.objects.filter(user_id=self.pk).update(ledger_version=F('ledger_version') + 1)
+        if updating:
+            self.refresh_from_db(fields=['report_version'])
+
+    @staticmethod
+    def bump_report_version(*user_ids):
+        """ Increments the report version of the given users so that their cached reports are rebuilt."""
+        User.objects.filter(pk__in=user_ids).update(report_version=F('report_version') + 1, report_updated=now())
+
+    def return_report_version(self):
+        """ Returns the current report version (read from the database, so changes made by other processes are seen)."""
+        return User.objects.filter(pk=self.pk).values_list('report_version', flat=True).first()
+
     def get_absolute_url(self):
         return reverse('user_overview', args=[self.pk])
 
     def get_earliest_latest_dates(self):
-        all_user_accts = self.return_all_accounts()
-        user_expenses = Withdrawal.objects.filter(account__in=all_user_accts)
-        user_incomes = Deposit.objects.filter(account__in=all_user_accts)
-        user_earliest = min(user_expenses.earliest('date').date,
-                            user_incomes.earliest('date').date)
-        user_latest = max(user_expenses.latest('date').date,
-                          user_incomes.latest('date').date)
+        """ Returns the earliest and latest dates of the user's withdrawals and deposits (in one query)."""
+        user_expenses = Withdrawal.objects.filter(account__user=self).values('account__user').annotate(
+            earliest=Min('date'), latest=Max('date')).order_by()
+        user_incomes = Deposit.objects.filter(account__user=self).values('account__user').annotate(
+            earliest=Min('date'), latest=Max('date')).order_by()
+        dates = list(user_expenses.union(user_incomes, all=True))
+
+        user_earliest = min(row['earliest'] for row in dates)
+        user_latest = max(row['latest'] for row in dates)
 
         return user_earliest, user_latest
 
@@ -712,21 +868,9 @@ class User(models.Model):
         """
         # TODO: Account for the statutory expenses, if desired.
 
-        user_checking = CheckingAccount.objects.filter(user=self)
-        expenses = Withdrawal.objects.filter(account__in=user_checking,
-                                             date__gte=start_date, date__lt=end_date)
-        if budget_group:
-            expenses = expenses.filter(budget_group=budget_group)
-
-        summed_expenses = expenses.annotate(day=TruncDay('date')).values('day').annotate(cumsum=Sum('amount')).order_by(
-            'date')
-        total = 0.0
-        cumulative_balance = dict()
-        for summed_expense in summed_expenses:
-            total += summed_expense['cumsum']
-            cumulative_balance[summed_expense['day']] = total
+        days, cumulative = self.return_cumulative_series(start_date, end_date, 'expense', budget_group)
 
-        return cumulative_balance
+        return dict(zip(days, cumulative))
 
     def return_income_total(self, start_date, end_date):
         """ Returns the total income of all checking accounts within a date range."""
@@ -751,21 +895,9 @@ class User(models.Model):
         The start date is inclusive whereas the end_date is not.
         """
 
-        user_checking = CheckingAccount.objects.filter(user=self)
-        incomes = Deposit.objects.filter(account__in=user_checking,
-                                         date__gte=start_date, date__lt=end_date)
-
-        summed_incomes = incomes.annotate(day=TruncDay('date')).values('day').annotate(cumsum=Sum('amount')).order_by(
-            'date')
-        total = 0.0
-        cumulative_balance = dict()
-        for summed_income in summed_incomes:
-            total += summed_income['cumsum']
-            cumulative_balance[summed_income['day']] = total
-        # cumulative_balance = incomes.annotate(cumsum=Window(Sum('amount'),
-        #                                                     order_by=F('date').asc())).order_by('date', 'cumsum')
+        days, cumulative = self.return_cumulative_series(start_date, end_date, 'income')
 
-        return cumulative_balance
+        return dict(zip(days, cumulative))
 
     def return_cumulative_total(self, start_date, end_date):
         """ Returns the cumulative total (income - expenses) of all the checking accounts within a date range.
@@ -773,47 +905,51 @@ class User(models.Model):
         Start date is inclusive whereas the end_date is not.
 
         Return structure will be in the form of:
-            cumulative[datetime]['cumulative'] = cumulative_amount
+            cumulative[date]['cumulative'] = cumulative_amount
         """
         # TODO: Account for statutory
-        user_checking = CheckingAccount.objects.filter(user=self)
-        incomes = Deposit.objects.filter(account__in=user_checking,
-                                         date__gte=start_date, date__lt=end_date).order_by('date')
-        expenses = Withdrawal.objects.filter(account__in=user_checking,
-                                             date__gte=start_date, date__lt=end_date).order_by('date')
+        days, cumulative = self.return_cumulative_series(start_date, end_date, 'total')
 
-        # Put all incomes and expenses in a dictionary
-        all_income_exp = {}
-        for income in incomes:
-            if income.date not in all_income_exp:
-                all_income_exp[income.date] = dict()
-                all_income_exp[income.date]['income'] = income.amount
-            else:
-                if 'income' not in all_income_exp[income.date]:
-                    all_income_exp[income.date]['income'] = income.amount
-                else:
-                    all_income_exp[income.date]['income'] = all_income_exp[income.date]['income'] + income.amount
+        return {day: {'cumulative': total} for day, total in zip(days, cumulative)}
 
-        for expense in expenses:
-            if expense.date not in all_income_exp:
-                all_income_exp[expense.date] = dict()
-                all_income_exp[expense.date]['expense'] = expense.amount
-            else:
-                if 'expense' not in all_income_exp[expense.date]:
-                    all_income_exp[expense.date]['expense'] = expense.amount
-                else:
-                    all_income_exp[expense.date]['expense'] = all_income_exp[expense.date]['expense'] + expense.amount
+    def return_cumulative_series(self, start_date, end_date, series='total', budget_group=None):
+        """ Returns the days and the cumulative amounts of all the checking accounts within a date range as two
+        parallel lists.
 
-        # Iterate through the dictionary and add a total amount
-        total = 0.0
-        for date_key in sorted(all_income_exp.keys()):
-            if 'income' in all_income_exp[date_key]:
-                total = total + all_income_exp[date_key]['income']
-            if 'expense' in all_income_exp[date_key]:
-                total = total - all_income_exp[date_key]['expense']
-            all_income_exp[date_key]['cumulative'] = total
+        series is 'income', 'expense' or 'total' (income - expenses). Optional budget_group filters the expenses.
+        Start date is inclusive whereas the end_date is not.
 
-        return all_income_exp
+        The entries are bucketed by day and accumulated by a window function in a single query (the incomes and the
+        negated expenses of the total are merged with a UNION), so only one row per day is read back.
+        """
+        entries = []
+        if series in ('income', 'total'):
+            entries.append((Deposit.objects.all(), 1.0))
+        if series in ('expense', 'total'):
+            expenses = Withdrawal.objects.all()
+            if budget_group:
+                expenses = expenses.filter(budget_group=budget_group)
+            entries.append((expenses, 1.0 if series == 'expense' else -1.0))
+        if not entries:
+            raise ValueError(f'Unknown cumulative series {series}')
+
+        user_checking = self.return_checking_accts()
+        queries = [queryset.filter(account__in=user_checking, date__gte=start_date, date__lt=end_date).annotate(
+                       ledger_day=TruncDay('date'), signed_amount=F('amount') * sign
+                   ).values('ledger_day', 'signed_amount').order_by() for queryset, sign in entries]
+        daily = queries[0].union(*queries[1:], all=True) if len(queries) > 1 else queries[0]
+        sql, params = daily.query.sql_with_params()
+
+        days = []
+        cumulative = []
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT ledger_day, SUM(SUM(signed_amount)) OVER (ORDER BY ledger_day) '
+                           f'FROM ({sql}) daily_entries GROUP BY ledger_day ORDER BY ledger_day', params)
+            for day, total in cursor:
+                days.append(to_ledger_date(day))
+                cumulative.append(float(total))
+
+        return days, cumulative
 
     def __str__(self):
         return self.name
@@ -835,7 +971,9 @@ class Account(models.Model):
         return_balance_up_to_month_year: Returns the cumulative balance at the start of the month year
         return_balance_year: Return the balance for the requested year
         return_balance_month_year: Return balance for requested month/year
+        balance_series: Returns the balances at the start of each month/quarter/year over a date range
         estimate_balance_month_year: Performs a linear extrapolation of the balance up to the requested month/year
+        estimate_balances: Performs the extrapolation for many dates with a single fit
         return_latest_date: returns the latest database date for the account
     """
     name = models.CharField(max_length=160)
@@ -846,6 +984,11 @@ class Account(models.Model):
     opening_date = models.DateField(verbose_name='Date where starting balance starts')
     url = models.URLField(verbose_name="Account URL", blank=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Incremented whenever the account, its deposits/withdrawals or its user change (invalidates PROJECTION_CACHE)
+    ledger_version = models.PositiveIntegerField(default=0, editable=False)
+
+    # Number of months per period for balance_series
+    SERIES_FREQUENCIES = {'M': 1, 'Q': 3, 'Y': 12}
 
     def return_balance(self):
         """ Calculates the balance for all time."""
@@ -900,18 +1043,50 @@ class Account(models.Model):
 
         return float(month_expense)
 
-    def return_balance_up_to_dt(self, dt):
-        """ Returns the balance up to the time specified"""
+    def return_net_up_to_dt(self, dt):
+        """ Returns the deposits minus the withdrawals before the time specified (starting balance not included).
 
-        all_income = Deposit.objects.filter(account=self, date__lt=dt)
-        all_income = all_income.aggregate(total=Sum('amount'))['total']
-        all_income = all_income if all_income is not None else 0.0
+        Uses the latest monthly snapshot before the requested month and only totals the entries of the
+        partial month, if any.
+        """
+        cutoff = to_ledger_date(dt)
+        cutoff_month = cutoff.replace(day=1)
 
-        all_expense = Withdrawal.objects.filter(account=self, date__lt=dt)
-        all_expense = all_expense.aggregate(total=Sum('amount'))['total']
-        all_expense = all_expense if all_expense is not None else 0.0
+        # Latest snapshot before the requested month if there is one, otherwise any snapshot of the account
+        snapshot = AccountMonthlyBalance.objects.filter(account=self).annotate(
+            before=Case(When(month__lt=cutoff_month, then=Value(1)), default=Value(0),
+                        output_field=models.IntegerField())).order_by('-before', '-month').first()
 
-        return round(float(self.starting_balance) + float(all_income) - float(all_expense), 2)
+        if snapshot is None:
+            # Snapshots were never built for this account, so total everything up to the cutoff
+            return self.return_net_between_dates(None, cutoff)
+
+        net = snapshot.closing_balance if snapshot.before else 0.0
+        if cutoff == cutoff_month:
+            return net
+
+        return net + self.return_net_between_dates(cutoff_month, cutoff)
+
+    def return_net_between_dates(self, start_date, end_date):
+        """ Returns the deposits minus the withdrawals from start_date (inclusive) to end_date (exclusive).
+
+        A start_date of None totals everything before end_date.
+        """
+        incomes = Deposit.objects.filter(account=self, date__lt=end_date)
+        expenses = Withdrawal.objects.filter(account=self, date__lt=end_date)
+        if start_date is not None:
+            incomes = incomes.filter(date__gte=start_date)
+            expenses = expenses.filter(date__gte=start_date)
+
+        incomes = incomes.values('account').annotate(total=Sum('amount')).order_by()
+        expenses = expenses.values('account').annotate(total=Sum('amount') * -1).order_by()
+
+        return float(sum(row['total'] for row in incomes.union(expenses, all=True)))
+
+    def return_balance_up_to_dt(self, dt):
+        """ Returns the balance up to the time specified"""
+
+        return round(float(self.starting_balance) + self.return_net_up_to_dt(dt), 2)
 
     def return_balance_up_to_month_year(self, month: str, year: int):
         """ Returns the balance up to the start of the given month and year.
@@ -919,7 +1094,6 @@ class Account(models.Model):
         For example, a lookup of July 2020 will return the balance up to 11:59pm on June, 30, 2020 """
 
         up_to_datetime = datetime.strptime(f'{year}-{month}-01', '%Y-%B-%d')
-        up_to_datetime = up_to_datetime + relativedelta(seconds=-1)
 
         return self.return_balance_up_to_dt(up_to_datetime)
 
@@ -932,14 +1106,108 @@ class Account(models.Model):
 
         return balance
 
+    def balance_series(self, start, end, freq='M'):
+        """ Returns the balance at the start of each period from start up to (and including) end.
+
+        freq is 'M' (monthly), 'Q' (quarterly) or 'Y' (yearly). The deposits and withdrawals in the window are
+        totaled by month in a single grouped query and accumulated with numpy.
+
+        Returns:
+            dates - numpy datetime64[D] array of the first day of each period
+            balances - numpy float64 array with the balance up to 11:59pm of the day before each date
+        """
+        if freq not in self.SERIES_FREQUENCIES:
+            raise ValueError(f'Unknown frequency {freq}. Valid options: {", ".join(self.SERIES_FREQUENCIES)}')
+
+        start_month = np.datetime64(first_of_month(start), 'M')
+        end_month = np.datetime64(first_of_month(end), 'M')
+        num_of_months = int((end_month - start_month).astype(int)) + 1
+        if num_of_months <= 0:
+            return np.empty(0, dtype='datetime64[D]'), np.empty(0, dtype=np.float64)
+
+        months = np.arange(start_month, start_month + num_of_months)
+        start_date = months[0].astype('datetime64[D]').astype(date)
+        end_date = months[-1].astype('datetime64[D]').astype(date)
+
+        # Deposits and withdrawals per month in one query, withdrawals negated
+        incomes = Deposit.objects.filter(account=self, date__gte=start_date, date__lt=end_date).annotate(
+            month=TruncMonth('date')).values('month').annotate(total=Sum('amount')).order_by()
+        expenses = Withdrawal.objects.filter(account=self, date__gte=start_date, date__lt=end_date).annotate(
+            month=TruncMonth('date')).values('month').annotate(total=Sum('amount') * -1).order_by()
+        monthly_totals = list(incomes.union(expenses, all=True))
+
+        changes = np.zeros(num_of_months, dtype=np.float64)
+        if monthly_totals:
+            entry_months = np.array([np.datetime64(row['month'], 'M') for row in monthly_totals])
+            totals = np.array([float(row['total']) for row in monthly_totals], dtype=np.float64)
+            # An entry changes the balance at the start of the following month
+            np.add.at(changes, (entry_months - start_month).astype(int) + 1, totals)
+
+        net = self.return_net_up_to_dt(start_date) + np.cumsum(changes)
+        balances = self.return_balances_from_net(net)
+
+        step = self.SERIES_FREQUENCIES[freq]
+        return months[::step].astype('datetime64[D]'), balances[::step]
+
+    def return_balances_from_net(self, net):
+        """ Converts an array of cumulative deposits minus withdrawals into account balances."""
+        return np.round(float(self.starting_balance) + net, 2)
+
+    def save(self, *args, **kwargs):
+        updating = self.pk is not None
+        if updating:
+            self.ledger_version = F('ledger_version') + 1
+        super(Account, self).save(*args, **kwargs)
+        if updating:
+            self.refresh_from_db(fields=['ledger_version'])
+        User.bump_report_version(self.user_id)
+
+    def delete(self, *args, **kwargs):
+        user_id = self.user_id
+        with transaction.atomic():
+            # The deposits/withdrawals/transfers are deleted by the database cascade, so rebuild the user's rollups
+            # and transaction facets
+            deleted = super(Account, self).delete(*args, **kwargs)
+            UserMonthlyRollup.rebuild(user_ids=[user_id])
+            TransactionFacet.rebuild(user_ids=[user_id])
+            User.bump_report_version(user_id)
+        return deleted
+
+    @staticmethod
+    def bump_ledger_version(*account_ids):
+        """ Increments the ledger version of the given accounts so that their cached projections are refit.
+
+        The report versions of the account owners are bumped as well.
+        """
+        Account.objects.filter(pk__in=account_ids).update(ledger_version=F('ledger_version') + 1)
+        User.objects.filter(account__pk__in=account_ids).update(report_version=F('report_version') + 1,
+                                                                report_updated=now())
+
+    def return_projection_function(self, name, fit, *params):
+        """ Returns the fitted function from PROJECTION_CACHE, calling fit() on a miss.
+
+        The key includes the ledger version (read from the database, so changes made by other processes are seen)
+        and today's date, since the projections of some accounts depend on it.
+        """
+        if self.pk is None:
+            return fit()
+
+        ledger_version = Account.objects.filter(pk=self.pk).values_list('ledger_version', flat=True).first()
+        key = (self.pk, type(self).__name__, name, params, ledger_version, timezone.localtime(now()).date())
+
+        return PROJECTION_CACHE.get_or_compute(key, fit)
+
     def return_time_vs_value_function(self, num_of_years=0, num_of_months=6, kind='slinear', fill_value='extrapolate'):
         """ Returns a function of time vs cumulative amount for the given account.
 
+        The fitted function is cached until the account's ledger changes.
         """
+        return self.return_projection_function(
+            'time_vs_value',
+            lambda: self._fit_time_vs_value_function(num_of_years, num_of_months, kind, fill_value),
+            num_of_years, num_of_months, kind, fill_value)
 
-        dates = np.empty(0)
-        balances = np.empty(0)
-
+    def _fit_time_vs_value_function(self, num_of_years, num_of_months, kind, fill_value):
         latest_date = self.return_latest_date()
         if latest_date is None:  # Not enough data to calculate a trend, so just return a function that always returns zero
             dates = np.arange(1, 10)
@@ -948,20 +1216,14 @@ class Account(models.Model):
             return f
         first_date = latest_date + relativedelta(years=-1 * num_of_years, months=-1 * num_of_months)
 
-        current_date = first_date
-
         # Captures the balance up to the end of the month for the month selected
-        while current_date <= latest_date:
-            month_name = datetime.strptime(str(current_date.month), '%m').strftime('%B')
-            year = current_date.year
-            balance = self.return_balance_up_to_month_year(month_name, year)
-            # Avoid duplicate x values
-            if balance not in balances:
-                dtime = datetime.strptime(f'{month_name}-1-{year}', '%B-%d-%Y')
-                dt_ts = dt_to_milliseconds_after_epoch(dtime)
-                dates = np.append(dates, dt_ts)
-                balances = np.append(balances, balance)
-            current_date = current_date + relativedelta(months=+1)
+        dates, balances = self.balance_series(first_date, latest_date)
+
+        # Avoid duplicate x values (keeps the first month with a given balance)
+        _, unique_idx = np.unique(balances, return_index=True)
+        unique_idx = np.sort(unique_idx)
+        dates = datetime64_to_milliseconds_after_epoch(dates[unique_idx])
+        balances = balances[unique_idx]
 
         # Once all data is filled, calculate the balance as a function of ordinal
         f = scipy.interpolate.interp1d(balances, dates, kind=kind, fill_value=fill_value)
@@ -978,11 +1240,15 @@ class Account(models.Model):
 
             Uses the data with the scipy interpolate interp1d to return a function that
             can be called to extrapolate the balance up to a certain point in time.
-        """
 
-        dates = np.empty(0)
-        balances = np.empty(0)
+            The fitted function is cached until the account's ledger changes.
+        """
+        return self.return_projection_function(
+            'value_vs_time',
+            lambda: self._fit_value_vs_time_function(num_of_years, num_of_months, kind, fill_value, months_into_future),
+            num_of_years, num_of_months, kind, fill_value, months_into_future)
 
+    def _fit_value_vs_time_function(self, num_of_years, num_of_months, kind, fill_value, months_into_future):
         latest_date = self.return_latest_date()
         if latest_date is None:  # Not enough data to calculate a trend, so just return a function that always returns zero
             dates = np.arange(1, 10)
@@ -995,18 +1261,9 @@ class Account(models.Model):
         if months_into_future:
             latest_date += relativedelta(months=months_into_future)
 
-        current_date = first_date
-
         # Captures the balance up to the end of the month for the month selected
-        while current_date <= latest_date:
-            month_name = datetime.strptime(str(current_date.month), '%m').strftime('%B')
-            year = current_date.year
-            balance = self.return_balance_up_to_month_year(month_name, year)
-            dtime = datetime.strptime(f'{month_name}-1-{year}', '%B-%d-%Y')
-            dt_ts = dt_to_milliseconds_after_epoch(dtime)
-            dates = np.append(dates, dt_ts)
-            balances = np.append(balances, balance)
-            current_date = current_date + relativedelta(months=+1)
+        dates, balances = self.balance_series(first_date, latest_date)
+        dates = datetime64_to_milliseconds_after_epoch(dates)
 
         # Once all data is filled, calculate the balance as a function of ordinal
         f = scipy.interpolate.interp1d(dates, balances, kind=kind, fill_value=fill_value)
@@ -1028,13 +1285,19 @@ class Account(models.Model):
     def estimate_balance_dt(self, dt, num_of_years=0, num_of_months=6, kind='slinear',
                             fill_value='extrapolate'):
 
-        req_date_ts = dt_to_milliseconds_after_epoch(dt)
+        return float(self.estimate_balances([dt], num_of_years=num_of_years, num_of_months=num_of_months,
+                                            kind=kind, fill_value=fill_value)[0])
 
-        f = self.return_value_vs_time_function(num_of_years, num_of_months, kind=kind, fill_value=fill_value)
+    def estimate_balances(self, dts, num_of_years=0, num_of_months=6, kind='slinear', fill_value='extrapolate',
+                          months_into_future=None):
+        """ Estimates the balance at each of the given dates/datetimes with one fit of the balance vs time.
 
-        y = float(f(req_date_ts))
+        Returns a numpy array of balances (see return_value_vs_time_function for the fit arguments).
+        """
+        f = self.return_value_vs_time_function(num_of_years, num_of_months, kind=kind, fill_value=fill_value,
+                                               months_into_future=months_into_future)
 
-        return y
+        return np.asarray(f(dts_to_milliseconds_after_epoch(dts)), dtype=np.float64)
 
     def return_latest_date(self):
         """ Looks at all entries and determines the latest database date for the account."""
@@ -1079,6 +1342,36 @@ class Account(models.Model):
 
         return time_to_reach_dt
 
+    def rebuild_monthly_balances(self):
+        """ Deletes and recreates the monthly balance snapshots for the account from the deposits and withdrawals.
+
+        Returns the number of snapshots created.
+        """
+        monthly = {}
+        incomes = Deposit.objects.filter(account=self).annotate(month=TruncMonth('date')).values('month').annotate(
+            total=Sum('amount')).order_by('month')
+        expenses = Withdrawal.objects.filter(account=self).annotate(month=TruncMonth('date')).values(
+            'month').annotate(total=Sum('amount')).order_by('month')
+        for income in incomes:
+            monthly.setdefault(income['month'], [0.0, 0.0])[0] = float(income['total'])
+        for expense in expenses:
+            monthly.setdefault(expense['month'], [0.0, 0.0])[1] = float(expense['total'])
+
+        snapshots = []
+        closing_balance = 0.0
+        for month in sorted(monthly.keys()):
+            deposits, withdrawals = monthly[month]
+            closing_balance += deposits - withdrawals
+            snapshots.append(AccountMonthlyBalance(account=self, month=month, deposits=deposits,
+                                                   withdrawals=withdrawals, closing_balance=closing_balance))
+
+        with transaction.atomic():
+            AccountMonthlyBalance.objects.filter(account=self).delete()
+            AccountMonthlyBalance.objects.bulk_create(snapshots)
+            Account.bump_ledger_version(self.pk)
+
+        return len(snapshots)
+
     def get_absolute_url(self):
         return reverse('account_overview', args=[self.pk])
 
@@ -1090,16 +1383,93 @@ class CheckingAccount(Account):
     """ Checking account for User"""
 
 
+class AmortizationSchedule(NamedTuple):
+    """ Payoff schedule of a debt account. Period k is paid at dates[k + 1] and balances[0] is the opening balance.
+
+    dates - First day of each month (numpy datetime64[D]), starting at the opening balance
+    payments, interest, principal - Amounts of each period (one less than the dates)
+    balances - Remaining balance at each date
+    payoff_period - Number of periods (possibly fractional) to pay off the debt, or None if it is never paid off
+    """
+    dates: np.ndarray
+    payments: np.ndarray
+    interest: np.ndarray
+    principal: np.ndarray
+    balances: np.ndarray
+    payoff_period: float
+
+
 class DebtAccount(Account):
     """ Debt Account for User
 
         Similar to a trading account.
+
+        Functions:
+        return_monthly_payment - Average net payment per month over the last few months
+        amortization_schedule - Projects the payments, interest and remaining balance of each month
+        return_date_debt_paid - Date at which the debt is paid off
     """
     yearly_interest_pct = models.DecimalField(verbose_name='Yearly interest in percent',
                                               max_digits=4, decimal_places=2, default=0.0)
 
-    def return_date_debt_paid(self):
-        return self.return_time_to_reach_amount(0.0)
+    def return_monthly_payment(self, num_of_months=6):
+        """ Returns the average payments (deposits) minus charges (withdrawals) per month over the last
+        num_of_months full months."""
+        this_month = first_of_month(now())
+        net = self.return_net_between_dates(this_month + relativedelta(months=-1 * num_of_months), this_month)
+
+        return net / num_of_months
+
+    def amortization_schedule(self, num_of_months=6, max_periods=600):
+        """ Returns the AmortizationSchedule starting from the balance at the start of next month.
+
+        The monthly payment comes from return_monthly_payment(num_of_months) and interest accrues at
+        yearly_interest_pct / 12 per month. With r the monthly rate and P the payment, the balance after k months is
+
+            B[k] = B[0] * (1 + r)^k - P * ((1 + r)^k - 1) / r
+
+        and the debt is paid off after n = log(P / (P - r * B[0])) / log(1 + r) months (B[0] / P when r is 0), as
+        long as the payment covers the interest. The schedule runs up to the payoff or max_periods months.
+        """
+        first_month = np.datetime64(timezone.localtime(now()).date(), 'M') + 1
+        opening_balance = self.return_balance_up_to_dt(first_month.astype('datetime64[D]').astype(date))
+        payment = self.return_monthly_payment(num_of_months)
+        rate = float(self.yearly_interest_pct) / 100 / 12
+
+        if opening_balance <= 0.0:
+            payoff_period = 0.0
+        elif payment <= opening_balance * rate or payment <= 0.0:
+            payoff_period = None
+        elif rate == 0.0:
+            payoff_period = opening_balance / payment
+        else:
+            payoff_period = np.log(payment / (payment - rate * opening_balance)) / np.log1p(rate)
+
+        num_of_periods = max_periods if payoff_period is None else min(int(np.ceil(payoff_period)), max_periods)
+        periods = np.arange(num_of_periods + 1)
+        if rate == 0.0:
+            balances = opening_balance - payment * periods
+        else:
+            growth = (1 + rate) ** periods
+            balances = opening_balance * growth - payment * (growth - 1) / rate
+        balances = np.maximum(balances, 0.0)
+
+        interest = balances[:-1] * rate
+        principal = balances[:-1] - balances[1:]
+
+        return AmortizationSchedule((first_month + periods).astype('datetime64[D]'), np.round(principal + interest, 2),
+                                    np.round(interest, 2), np.round(principal, 2), np.round(balances, 2),
+                                    None if payoff_period is None else float(payoff_period))
+
+    def return_date_debt_paid(self, num_of_months=6):
+        """ Returns the date the debt is paid off (see amortization_schedule), or None if it is never paid off."""
+        schedule = self.amortization_schedule(num_of_months, max_periods=0)
+        if schedule.payoff_period is None:
+            return None
+
+        first_month = schedule.dates[0].astype(date)
+        return datetime.combine(first_month, datetime.min.time()) + relativedelta(
+            months=int(np.ceil(schedule.payoff_period)))
 
     def return_balance(self):
         all_income = Deposit.objects.filter(account=self).aggregate(total=Sum('amount'))['total']
@@ -1129,20 +1499,15 @@ class DebtAccount(Account):
         For example, a lookup of July 2020 will return the balance up to 11:59pm on June, 30, 2020 """
 
         up_to_datetime = datetime.strptime(f'{year}-{month}-01', '%Y-%B-%d')
-        up_to_datetime = up_to_datetime + relativedelta(seconds=-1)
 
         return self.return_balance_up_to_dt(up_to_datetime)
 
-    def return_balance_up_to_dt(self, dt):
-        all_income = Deposit.objects.filter(account=self, date__lt=dt)
-        all_income = all_income.aggregate(total=Sum('amount'))['total']
-        all_income = all_income if all_income is not None else 0.0
+    def return_balances_from_net(self, net):
+        return np.maximum(np.round(float(self.starting_balance) - net, 2), 0.0)
 
-        all_expense = Withdrawal.objects.filter(account=self, date__lt=dt)
-        all_expense = all_expense.aggregate(total=Sum('amount'))['total']
-        all_expense = all_expense if all_expense is not None else 0.0
-
-        return max(round(float(self.starting_balance) - float(all_income) + float(all_expense), 2), 0)
+    def return_balance_up_to_dt(self, dt):
+        # Payments (deposits) reduce the debt whereas charges (withdrawals) increase it
+        return max(round(float(self.starting_balance) - self.return_net_up_to_dt(dt), 2), 0)
 
     def estimate_balance_month_year(self, month: str, year: int, num_of_years=0, num_of_months=6, kind='slinear',
                                     fill_value='extrapolate'):
@@ -1157,15 +1522,13 @@ class DebtAccount(Account):
         req_date_dt = datetime.strptime(f'{month}, 1, {year}', '%B, %d, %Y')
         return self.estimate_balance_dt(req_date_dt, num_of_years=num_of_years, num_of_months=num_of_months, kind=kind, fill_value=fill_value)
 
-    def estimate_balance_dt(self, dt, num_of_years=0, num_of_months=6, kind='slinear',
-                                    fill_value='extrapolate'):
-        req_date_ts = dt_to_milliseconds_after_epoch(dt)
-
-        f = self.return_value_vs_time_function(num_of_years, num_of_months, kind=kind, fill_value=fill_value)
-
-        y = max(float(f(req_date_ts)), 0.0)
+    def estimate_balances(self, dts, num_of_years=0, num_of_months=6, kind='slinear', fill_value='extrapolate',
+                          months_into_future=None):
+        """ Estimates the balance at each of the given dates/datetimes, stopping at 0.0 (i.e., zeroed out debt)"""
+        balances = super().estimate_balances(dts, num_of_years=num_of_years, num_of_months=num_of_months, kind=kind,
+                                             fill_value=fill_value, months_into_future=months_into_future)
 
-        return y
+        return np.maximum(balances, 0.0)
 
 class Withdrawal(models.Model):
     """ Withdrawal for a given account.
@@ -1184,6 +1547,7 @@ class Withdrawal(models.Model):
 
     class Meta:
         unique_together = ['account', 'date', 'amount', 'description']
+        indexes = [models.Index(fields=['account', 'date'])]
 
     def __str__(self):
         return f"{self.description} at {self.location} on {self.date} - Account: {self.account.name} {self.budget_group} ${self.amount}"
@@ -1191,7 +1555,47 @@ class Withdrawal(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug_field:
             self.slug_field = slugify(self.description)
-        super(Withdrawal, self).save(*args, **kwargs)
+        with transaction.atomic():
+            previous = None
+            if self.pk is not None:
+                previous = Withdrawal.objects.filter(pk=self.pk).values('account_id', 'date', 'amount', 'budget_group',
+                                                                        *TransactionFacet.DIMENSIONS).first()
+            super(Withdrawal, self).save(*args, **kwargs)
+            amount = float(self.amount)
+            if previous is not None:
+                if previous['account_id'] == self.account_id and \
+                        first_of_month(previous['date']) == first_of_month(self.date):
+                    amount -= float(previous['amount'])
+                else:
+                    AccountMonthlyBalance.apply_entry(previous['account_id'], previous['date'],
+                                                      withdrawal=-float(previous['amount']))
+            AccountMonthlyBalance.apply_entry(self.account_id, self.date, withdrawal=amount)
+            UserMonthlyRollup.apply_entries(
+                UserMonthlyRollup.account_entry(self.account_id, self.date,
+                                                UserMonthlyRollup.budget_group_field(self.budget_group),
+                                                float(self.amount)),
+                UserMonthlyRollup.account_entry(previous['account_id'], previous['date'],
+                                                UserMonthlyRollup.budget_group_field(previous['budget_group']),
+                                                -float(previous['amount'])) if previous else None)
+            TransactionFacet.apply_entries(TransactionFacet.KIND_WITHDRAWAL, self.facet_entry(), previous)
+            Account.bump_ledger_version(self.account_id, *([previous['account_id']] if previous else []))
+
+    def delete(self, *args, **kwargs):
+        account_id, date, amount = self.account_id, self.date, float(self.amount)
+        facet_entry = self.facet_entry()
+        with transaction.atomic():
+            deleted = super(Withdrawal, self).delete(*args, **kwargs)
+            AccountMonthlyBalance.apply_entry(account_id, date, withdrawal=-amount)
+            UserMonthlyRollup.apply_entries(UserMonthlyRollup.account_entry(
+                account_id, date, UserMonthlyRollup.budget_group_field(self.budget_group), -amount))
+            TransactionFacet.apply_entries(TransactionFacet.KIND_WITHDRAWAL, None, facet_entry)
+            Account.bump_ledger_version(account_id)
+        return deleted
+
+    def facet_entry(self):
+        """ Returns the account_id, date and TransactionFacet.DIMENSIONS of the withdrawal."""
+        return {'account_id': self.account_id, 'date': self.date,
+                **{dimension: getattr(self, dimension) for dimension in TransactionFacet.DIMENSIONS}}
 
     def get_absolute_url(self):
         return reverse('withdrawal_overview', args=[self.pk])
@@ -1213,6 +1617,7 @@ class Deposit(models.Model):
 
     class Meta:
         unique_together = ['account', 'date', 'amount', 'description']
+        indexes = [models.Index(fields=['account', 'date'])]
 
     def __str__(self):
         return f"{self.description} at {self.location} on {self.date} - Account: {self.account.name} ${self.amount}"
@@ -1220,7 +1625,43 @@ class Deposit(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug_field:
             self.slug_field = slugify(self.description)
-        super(Deposit, self).save(*args, **kwargs)
+        with transaction.atomic():
+            previous = None
+            if self.pk is not None:
+                previous = Deposit.objects.filter(pk=self.pk).values('account_id', 'date', 'amount',
+                                                                     *TransactionFacet.DIMENSIONS).first()
+            super(Deposit, self).save(*args, **kwargs)
+            amount = float(self.amount)
+            if previous is not None:
+                if previous['account_id'] == self.account_id and \
+                        first_of_month(previous['date']) == first_of_month(self.date):
+                    amount -= float(previous['amount'])
+                else:
+                    AccountMonthlyBalance.apply_entry(previous['account_id'], previous['date'],
+                                                      deposit=-float(previous['amount']))
+            AccountMonthlyBalance.apply_entry(self.account_id, self.date, deposit=amount)
+            UserMonthlyRollup.apply_entries(
+                UserMonthlyRollup.account_entry(self.account_id, self.date, 'income', float(self.amount)),
+                UserMonthlyRollup.account_entry(previous['account_id'], previous['date'], 'income',
+                                                -float(previous['amount'])) if previous else None)
+            TransactionFacet.apply_entries(TransactionFacet.KIND_DEPOSIT, self.facet_entry(), previous)
+            Account.bump_ledger_version(self.account_id, *([previous['account_id']] if previous else []))
+
+    def delete(self, *args, **kwargs):
+        account_id, date, amount = self.account_id, self.date, float(self.amount)
+        facet_entry = self.facet_entry()
+        with transaction.atomic():
+            deleted = super(Deposit, self).delete(*args, **kwargs)
+            AccountMonthlyBalance.apply_entry(account_id, date, deposit=-amount)
+            UserMonthlyRollup.apply_entries(UserMonthlyRollup.account_entry(account_id, date, 'income', -amount))
+            TransactionFacet.apply_entries(TransactionFacet.KIND_DEPOSIT, None, facet_entry)
+            Account.bump_ledger_version(account_id)
+        return deleted
+
+    def facet_entry(self):
+        """ Returns the account_id, date and TransactionFacet.DIMENSIONS of the deposit."""
+        return {'account_id': self.account_id, 'date': self.date,
+                **{dimension: getattr(self, dimension) for dimension in TransactionFacet.DIMENSIONS}}
 
     def get_absolute_url(self):
         return reverse('deposit_overview', args=[self.pk])
@@ -1246,7 +1687,13 @@ class Transfer(models.Model):
     def __str__(self):
         return f'{self.date} {self.amount} from {self.account_from} to {self.account_to} for {self.description}'
 
+    @transaction.atomic
     def save(self, *args, **kwargs):
+        # The withdrawal and deposit saves keep the monthly balances of both accounts current
+        previous = None
+        if self.pk is not None:
+            previous = Transfer.objects.filter(pk=self.pk).values('account_from_id', 'account_to_id', 'date',
+                                                                  'amount').first()
         withdrawal_obj, created = Withdrawal.objects.get_or_create(account=self.account_from,
                                                                    date=self.date,
                                                                    amount=self.amount,
@@ -1284,38 +1731,119 @@ class Transfer(models.Model):
             deposit_obj.save()
         super(Transfer, self).save(*args, **kwargs)
 
+        amount = float(self.amount)
+        entries = [UserMonthlyRollup.account_entry(self.account_from_id, self.date, 'transfers_out', amount),
+                   UserMonthlyRollup.account_entry(self.account_to_id, self.date, 'transfers_in', amount)]
+        if previous is not None:
+            previous_amount = float(previous['amount'])
+            entries += [UserMonthlyRollup.account_entry(previous['account_from_id'], previous['date'],
+                                                        'transfers_out', -previous_amount),
+                        UserMonthlyRollup.account_entry(previous['account_to_id'], previous['date'],
+                                                        'transfers_in', -previous_amount)]
+        UserMonthlyRollup.apply_entries(*entries)
+
+    @transaction.atomic
+    def delete(self, *args, **kwargs):
+        account_from_id, account_to_id, date, amount = self.account_from_id, self.account_to_id, self.date, \
+            float(self.amount)
+        deleted = super(Transfer, self).delete(*args, **kwargs)
+        UserMonthlyRollup.apply_entries(
+            UserMonthlyRollup.account_entry(account_from_id, date, 'transfers_out', -amount),
+            UserMonthlyRollup.account_entry(account_to_id, date, 'transfers_in', -amount))
+        return deleted
+
     def get_absolute_url(self):
         return reverse('transfer_overview', args=[self.pk])
 
 
+class TradingForecast(NamedTuple):
+    """ Compounded forecast of a trading account.
+
+    roi - Mean monthly return in percent and roi_std_error its standard error (percent)
+    start_date - Date of the starting balance (numpy datetime64[D])
+    horizons - Months after start_date of each projected balance
+    balances - Projected balances, with balances_low/balances_high compounding at one standard error below/above
+    """
+    roi: float
+    roi_std_error: float
+    start_date: np.datetime64
+    start_balance: float
+    horizons: np.ndarray
+    balances: np.ndarray
+    balances_low: np.ndarray
+    balances_high: np.ndarray
+
+
 class TradingAccount(Account):
     """ Account with trading stocks.
 
         Functions:
         get_roi - Calculates the return on interest based on the prior number of months.
+        forecast - Compounds the balance to many horizons with the return on interest.
         get_time_to_reach_amount - Calculates the date at which a goal amount is reached .
         estimate_balance_month_year - Calculates the balance the account will have a certain number of months and years
          after a certain point in time.
         """
 
+    def return_monthly_returns(self, num_of_months=6):
+        """ Returns the monthly balance series over the prior number of months (see balance_series) and the
+        month over month returns (fractions) of the months that started with a positive balance."""
+        latest_date = self.return_latest_date()
+        earliest_date = latest_date + relativedelta(months=-1 * num_of_months)
+
+        dates, balances = self.balance_series(earliest_date, latest_date)
+        previous_balances = balances[:-1]
+        positive = previous_balances > 0.0
+        returns = balances[1:][positive] / previous_balances[positive] - 1
+
+        return dates, balances, returns
+
     def get_roi(self, num_of_months=6):
         """ Calculates the return on interest based on the prior number of months.
 
             Returns rate of change (% / month)
         """
-        # Get the rolling average of the last num_of_months worth of data
-        latest_date = self.return_latest_date()
-        earliest_date = latest_date + relativedelta(months=-1 * num_of_months)
+        dummy_dates, dummy_balances, returns = self.return_monthly_returns(num_of_months)
+        if len(returns) == 0:
+            return 0.0
 
-        # Use that information to then calculate effective interest based on account balance
-        earliest_balance = self.return_balance_up_to_month_year(earliest_date.strftime('%B'),
-                                                                int(earliest_date.strftime('%Y')))
-        latest_balance = self.return_balance_up_to_month_year(latest_date.strftime('%B'),
-                                                              int(latest_date.strftime('%Y')))
+        return float(np.mean(returns)) * 100
 
-        roi = (latest_balance - earliest_balance) / num_of_months * 100
+    def forecast(self, horizons, num_of_months=6):
+        """ Returns the TradingForecast of the balance the given numbers of months (array-like, may be fractional)
+        after the latest month of data.
 
-        return roi
+        The return on interest and its standard error come from a single balance series over the prior
+        num_of_months months and each horizon is compounded with numpy power.
+        """
+        dates, balances, returns = self.return_monthly_returns(num_of_months)
+        roi = float(np.mean(returns)) if len(returns) else 0.0
+        roi_std_error = float(np.std(returns, ddof=1) / np.sqrt(len(returns))) if len(returns) > 1 else 0.0
+
+        horizons = np.asarray(horizons, dtype=np.float64)
+        start_balance = float(balances[-1])
+
+        return TradingForecast(roi * 100, roi_std_error * 100, dates[-1], start_balance, horizons,
+                               np.round(start_balance * np.power(1 + roi, horizons), 2),
+                               np.round(start_balance * np.power(1 + roi - roi_std_error, horizons), 2),
+                               np.round(start_balance * np.power(1 + roi + roi_std_error, horizons), 2))
+
+    def estimate_balances(self, dts, num_of_years=0, num_of_months=6, **kwargs):
+        """ Estimates the balance at each of the given dates/datetimes by compounding the return on interest of the
+        prior num_of_years/num_of_months (see forecast)."""
+        num_of_months = num_of_years * 12 + num_of_months
+        latest_date = self.return_latest_date()
+        if latest_date is None:
+            return np.full(len(dts), float(self.starting_balance))
+
+        # Whole months after the latest month plus the elapsed fraction of the month
+        cutoffs = np.array([to_ledger_date(dt) for dt in dts], dtype='datetime64[D]')
+        cutoff_months = cutoffs.astype('datetime64[M]')
+        days_in_month = ((cutoff_months + 1).astype('datetime64[D]') - cutoff_months.astype('datetime64[D]'))
+        horizons = (cutoff_months - np.datetime64(latest_date, 'M')).astype(np.float64) + \
+            (cutoffs - cutoff_months.astype('datetime64[D]')).astype(np.float64) / days_in_month.astype(np.float64)
+
+        return self.forecast(horizons, num_of_months).balances
 
     def get_time_to_reach_amount(self, amount: float, num_of_months=6):
         """ Calculate the amount of time it will take to reach a financial goal.
@@ -1359,11 +1887,7 @@ class TradingAccount(Account):
         end_date = date + relativedelta(months=tot_months)
         json_return = {'beginning date': date, 'beginning balance': balance, 'end date': end_date}
 
-        while date <= end_date:
-            balance = balance + balance * roi / 100.0
-            date = date + relativedelta(months=+1)
-
-        json_return['end balance'] = balance
+        json_return['end balance'] = round(balance * np.power(1 + roi / 100.0, tot_months), 2)
 
         return json_return
 
@@ -1382,6 +1906,8 @@ class RetirementAccount(Account):
 
         Functions:
         return_balance_month_year_with_yearly_withdrawal - Returns the balance as a function of time with a yearly withdrawal rate
+        projected_balance_series - Returns the projected balance at the start of each future month
+        return_projected_balances - Returns the projected balance at future dates
     """
     yearly_withdrawal_rate = models.DecimalField(verbose_name='Withdrawal Rate in Percentage',
                                                  max_digits=5, decimal_places=2, default=4.0)
@@ -1397,83 +1923,129 @@ class RetirementAccount(Account):
         earliest_date = latest_date + relativedelta(months=-1 * num_of_months)
 
         # Use that information to then calculate effective interest based on account balance
-        earliest_balance = self.return_balance_up_to_month_year(earliest_date.strftime('%B'),
-                                                                int(earliest_date.strftime('%Y')))
-        latest_balance = self.return_balance_up_to_month_year(latest_date.strftime('%B'),
-                                                              int(latest_date.strftime('%Y')))
+        dates, balances = self.balance_series(earliest_date, latest_date)
+        earliest_balance = balances[0]
+        latest_balance = balances[-1]
 
-        roi = (latest_balance - earliest_balance) / num_of_months * 100
+        roi = float(latest_balance - earliest_balance) / num_of_months * 100
 
         return roi
 
+    def balance_series(self, start, end, freq='M'):
+        """ Returns the balance at the start of each period, projecting the periods after the current month.
+
+        See Account.balance_series. Past periods come from the ledger, future periods from return_projected_balances.
+        """
+        dates, balances = super().balance_series(start, end, freq)
+
+        future = dates >= np.datetime64(timezone.localtime(now()).date(), 'M') + 1
+        if future.any():
+            balances[future] = self.return_projected_balances(dates[future].astype(date))
+
+        return dates, balances
+
+    def projected_balance_series(self, end):
+        """ Returns the projected balance at the start of each month from next month up to the month of end.
+
+        Returns the month dates (numpy datetime64[D]) and balances (numpy float array).
+        """
+        months, balances, dummy_dates, dummy_nets = self._project_balances(to_ledger_date(end))
+        return months.astype('datetime64[D]'), np.round(balances, 2)
+
+    def return_projected_balances(self, dts):
+        """ Returns the projected balance before each of the given dates/datetimes.
+
+        The dates must be in a month after the current one. Each balance is the projected balance at the start of
+        its month plus the scheduled entries of the month before the date.
+        """
+        cutoffs = np.array([to_ledger_date(dt) for dt in dts], dtype='datetime64[D]')
+        months, balances, entry_dates, entry_nets = self._project_balances(cutoffs.max().astype(date))
+
+        cutoff_months = cutoffs.astype('datetime64[M]')
+        month_balances = balances[(cutoff_months - months[0]).astype(np.int64)]
+
+        cumulative_nets = np.concatenate(([0.0], np.cumsum(entry_nets)))
+        partial_nets = cumulative_nets[np.searchsorted(entry_dates, cutoffs)] - \
+            cumulative_nets[np.searchsorted(entry_dates, cutoff_months.astype('datetime64[D]'))]
+
+        return np.round(month_balances + partial_nets, 2)
+
+    def _project_balances(self, end_date):
+        """ Projects the balance at the start of each month from next month up to the month of end_date.
+
+        Starting from the ledger balance at the start of next month, each month adds its scheduled (future dated)
+        deposits and withdrawals, compounds monthly_interest_pct and, after the retirement date, draws down
+        yearly_withdrawal_rate / 12 percent:
+
+            B[k] = f[k] * (B[k-1] + net[k-1]),  f[k] = (1 + interest) * (1 - withdrawal[k])
+
+        which is solved for all months at once as B[k] = P[k] * (B[0] + sum(net[j] / P[j], j < k)), with P the
+        cumulative product of f.
+
+        Returns the months (datetime64[M]), balances, and the dates (sorted) and net amounts of the scheduled entries.
+        """
+        first_month = np.datetime64(timezone.localtime(now()).date(), 'M') + 1
+        last_month = max(np.datetime64(end_date, 'M'), first_month)
+        months = np.arange(first_month, last_month + 1)
+        start_date = first_month.astype('datetime64[D]').astype(date)
+        stop_date = (last_month + 1).astype('datetime64[D]').astype(date)
+
+        # Scheduled entries totaled by day in one grouped query
+        incomes = Deposit.objects.filter(account=self, date__gte=start_date, date__lt=stop_date)
+        incomes = incomes.values('date').annotate(total=Sum('amount')).order_by()
+        expenses = Withdrawal.objects.filter(account=self, date__gte=start_date, date__lt=stop_date)
+        expenses = expenses.values('date').annotate(total=Sum('amount') * -1).order_by()
+        entries = sorted((row['date'], float(row['total'])) for row in incomes.union(expenses, all=True))
+        entry_dates = np.array([entry_date for entry_date, dummy_total in entries], dtype='datetime64[D]')
+        entry_nets = np.array([total for dummy_date, total in entries], dtype=np.float64)
+
+        month_nets = np.zeros(len(months))
+        np.add.at(month_nets, (entry_dates.astype('datetime64[M]') - first_month).astype(np.int64), entry_nets)
+
+        retirement_month = np.datetime64(self.user.get_latest_retirement_date(), 'M')
+        growth = 1 + float(self.monthly_interest_pct) / 100
+        drawdown = np.where(months[:-1] > retirement_month, 1 - float(self.yearly_withdrawal_rate) / 100 / 12, 1.0)
+        factors = np.concatenate(([1.0], np.cumprod(growth * drawdown)))
+
+        opening_balance = super().return_balance_up_to_dt(start_date)
+        contributions = np.concatenate(([0.0], np.cumsum(month_nets[:-1] / factors[:-1])))
+        balances = factors * (opening_balance + contributions)
+
+        return months, balances, entry_dates, entry_nets
+
     def estimate_balance_month_year(self, month: str, year: int, num_of_years=1, num_of_months=0,
                                     kind='cubic', fill_value='extrapolate', months_into_future=12):
         """ Performs a cubic interpolation of balance vs time given the average of the last entries in the account."""
         req_dt = datetime.strptime(f'{month}, 1, {year}', '%B, %d, %Y')
-        req_date_ts = dt_to_milliseconds_after_epoch(req_dt)
-
-        f = self.return_value_vs_time_function(num_of_years=num_of_years, num_of_months=num_of_months,
-                                               kind=kind, fill_value=fill_value, months_into_future=months_into_future)
 
-        y = float(f(req_date_ts))
+        return float(self.estimate_balances([req_dt], num_of_years=num_of_years, num_of_months=num_of_months,
+                                            kind=kind, fill_value=fill_value,
+                                            months_into_future=months_into_future)[0])
 
-        return y
+    def estimate_balances(self, dts, num_of_years=1, num_of_months=0, kind='cubic', fill_value='extrapolate',
+                          months_into_future=12):
+        """ Estimates the balance at each of the given dates/datetimes with a cubic interpolation (see
+        Account.estimate_balances)."""
+        return super().estimate_balances(dts, num_of_years=num_of_years, num_of_months=num_of_months, kind=kind,
+                                         fill_value=fill_value, months_into_future=months_into_future)
 
     def return_balance_up_to_dt(self, dt):
         """ Returns the balance up to the end of the given datetime.
-        If the request date is less than the latest date, then treat it like normal
+        If the request date is in the current month or before, then treat it like normal
 
-        If the request date is greater than the latest date, but less than the retirement date,
-            then account for any interest gained
-
-        If the request date is greater than the retirement date, then account for withdrawals
+        If the request date is after the current month, then project the balance with return_projected_balances,
+            which accounts for interest gained and, after the retirement date, withdrawals
         """
 
-        tzinfo = get_current_timezone()
         latest_date = self.return_latest_date()
         if latest_date is None:
             return 0.0
 
-        # Retirement date
-        ret_date = self.user.get_latest_retirement_date()
-        ret_dt = datetime.combine(ret_date, datetime.min.time(), tzinfo=tzinfo)
-
-        today_dt = timezone.localtime(now())
-        if dt <= today_dt:
+        first_projected_date = (np.datetime64(timezone.localtime(now()).date(), 'M') + 1).astype(date)
+        if to_ledger_date(dt) < first_projected_date:
             return super().return_balance_up_to_dt(dt)
 
-        total = super().return_balance_up_to_dt(dt)
-        current_dt = today_dt + relativedelta(months=+1)
-
-        while current_dt <= dt:
-            current_date = current_dt.date()
-            # Capture the incomes and withdrawals for the given month
-            current_date_start_of_month = datetime.strptime(
-                f'{current_date.strftime("%Y")}-{current_date.strftime("%B")}-1', '%Y-%B-%d')
-            current_date_end_of_month = current_date_start_of_month + relativedelta(months=+1) + relativedelta(
-                seconds=-1)
-            # Use the previous total to calculate the compound interest
-            current_income = Deposit.objects.filter(account=self, date__gte=current_date_start_of_month,
-                                                    date__lt=current_date_end_of_month)
-            current_income = current_income.aggregate(total=Sum('amount'))['total']
-            current_income = current_income if current_income is not None else 0.0
-
-            current_expense = Withdrawal.objects.filter(account=self, date__gte=current_date_start_of_month,
-                                                        date__lt=current_date_end_of_month)
-            current_expense = current_expense.aggregate(total=Sum('amount'))['total']
-            current_expense = current_expense if current_expense is not None else 0.0
-
-            balance = round(float(current_income - current_expense), 2)
-            total += balance
-            interest = total * float(self.monthly_interest_pct) / 100
-
-            total += interest
-            if current_dt > ret_dt:
-                ret_withdrawal = total * float(self.yearly_withdrawal_rate) / 12
-                total -= ret_withdrawal
-            current_dt = current_dt + relativedelta(months=+1)
-
-        return total
+        return float(self.return_projected_balances([dt])[0])
 
     def return_balance_up_to_month_year(self, month: str, year: int):
         """ Returns the balance up to the end of the given month and year.
@@ -1553,6 +2125,13 @@ class MonthlyBudget(models.Model):
         self.month = self.date.strftime('%B')
         self.year = int(self.date.strftime('%Y'))
         super(MonthlyBudget, self).save(*args, **kwargs)
+        User.bump_report_version(self.user_id)
+
+    def delete(self, *args, **kwargs):
+        user_id = self.user_id
+        deleted = super(MonthlyBudget, self).delete(*args, **kwargs)
+        User.bump_report_version(user_id)
+        return deleted
 
     def __str__(self):
         return "{}'s budget for {}, {}".format(self.user, self.month, self.year)
@@ -1564,6 +2143,454 @@ class MonthlyBudget(models.Model):
         unique_together = ['user', 'month', 'year']
 
 
+class AccountMonthlyBalance(models.Model):
+    """ Monthly snapshot of the deposits and withdrawals for an account.
+
+    closing_balance is the cumulative deposits minus withdrawals up to the end of the month. The account's
+    starting balance is not included so that editing it does not invalidate the snapshots.
+
+    Kept current by the save/delete functions of Deposit and Withdrawal (and therefore Transfer).
+    Bulk queryset operations bypass those, so run the rebuild_account_balances command afterwards.
+    """
+    account = models.ForeignKey(Account, on_delete=models.CASCADE)
+    month = models.DateField(verbose_name='First day of the month')
+    deposits = models.FloatField(default=0.0)
+    withdrawals = models.FloatField(default=0.0)
+    closing_balance = models.FloatField(default=0.0)
+
+    class Meta:
+        unique_together = ['account', 'month']
+
+    def __str__(self):
+        return f'{self.account} {self.month.strftime("%B %Y")} ${self.closing_balance}'
+
+    @classmethod
+    def apply_entry(cls, account_id, date, deposit=0.0, withdrawal=0.0):
+        """ Adds a change in deposits and/or withdrawals to the snapshot of the month for the given date.
+
+        The snapshots of all following months are shifted by the same net amount.
+        Expected to be called after the entry was written to the database.
+        """
+        if deposit == 0.0 and withdrawal == 0.0:
+            return
+        month = first_of_month(date)
+        net = deposit - withdrawal
+
+        updated = cls.objects.filter(account_id=account_id, month=month).update(
+            deposits=F('deposits') + deposit, withdrawals=F('withdrawals') + withdrawal,
+            closing_balance=F('closing_balance') + net)
+
+        if not updated:
+            if not cls.objects.filter(account_id=account_id).exists():
+                # First snapshot for the account, so build all of them from the ledger (which already holds the
+                # entry). Afterwards, an account with any snapshot always has the complete set.
+                Account(pk=account_id).rebuild_monthly_balances()
+                return
+
+            # First entry for the month, so total the month from the ledger
+            next_month = month + relativedelta(months=+1)
+            deposits = Deposit.objects.filter(account_id=account_id, date__gte=month, date__lt=next_month)
+            deposits = deposits.aggregate(total=Sum('amount'))['total']
+            deposits = float(deposits) if deposits is not None else 0.0
+            withdrawals = Withdrawal.objects.filter(account_id=account_id, date__gte=month, date__lt=next_month)
+            withdrawals = withdrawals.aggregate(total=Sum('amount'))['total']
+            withdrawals = float(withdrawals) if withdrawals is not None else 0.0
+
+            previous = cls.objects.filter(account_id=account_id, month__lt=month).order_by('-month').first()
+            closing_balance = previous.closing_balance if previous is not None else 0.0
+            cls.objects.create(account_id=account_id, month=month, deposits=deposits, withdrawals=withdrawals,
+                               closing_balance=closing_balance + deposits - withdrawals)
+
+        cls.objects.filter(account_id=account_id, month__gt=month).update(closing_balance=F('closing_balance') + net)
+
+
+class UserMonthlyRollup(models.Model):
+    """ Monthly totals of a user's checking account incomes and spending by budget group, statutory spending and
+    transfers in/out of the checking accounts.
+
+    Kept current by the save/delete functions of Deposit, Withdrawal, Transfer and Statutory. A user either has the
+    rollups of every month with entries or none at all (readers then total the ledger). Bulk queryset operations
+    bypass the save/delete functions, so run the backfill_monthly_rollups command afterwards.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    month = models.DateField(verbose_name='First day of the month')
+    income = models.FloatField(default=0.0)
+    statutory = models.FloatField(default=0.0)
+    mandatory = models.FloatField(default=0.0)
+    mortgage = models.FloatField(default=0.0)
+    debts_goals_retirement = models.FloatField(default=0.0)
+    discretionary = models.FloatField(default=0.0)
+    transfers_in = models.FloatField(default=0.0)
+    transfers_out = models.FloatField(default=0.0)
+
+    # Rollup field of each budget group (named as the MonthlyBudget fields)
+    BUDGET_GROUP_FIELDS = {
+        BUDGET_GROUP_MANDATORY: 'mandatory',
+        BUDGET_GROUP_MORTGAGE: 'mortgage',
+        BUDGET_GROUP_DGR: 'debts_goals_retirement',
+        BUDGET_GROUP_DISC: 'discretionary',
+    }
+    TOTAL_FIELDS = ('income', 'statutory', 'mandatory', 'mortgage', 'debts_goals_retirement', 'discretionary',
+                    'transfers_in', 'transfers_out')
+
+    class Meta:
+        unique_together = ['user', 'month']
+
+    def __str__(self):
+        return f'{self.user} {self.month.strftime("%B %Y")}'
+
+    @property
+    def year(self):
+        return self.month.year
+
+    @classmethod
+    def budget_group_field(cls, budget_group):
+        """ Returns the rollup field of the budget group (None for unknown groups, which are not rolled up)."""
+        return cls.BUDGET_GROUP_FIELDS.get(budget_group)
+
+    @staticmethod
+    def account_entry(account_id, date, field, amount):
+        """ Returns the rollup entry (user_id, date, field, amount) of a deposit/withdrawal/transfer amount.
+
+        Only the checking accounts are included (as in the user reports), so None is returned for other accounts.
+        """
+        if field is None or not amount:
+            return None
+        account = Account.objects.filter(pk=account_id).values('user_id', 'checkingaccount').first()
+        if account is None or account['checkingaccount'] is None:
+            return None
+
+        return account['user_id'], date, field, amount
+
+    @classmethod
+    def apply_entries(cls, *entries):
+        """ Adds the entries (user_id, date, field, amount) to the rollups of their months. None entries are skipped.
+
+        Expected to be called once per write, after the write, as the missing rollups are built from the ledger.
+        """
+        changes = dict()
+        for entry in entries:
+            if entry is None:
+                continue
+            user_id, date, field, amount = entry
+            month_changes = changes.setdefault(user_id, dict()).setdefault(first_of_month(date), dict())
+            month_changes[field] = month_changes.get(field, 0.0) + amount
+
+        for user_id, months in changes.items():
+            if not cls.objects.filter(user_id=user_id).exists():
+                # First rollup for the user, so build all of them. Afterwards, the user always has the complete set.
+                cls.rebuild(user_ids=[user_id])
+                continue
+
+            for month, month_changes in months.items():
+                updated = cls.objects.filter(user_id=user_id, month=month).update(
+                    **{field: F(field) + amount for field, amount in month_changes.items()})
+                if not updated:
+                    # First entry for the month, so total the month from the ledger
+                    cls.rebuild(user_ids=[user_id], start_month=month, end_month=month + relativedelta(months=+1))
+
+    @classmethod
+    def return_ledger_rows(cls, user_ids=None, start_month=None, end_month=None):
+        """ Totals the ledger by user and month in a single query and returns (unsaved) rollups.
+
+        start_month (inclusive) and end_month (exclusive) limit the months, user_ids limits the users.
+        """
+        zero = Value(0.0, output_field=models.FloatField())
+
+        def monthly(queryset, user_field, **totals):
+            if user_ids is not None:
+                queryset = queryset.filter(**{f'{user_field}__in': user_ids})
+            if start_month is not None:
+                queryset = queryset.filter(date__gte=start_month)
+            if end_month is not None:
+                queryset = queryset.filter(date__lt=end_month)
+            queryset = queryset.annotate(rollup_user=F(user_field), rollup_month=TruncMonth('date'))
+            return queryset.values('rollup_user', 'rollup_month').annotate(
+                **{field: totals.get(field, zero) for field in cls.TOTAL_FIELDS}).order_by()
+
+        group_totals = {field: Sum('amount', filter=Q(budget_group=budget_group))
+                        for budget_group, field in cls.BUDGET_GROUP_FIELDS.items()}
+        queries = [
+            monthly(Deposit.objects.filter(account__checkingaccount__isnull=False), 'account__user',
+                    income=Sum('amount')),
+            monthly(Withdrawal.objects.filter(account__checkingaccount__isnull=False), 'account__user',
+                    **group_totals),
+            monthly(Statutory.objects.all(), 'user', statutory=Sum('amount')),
+            monthly(Transfer.objects.filter(account_to__checkingaccount__isnull=False), 'account_to__user',
+                    transfers_in=Sum('amount')),
+            monthly(Transfer.objects.filter(account_from__checkingaccount__isnull=False), 'account_from__user',
+                    transfers_out=Sum('amount')),
+        ]
+
+        rollups = dict()
+        for row in queries[0].union(*queries[1:], all=True):
+            month = to_ledger_date(row['rollup_month'])
+            rollup = rollups.setdefault((row['rollup_user'], month), cls(user_id=row['rollup_user'], month=month))
+            for field in cls.TOTAL_FIELDS:
+                setattr(rollup, field, getattr(rollup, field) + float(row[field] or 0.0))
+
+        return [rollups[key] for key in sorted(rollups.keys())]
+
+    @classmethod
+    def rebuild(cls, user_ids=None, start_month=None, end_month=None, batch_size=1000):
+        """ Recreates the rollups from the ledger (all users and months by default). Returns the number of rollups."""
+        rollups = cls.return_ledger_rows(user_ids, start_month, end_month)
+
+        existing = cls.objects.all()
+        if user_ids is not None:
+            existing = existing.filter(user_id__in=user_ids)
+        if start_month is not None:
+            existing = existing.filter(month__gte=start_month)
+        if end_month is not None:
+            existing = existing.filter(month__lt=end_month)
+
+        with transaction.atomic():
+            existing.delete()
+            cls.objects.bulk_create(rollups, batch_size=batch_size)
+
+        return len(rollups)
+
+    @classmethod
+    def return_totals(cls, user_id, start_month, end_month):
+        """ Returns the totals of the user's rollups from start_month (inclusive) to end_month (exclusive).
+
+        Totals the ledger instead if the rollups were never built for the user.
+        """
+        totals = cls.objects.filter(user_id=user_id, month__gte=start_month, month__lt=end_month).aggregate(
+            months=models.Count('id'), **{field: Sum(field) for field in cls.TOTAL_FIELDS})
+
+        if not totals.pop('months') and not cls.objects.filter(user_id=user_id).exists():
+            totals = dict.fromkeys(cls.TOTAL_FIELDS, 0.0)
+            for rollup in cls.return_ledger_rows([user_id], start_month, end_month):
+                for field in cls.TOTAL_FIELDS:
+                    totals[field] += getattr(rollup, field)
+
+        return {field: round(float(total or 0.0), 2) for field, total in totals.items()}
+
+
+class TransactionFacet(models.Model):
+    """ Distinct category, description, location and group values of a user's withdrawals or deposits, with the
+    number of entries using each value and the latest date one was used. The entry and lookup forms read their
+    choices from the facets instead of scanning the ledger.
+
+    Kept current by the save/delete functions of Withdrawal and Deposit (and so Transfer). A user either has the
+    facets of every value or none at all (readers then scan the ledger). Bulk queryset operations bypass the
+    save/delete functions, so run the rebuild_transaction_facets command afterwards. last_used is not moved back
+    when the latest entry using a value is deleted.
+    """
+    KIND_WITHDRAWAL = 'withdrawal'
+    KIND_DEPOSIT = 'deposit'
+    KIND_CHOICES = (
+        (KIND_WITHDRAWAL, 'Withdrawal'),
+        (KIND_DEPOSIT, 'Deposit'),
+    )
+    DIMENSIONS = ('category', 'description', 'location', 'group')
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    dimension = models.CharField(max_length=16)
+    value = models.CharField(max_length=250)
+    count = models.IntegerField(default=0)
+    last_used = models.DateField()
+
+    class Meta:
+        unique_together = ['user', 'kind', 'dimension', 'value']
+        indexes = [models.Index(fields=['user', 'kind', 'last_used'])]
+
+    def __str__(self):
+        return f'{self.user} {self.kind} {self.dimension}: {self.value} ({self.count})'
+
+    @classmethod
+    def ledger_model(cls, kind):
+        return Withdrawal if kind == cls.KIND_WITHDRAWAL else Deposit
+
+    @classmethod
+    def apply_entries(cls, kind, entry, previous=None):
+        """ Counts the values of a saved withdrawal/deposit (kind) and uncounts the values of its previous version.
+
+        entry and previous are dicts with the account_id, date and DIMENSIONS of the entry (None is skipped). Values
+        of the previous version that did not change are left alone, so most edits take no facet query.
+        Expected to be called once per write, after the write, as the facets of a new user are built from the ledger.
+        """
+        unchanged = entry is not None and previous is not None and entry['account_id'] == previous['account_id'] and \
+            to_ledger_date(entry['date']) == to_ledger_date(previous['date'])
+        entries = list()
+        for sign, version in ((1, entry), (-1, previous)):
+            if version is not None:
+                entries += [(sign, version['account_id'], version['date'], dimension, version[dimension])
+                            for dimension in cls.DIMENSIONS if version[dimension] and
+                            not (unchanged and entry[dimension] == previous[dimension])]
+        if not entries:
+            return
+
+        user_ids = dict(Account.objects.filter(pk__in={account_id for _, account_id, _, _, _ in entries}).values_list(
+            'pk', 'user_id'))
+        changes = dict()
+        for sign, account_id, date, dimension, value in entries:
+            key = (user_ids[account_id], dimension, value)
+            count, last_used = changes.get(key, (0, None))
+            changes[key] = (count + sign, to_ledger_date(date) if sign > 0 else last_used)
+
+        rebuilt = set()
+        for user_id in {user_id for user_id, _, _ in changes}:
+            if not cls.objects.filter(user_id=user_id).exists():
+                # First facet for the user, so build all of them. Afterwards, the user always has the complete set.
+                cls.rebuild(user_ids=[user_id])
+                rebuilt.add(user_id)
+
+        for (user_id, dimension, value), (count, last_used) in changes.items():
+            if user_id in rebuilt:
+                continue
+            facets = cls.objects.filter(user_id=user_id, kind=kind, dimension=dimension, value=value)
+            updates = {'count': F('count') + count}
+            if last_used is not None:
+                updates['last_used'] = Greatest(F('last_used'), Value(last_used, output_field=models.DateField()))
+            if not facets.update(**updates) and count > 0:
+                cls.objects.create(user_id=user_id, kind=kind, dimension=dimension, value=value, count=count,
+                                   last_used=last_used)
+            elif count < 0:
+                facets.filter(count__lte=0).delete()
+
+    @classmethod
+    def return_ledger_rows(cls, user_ids=None, kind=None, since=None):
+        """ Counts the values of the ledger by user (one query per kind and dimension) and returns (unsaved) facets.
+
+        user_ids limits the users, kind the ledger (both by default) and since the dates.
+        """
+        facets = list()
+        for ledger_kind in ([kind] if kind else [cls.KIND_WITHDRAWAL, cls.KIND_DEPOSIT]):
+            entries = cls.ledger_model(ledger_kind).objects.all()
+            if user_ids is not None:
+                entries = entries.filter(account__user_id__in=user_ids)
+            if since is not None:
+                entries = entries.filter(date__gte=since)
+            for dimension in cls.DIMENSIONS:
+                rows = entries.exclude(**{dimension: ''}).exclude(**{f'{dimension}__isnull': True}).values(
+                    'account__user_id', dimension).annotate(count=models.Count('id'), last_used=Max('date'))
+                facets += [cls(user_id=row['account__user_id'], kind=ledger_kind, dimension=dimension,
+                               value=row[dimension], count=row['count'], last_used=to_ledger_date(row['last_used']))
+                           for row in rows.order_by()]
+
+        return facets
+
+    @classmethod
+    def rebuild(cls, user_ids=None, batch_size=1000):
+        """ Recreates the facets from the ledger (all users by default). Returns the number of facets."""
+        facets = cls.return_ledger_rows(user_ids)
+
+        existing = cls.objects.all()
+        if user_ids is not None:
+            existing = existing.filter(user_id__in=user_ids)
+
+        with transaction.atomic():
+            existing.delete()
+            cls.objects.bulk_create(facets, batch_size=batch_size)
+
+        return len(facets)
+
+    @classmethod
+    def return_values(cls, user, kind, since=None):
+        """ Returns {dimension: [values]} of the user's withdrawals or deposits (kind), the most recently used values
+        first (then the most used). since limits the values to the ones used since then.
+
+        Takes a single query, unless the facets were never built for the user (the ledger is scanned instead).
+        """
+        facets = cls.objects.filter(user=user, kind=kind)
+        if since is not None:
+            facets = facets.filter(last_used__gte=since)
+        rows = list(facets.order_by('-last_used', '-count', 'value').values_list('dimension', 'value'))
+
+        if not rows and not cls.objects.filter(user=user).exists():
+            ledger_facets = sorted(cls.return_ledger_rows([user.pk], kind, since),
+                                   key=lambda facet: (-facet.last_used.toordinal(), -facet.count, facet.value))
+            rows = [(facet.dimension, facet.value) for facet in ledger_facets]
+
+        values = {dimension: list() for dimension in cls.DIMENSIONS}
+        for dimension, value in rows:
+            values[dimension].append(value)
+
+        return values
+
+    @classmethod
+    def return_prefix_index(cls, user_id, kind, dimension):
+        """ Returns the PrefixIndex of the values of a dimension of the user's withdrawals or deposits (kind), ranked
+        by their number of entries, or None if the user does not exist.
+
+        The indexes are kept in AUTOCOMPLETE_CACHE, keyed on the user's report version (read from the database, so
+        changes made by other processes are seen), so a hit takes a single query.
+        """
+        report_version = User.objects.filter(pk=user_id).values_list('report_version', flat=True).first()
+        if report_version is None:
+            return None
+
+        def build():
+            counts = dict(cls.objects.filter(user_id=user_id, kind=kind, dimension=dimension).values_list(
+                'value', 'count'))
+            if not counts and not cls.objects.filter(user_id=user_id).exists():
+                counts = {facet.value: facet.count for facet in cls.return_ledger_rows([user_id], kind)
+                          if facet.dimension == dimension}
+            return PrefixIndex(counts)
+
+        return AUTOCOMPLETE_CACHE.get_or_compute((user_id, kind, dimension, report_version), build)
+
+
+class ReportJob(models.Model):
+    """ Background build of a user report (see ReportService.submit).
+
+    Jobs are deduplicated on (user, start_date, end_date, report_version). The result holds the template
+    variables of the report once the job is done.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    )
+    ACTIVE_STATUSES = (STATUS_PENDING, STATUS_RUNNING)
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=32, default='summary')
+    start_date = models.DateField()
+    end_date = models.DateField(verbose_name='End date (exclusive)')
+    report_version = models.PositiveIntegerField()
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    progress = models.FloatField(default=0.0)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'start_date', 'end_date', 'report_version'])]
+
+    def __str__(self):
+        return f'{self.user} {self.kind} report from {self.start_date} to {self.end_date} ({self.status})'
+
+    @property
+    def is_done(self):
+        return self.status == self.STATUS_DONE
+
+    def set_progress(self, progress, status=None, **fields):
+        """ Saves the progress (and status/other fields) of the job without touching the other columns."""
+        self.progress = round(progress, 4)
+        fields['progress'] = self.progress
+        if status is not None:
+            self.status = fields['status'] = status
+        for name, value in fields.items():
+            setattr(self, name, value)
+        fields['updated'] = now()
+        ReportJob.objects.filter(pk=self.pk).update(**fields)
+
+    def as_status(self):
+        """ Returns the JSON status of the job for the polling endpoint."""
+        return {'id': self.pk, 'status': self.status, 'progress': self.progress, 'error': self.error,
+                'start_date': self.start_date.isoformat(), 'end_date': self.end_date.isoformat()}
+
+
 class Interest(models.Model):
     """ Interest tracking for individual accounts.
 
@@ -1588,8 +2615,28 @@ class Statutory(models.Model):
     def __str__(self):
         return f'{self.date} {self.description} {self.amount}'
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            previous = None
+            if self.pk is not None:
+                previous = Statutory.objects.filter(pk=self.pk).values('user_id', 'date', 'amount').first()
+            super(Statutory, self).save(*args, **kwargs)
+            UserMonthlyRollup.apply_entries(
+                (self.user_id, self.date, 'statutory', float(self.amount)),
+                (previous['user_id'], previous['date'], 'statutory', -float(previous['amount'])) if previous else None)
+            User.bump_report_version(self.user_id, *([previous['user_id']] if previous else []))
+
+    def delete(self, *args, **kwargs):
+        user_id, date, amount = self.user_id, self.date, float(self.amount)
+        with transaction.atomic():
+            deleted = super(Statutory, self).delete(*args, **kwargs)
+            UserMonthlyRollup.apply_entries((user_id, date, 'statutory', -amount))
+            User.bump_report_version(user_id)
+        return deleted
+
     def get_absolute_url(self):
         return reverse('statutory_overview', args=[self.pk])
 
     class Meta:
         unique_together = ['user', 'date', 'description', 'amount']
+        indexes = [models.Index(fields=['user', 'date'])]
@@ -1,21 +1,254 @@
 #!/usr/bin/env python3
 
-from django.http import JsonResponse
+from functools import wraps
+from calendar import timegm
+import hashlib
+
+from django.http import JsonResponse, HttpResponse, HttpResponseBadRequest
 from django.shortcuts import redirect
 from django.views.generic import DetailView, TemplateView
 from django.db.models.functions import Trunc
+from django.utils import timezone
 from django.utils.timezone import now
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.utils.functional import cached_property
 
 from finances.models import User, MonthlyBudget, CheckingAccount, RetirementAccount, DebtAccount, \
-    dt_to_milliseconds_after_epoch, Statutory, Account
+    dt_to_milliseconds_after_epoch, datetime64_to_milliseconds_after_epoch, dts_to_milliseconds_after_epoch, \
+    Account, ReportJob
 from finances.utils import chartjs_utils as cjs
+from finances.reports import REPORT_CACHE
+from finances.utils.downsampling import lttb
+from finances.utils.columnar import XYSeries, CHART_FORMATS
 
 from datetime import datetime
+import numpy as np
 from dateutil.relativedelta import relativedelta
 
 
+# Points of the time series plots unless the request sets max_points (about the width of a chart in pixels)
+DEFAULT_MAX_POINTS = 500
+# Largest max_points a request can set, which bounds the size of the payloads
+MAX_POINTS_LIMIT = 5000
+# Report charts whose payload depends on ?max_points and ?format (the time series)
+SERIES_CHARTS = ('cumulative_expense', 'cumulative_income', 'cumulative_total')
+
+
 # TODO: Add plot views that take advantage of the value vs time functions. Account balance vs time. User net worth over time. Debt balance vs time
 
+def report_range_key(kwargs, params=None):
+    """ Returns the range part of the cache key of a user plot view: its url kwargs besides the user's pk and the
+    normalized query parameters that change the payload (see series_params).
+
+    Dates are formatted without spaces, which some cache backends (e.g., memcached) reject in keys.
+    """
+    range_key = [f'{name}={kwargs[name].isoformat() if hasattr(kwargs[name], "isoformat") else kwargs[name]}'
+                 for name in sorted(kwargs) if name != 'pk']
+    if params:
+        range_key += [f'{name}={params[name]}' for name in sorted(params)]
+    return range_key
+
+
+def series_params(request, kind):
+    """ Returns the query parameters of a report chart that change its payload, normalized for its cache key: the
+    max_points and format of the SERIES_CHARTS (an unknown format is answered with a 400, so never cached) and none
+    for the other charts.
+    """
+    if kind not in SERIES_CHARTS:
+        return None
+    chart_format = request.GET.get('format', 'points')
+    return {'format': chart_format if chart_format in CHART_FORMATS else None,
+            'max_points': return_max_points(request)}
+
+
+def cached_report_json(kind):
+    """ Decorates the get method of a user plot view so that its JSON payload is served from REPORT_CACHE.
+
+    The range of the cache key is made of the url kwargs besides the user's pk (month/year or start/end dates) and,
+    for the SERIES_CHARTS, their normalized max_points and format.
+    Responses other than JSON (e.g., redirects to add a missing monthly budget) are not cached.
+    """
+    def decorator(get):
+        @wraps(get)
+        def wrapper(view, request, *args, **kwargs):
+            key = REPORT_CACHE.make_key(kwargs['pk'], kind, report_range_key(kwargs, series_params(request, kind)),
+                                        User(pk=kwargs['pk']).return_report_version())
+            content = REPORT_CACHE.get(key)
+            if content is not None:
+                return HttpResponse(content, content_type='application/json')
+
+            response = get(view, request, *args, **kwargs)
+            if isinstance(response, JsonResponse) and response.status_code == 200:
+                REPORT_CACHE.set(key, response.content)
+            return response
+        return wrapper
+    return decorator
+
+
+def user_report_validator(request, kwargs):
+    """ Returns the validator parts and last modification of the plots of a user (kwargs['pk'])."""
+    version = User.objects.filter(pk=kwargs['pk']).values_list('report_version', 'report_updated').first()
+    if version is None:
+        return None, None
+    return (version[0],), version[1]
+
+
+def account_projection_validator(request, kwargs):
+    """ Returns the validator parts and last modification of the projection plots of an account (kwargs['pk']).
+
+    The projections depend on today's date as well as the account's ledger and its user.
+    """
+    version = Account.objects.filter(pk=kwargs['pk']).values_list('ledger_version', 'user__report_version',
+                                                                   'user__report_updated').first()
+    if version is None:
+        return None, None
+    today = timezone.localtime(now()).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (version[0], version[1], today.date()), max(version[2], today)
+
+
+def user_simulation_validator(request, kwargs):
+    """ Returns the validator parts and last modification of the seeded Monte Carlo plots of a user.
+
+    Simulations without a seed are random, so they are never validated.
+    """
+    if 'seed' not in request.GET:
+        return None, None
+    parts, last_modified = user_report_validator(request, kwargs)
+    if parts is None:
+        return None, None
+    today = timezone.localtime(now()).replace(hour=0, minute=0, second=0, microsecond=0)
+    return parts + (today.date(),), max(last_modified, today)
+
+
+def conditional_json(validator):
+    """ Decorates the get method of a plot view so that conditional requests are answered before building the payload.
+
+    validator(request, kwargs) returns the parts the payload depends on besides the request (e.g., the user's report
+    version) and its last modification, with a single cheap query. The ETag hashes them with the request's path and
+    query string. Requests whose If-None-Match (or If-Modified-Since) still matches get a 304 Not Modified.
+    Payloads whose validator returns None parts are always built.
+    """
+    def decorator(get):
+        @wraps(get)
+        def wrapper(view, request, *args, **kwargs):
+            parts, last_modified = validator(request, kwargs)
+            if parts is None:
+                return get(view, request, *args, **kwargs)
+
+            etag = quote_etag(hashlib.md5(repr((request.get_full_path(), parts)).encode()).hexdigest())
+            last_modified = timegm(last_modified.utctimetuple()) if last_modified else None
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is not None:
+                return response
+
+            response = get(view, request, *args, **kwargs)
+            if response.status_code == 200:
+                response['ETag'] = etag
+                if last_modified is not None:
+                    response['Last-Modified'] = http_date(last_modified)
+            return response
+        return wrapper
+    return decorator
+
+
+def return_max_points(request):
+    """ Returns the max_points query parameter of a time series plot, between 3 and MAX_POINTS_LIMIT
+    (DEFAULT_MAX_POINTS when missing or not a number).
+    """
+    try:
+        max_points = int(request.GET.get('max_points', DEFAULT_MAX_POINTS))
+    except ValueError:
+        max_points = DEFAULT_MAX_POINTS
+    return min(max(max_points, 3), MAX_POINTS_LIMIT)
+
+
+def chart_json_response(request, payload):
+    """ Returns the JsonResponse of a chart payload in the format set by ?format: 'points' (the default, read by
+    Chart.js directly) or 'columnar' (see finances.utils.columnar).
+    """
+    encoder = CHART_FORMATS.get(request.GET.get('format', 'points'))
+    if encoder is None:
+        return JsonResponse({'error': f'Unknown format {request.GET["format"]}'}, status=400)
+    return JsonResponse(payload, encoder=encoder)
+
+
+def cumulative_line_payload(title, label, color, days, cumulative, max_points=DEFAULT_MAX_POINTS):
+    """ Returns the line chart payload of a cumulative series (parallel lists of days and amounts).
+
+    Series longer than max_points are downsampled with LTTB, which keeps the shape of the curve.
+    """
+    x, y = lttb(dts_to_milliseconds_after_epoch(days), np.array(cumulative, dtype=float), max_points)
+
+    data = {
+        'datasets': [{
+            'label': label,
+            'backgroundColor': cjs.get_color(color, 0.5),
+            'borderColor': cjs.get_color(color),
+            'fill': False,
+            'data': XYSeries(x, y)
+        }]
+    }
+
+    return {'config': get_line_chart_config(title), 'data': data}
+
+
+def account_balance_payload(account, actual, projected):
+    """ Returns the line chart payload of the actual and projected balances (XYSeries) of an account."""
+    datasets = [
+        {
+            'label': 'Account Balance',
+            'backgroundColor': cjs.get_color('black', 0.5),
+            'borderColor': cjs.get_color('black'),
+            'fill': False,
+            'data': actual
+        },
+        {
+            'label': 'Projected Account Balance',
+            'backgroundColor': cjs.get_color('green', 0.5),
+            'borderColor': cjs.get_color('green'),
+            'fill': False,
+            'data': projected
+        },
+    ]
+
+    return {'config': get_line_chart_config(f'{account.name} Account Balance vs Time'), 'data': {'datasets': datasets}}
+
+
+def cached_spending_breakdown(user, start_date, end_date):
+    """ Returns the spending breakdown of the user (see User.return_spending_breakdown) from REPORT_CACHE, so the top
+    category, description and location plots of a date range share a single query.
+    """
+    range_key = report_range_key({'start_date': start_date, 'end_date': end_date})
+    key = REPORT_CACHE.make_key(user.pk, 'spending_breakdown', range_key, user.report_version)
+    return REPORT_CACHE.get_or_compute(key, lambda: user.return_spending_breakdown(start_date, end_date))
+
+
+def top_items_payload(name, dimension, breakdown):
+    """ Returns the bar chart payload of the top expenses of a dimension of a spending breakdown. The expenses outside
+    of the top ones are added up in an 'Other' bar.
+    """
+    top_items = breakdown[dimension]
+    labels = [top_item[dimension] for top_item in top_items.top]
+    data_sum = [top_item['sum'] for top_item in top_items.top]
+    if top_items.other > 0:
+        labels.append('Other')
+        data_sum.append(top_items.other)
+
+    config = get_bar_chart_config(name)
+    config['data'] = {
+        'labels': labels,
+        'datasets': [{
+            'label': 'Total',
+            'data': data_sum,
+            'borderColor': cjs.get_color('black'),
+            'backgroundColor': cjs.get_color('black', 0.5)
+        }]
+    }
+
+    return config
+
+
 def get_pie_chart_config(name):
     """Returns the configuration for a pie chart minus the data using chart.js"""
     config = {}
@@ -126,6 +359,8 @@ class ExpenseSpentAndBudgetPlotView(DetailView):
         self.user = User.objects.get(pk=userpk)
         return super().dispatch(request, *args, **kwargs)
 
+    @conditional_json(user_report_validator)
+    @cached_report_json('budget_vs_spent')
     def get(self, request, *args, **kwargs):
         config = get_bar_chart_config('Budgeted vs. Spent')
         data = dict()
@@ -172,31 +407,12 @@ class ExpenseByCategoryPlotView(DetailView):
         self.user = User.objects.get(pk=userpk)
         return super().dispatch(request, *args, **kwargs)
 
+    @conditional_json(user_report_validator)
+    @cached_report_json('top_category')
     def get(self, request, *args, **kwargs):
-        config = get_bar_chart_config('Expenses by Category')
-        data = dict()
-        top_5cat = self.user.return_top_category(self.month, self.year, 5)
-
-        labels = list()
-        data_sum = list()
-        for topcat in top_5cat:
-            labels.append(topcat['category'])
-            data_sum.append(topcat['sum'])
-
-        data['labels'] = labels
-        datasets = list()
-        cat_sum = {
-            'label': 'Total',
-            'data': data_sum,
-            'borderColor': cjs.get_color('black'),
-            'backgroundColor': cjs.get_color('black', 0.5)
-        }
-        datasets.append(cat_sum)
-
-        data['datasets'] = datasets
-        config['data'] = data
-
-        return JsonResponse(config)
+        beg_of_month = datetime.strptime(f'{self.month}, 1, {self.year}', '%B, %d, %Y')
+        breakdown = cached_spending_breakdown(self.user, beg_of_month, beg_of_month + relativedelta(months=+1))
+        return JsonResponse(top_items_payload('Expenses by Category', 'category', breakdown))
 
 
 class ExpenseByDescriptionPlotView(DetailView):
@@ -209,31 +425,12 @@ class ExpenseByDescriptionPlotView(DetailView):
         self.user = User.objects.get(pk=userpk)
         return super().dispatch(request, *args, **kwargs)
 
+    @conditional_json(user_report_validator)
+    @cached_report_json('top_description')
     def get(self, request, *args, **kwargs):
-        config = get_bar_chart_config('Expenses by Description')
-        data = dict()
-        top_5desc = self.user.return_top_description(self.month, self.year, 5)
-
-        labels = list()
-        data_sum = list()
-        for topdesc in top_5desc:
-            labels.append(topdesc['description'])
-            data_sum.append(topdesc['sum'])
-
-        data['labels'] = labels
-        datasets = list()
-        desc_sum = {
-            'label': 'Total',
-            'data': data_sum,
-            'borderColor': cjs.get_color('black'),
-            'backgroundColor': cjs.get_color('black', 0.5)
-        }
-        datasets.append(desc_sum)
-
-        data['datasets'] = datasets
-        config['data'] = data
-
-        return JsonResponse(config)
+        beg_of_month = datetime.strptime(f'{self.month}, 1, {self.year}', '%B, %d, %Y')
+        breakdown = cached_spending_breakdown(self.user, beg_of_month, beg_of_month + relativedelta(months=+1))
+        return JsonResponse(top_items_payload('Expenses by Description', 'description', breakdown))
 
 
 class MonthlyBudgetByUserMonthYear(DetailView):
@@ -246,6 +443,8 @@ class MonthlyBudgetByUserMonthYear(DetailView):
         self.user = User.objects.get(pk=userpk)
         return super().dispatch(request, *args, **kwargs)
 
+    @conditional_json(user_report_validator)
+    @cached_report_json('monthly_budget_values')
     def get(self, request, *args, **kwargs):
         return_json = {'mandatory': 0.0,
                        'mortgage': 0.0,
@@ -274,31 +473,12 @@ class ExpenseByLocationPlotView(DetailView):
         self.user = User.objects.get(pk=userpk)
         return super().dispatch(request, *args, **kwargs)
 
+    @conditional_json(user_report_validator)
+    @cached_report_json('top_location')
     def get(self, request, *args, **kwargs):
-        config = get_bar_chart_config('Expenses by Location')
-        data = dict()
-        top_5loc = self.user.return_top_location(self.month, self.year, 5)
-
-        labels = list()
-        data_sum = list()
-        for toploc in top_5loc:
-            labels.append(toploc['location'])
-            data_sum.append(toploc['sum'])
-
-        data['labels'] = labels
-        datasets = list()
-        loc_sum = {
-            'label': 'Total',
-            'data': data_sum,
-            'borderColor': cjs.get_color('black'),
-            'backgroundColor': cjs.get_color('black', 0.5)
-        }
-        datasets.append(loc_sum)
-
-        data['datasets'] = datasets
-        config['data'] = data
-
-        return JsonResponse(config)
+        beg_of_month = datetime.strptime(f'{self.month}, 1, {self.year}', '%B, %d, %Y')
+        breakdown = cached_spending_breakdown(self.user, beg_of_month, beg_of_month + relativedelta(months=+1))
+        return JsonResponse(top_items_payload('Expenses by Location', 'location', breakdown))
 
 
 class IncomeCumulativeMonthYearPlotView(DetailView):
@@ -311,37 +491,17 @@ class IncomeCumulativeMonthYearPlotView(DetailView):
         self.user = User.objects.get(pk=userpk)
         return super().dispatch(request, *args, **kwargs)
 
+    @conditional_json(user_report_validator)
+    @cached_report_json('cumulative_income')
     def get(self, request, *args, **kwargs):
         start_date = datetime.strptime(f'{self.month}-01-{self.year}', '%B-%d-%Y')
         end_date = start_date + relativedelta(months=+1)
-        config = get_line_chart_config(f'Cumulative Incomes for {self.month}, {self.year}')
-        cumulative_income = self.user.return_cumulative_incomes(start_date, end_date)
-        return_dict = dict()
-        return_dict['config'] = config
-
-        xy_data = []
-        labels = []
-        for income_day in cumulative_income:
-            income_day_dt = datetime(income_day.year, income_day.month, income_day.day)
-            income_day_ts = dt_to_milliseconds_after_epoch(income_day_dt)
-            labels.append(income_day_ts)
-            xy_data.append(
-                {'x': income_day_ts, 'y': float(cumulative_income[income_day])})
-
-        data = {
-            'labels': labels,
-            'datasets': [{
-                'label': 'Cumulative Incomes',
-                'backgroundColor': cjs.get_color('green', 0.5),
-                'borderColor': cjs.get_color('green'),
-                'fill': False,
-                'data': xy_data
-            }]
-        }
+        days, cumulative = self.user.return_cumulative_series(start_date, end_date, 'income')
 
-        return_dict['data'] = data
+        payload = cumulative_line_payload(f'Cumulative Incomes for {self.month}, {self.year}', 'Cumulative Incomes',
+                                          'green', days, cumulative, return_max_points(request))
 
-        return JsonResponse(return_dict)
+        return chart_json_response(request, payload)
 
 
 class ExpenseCumulativeMonthYearPlotView(DetailView):
@@ -354,38 +514,17 @@ class ExpenseCumulativeMonthYearPlotView(DetailView):
         self.user = User.objects.get(pk=userpk)
         return super().dispatch(request, *args, **kwargs)
 
+    @conditional_json(user_report_validator)
+    @cached_report_json('cumulative_expense')
     def get(self, request, *args, **kwargs):
         start_date = datetime.strptime(f'{self.month}-01-{self.year}', '%B-%d-%Y')
         end_date = start_date + relativedelta(months=+1)
-        config = get_line_chart_config(f'Cumulative Expenses for {self.month}, {self.year}')
-        cumulative_expenses = self.user.return_cumulative_expenses(start_date, end_date)
+        days, cumulative = self.user.return_cumulative_series(start_date, end_date, 'expense')
 
-        return_dict = dict()
-        return_dict['config'] = config
+        payload = cumulative_line_payload(f'Cumulative Expenses for {self.month}, {self.year}', 'Cumulative Expenses',
+                                          'red', days, cumulative, return_max_points(request))
 
-        xy_data = []
-        labels = []
-        for expensedate in cumulative_expenses:
-            expensedate_dt = datetime(expensedate.year, expensedate.month,expensedate.day)
-            expensedate_ts = dt_to_milliseconds_after_epoch(expensedate_dt)
-            labels.append(expensedate_ts)
-            xy_data.append(
-                {'x': expensedate_ts, 'y': float(cumulative_expenses[expensedate])})
-
-        data = {
-            'labels': labels,
-            'datasets': [{
-                'label': 'Cumulative Expenses',
-                'backgroundColor': cjs.get_color('red', 0.5),
-                'borderColor': cjs.get_color('red'),
-                'fill': False,
-                'data': xy_data
-            }]
-        }
-
-        return_dict['data'] = data
-
-        return JsonResponse(return_dict)
+        return chart_json_response(request, payload)
 
 
 class TotalCumulativeMonthYearPlotView(DetailView):
@@ -398,38 +537,17 @@ class TotalCumulativeMonthYearPlotView(DetailView):
         self.user = User.objects.get(pk=userpk)
         return super().dispatch(request, *args, **kwargs)
 
+    @conditional_json(user_report_validator)
+    @cached_report_json('cumulative_total')
     def get(self, request, *args, **kwargs):
         start_date = datetime.strptime(f'{self.month}-01-{self.year}', '%B-%d-%Y')
         end_date = start_date + relativedelta(months=+1)
-        config = get_line_chart_config(f'Cumulative Total for {self.month}, {self.year}')
-        cumulative_total = self.user.return_cumulative_total(start_date, end_date)
-
-        return_dict = dict()
-        return_dict['config'] = config
-
-        xy_data = []
-        labels = []
-        for date_key in sorted(cumulative_total.keys()):
-            date_dt = datetime(date_key.year, date_key.month, date_key.day)
-            date_ts = dt_to_milliseconds_after_epoch(date_dt)
-            labels.append(date_ts)
-            xy_data.append(
-                {'x': date_ts, 'y': float(cumulative_total[date_key]['cumulative'])})
+        days, cumulative = self.user.return_cumulative_series(start_date, end_date, 'total')
 
-        data = {
-            'labels': labels,
-            'datasets': [{
-                'label': 'Cumulative Total',
-                'backgroundColor': cjs.get_color('red', 0.5),
-                'borderColor': cjs.get_color('red'),
-                'fill': False,
-                'data': xy_data
-            }]
-        }
+        payload = cumulative_line_payload(f'Cumulative Total for {self.month}, {self.year}', 'Cumulative Total', 'red',
+                                          days, cumulative, return_max_points(request))
 
-        return_dict['data'] = data
-
-        return JsonResponse(return_dict)
+        return chart_json_response(request, payload)
 
 
 class MonthlyBudgetPlotView(DetailView):
@@ -442,6 +560,8 @@ class MonthlyBudgetPlotView(DetailView):
         self.user = User.objects.get(pk=userpk)
         return super().dispatch(request, *args, **kwargs)
 
+    @conditional_json(user_report_validator)
+    @cached_report_json('monthly_budget')
     def get(self, request, *args, **kwargs):
         try:
             mb = MonthlyBudget.objects.get(user=self.user, month=self.month, year=self.year)
@@ -477,6 +597,8 @@ class ActualExpensesByBudgetGroup(DetailView):
         self.user = User.objects.get(pk=userpk)
         return super().dispatch(request, *args, **kwargs)
 
+    @conditional_json(user_report_validator)
+    @cached_report_json('actual_by_budget_group')
     def get(self, request, *args, **kwargs):
         mand_act, mort_act, dgr_act, disc_act, stat_act = self.user.return_tot_expenses_by_budget_month_year(self.month,
                                                                                                              self.year)
@@ -512,72 +634,19 @@ class CheckingAccountBalanceByTime(DetailView):
         self.account = CheckingAccount.objects.get(pk=accountpk)
         return super().dispatch(request, *args, **kwargs)
 
+    @conditional_json(account_projection_validator)
     def get(self, request, *args, **kwargs):
-        user = self.account.user
-
-        config = get_line_chart_config(f'{self.account.name} Account Balance vs Time')
-        return_dict = dict()
-        return_dict['config'] = config
-
-        xy_actual = []
-        labels_actual = []
-        xy_projected = []
-        labels = []
-        datasets = []
-
         today = now()
-
         one_year_prior = today + relativedelta(years=-1)
-        five_years_from_today = today + relativedelta(years=+5)
-
-        current_date = one_year_prior
-        while current_date <= today:
-            current_date_ts = dt_to_milliseconds_after_epoch(current_date)
-            month = current_date.strftime('%B')
-            year = current_date.strftime('%Y')
-            current_balance = self.account.return_balance_up_to_month_year(month, year)
-            xy_actual.append({'x': current_date_ts, 'y': current_balance})
-            labels_actual.append(current_date_ts)
-            current_date += relativedelta(months=+1)
-
-        datasets.append({
-            'label': 'Account Balance',
-            'backgroundColor': cjs.get_color('black', 0.5),
-            'borderColor': cjs.get_color('black'),
-            'fill': False,
-            'data': xy_actual
-            }
-        )
-
-        f = self.account.return_value_vs_time_function()
-
-        current_date = today
-
-        while current_date <= five_years_from_today:
-            current_date_ts = dt_to_milliseconds_after_epoch(current_date)
-            current_balance = float(f(current_date_ts))
-            xy_projected.append({'x': current_date_ts, 'y': current_balance})
-            labels_actual.append(current_date_ts)
-
-            current_date = current_date + relativedelta(years=+1)
-
-        datasets.append({
-            'label': 'Projected Account Balance',
-            'backgroundColor': cjs.get_color('green', 0.5),
-            'borderColor': cjs.get_color('green'),
-            'fill': False,
-            'data': xy_projected
-        }
-        )
-
-        data = {
-            'labels': labels,
-            'datasets': datasets
-        }
+        dates, balances = self.account.balance_series(one_year_prior, today)
 
-        return_dict['data'] = data
+        # Yearly up to five years from today
+        projected_dates = [today + relativedelta(years=+i) for i in range(6)]
+        projected_balances = self.account.estimate_balances(projected_dates)
 
-        return JsonResponse(return_dict)
+        return chart_json_response(request, account_balance_payload(
+            self.account, XYSeries(datetime64_to_milliseconds_after_epoch(dates), balances),
+            XYSeries(dts_to_milliseconds_after_epoch(projected_dates), projected_balances)))
 
 
 class RetirementAccountBalanceByTime(DetailView):
@@ -592,63 +661,70 @@ class RetirementAccountBalanceByTime(DetailView):
         self.account = RetirementAccount.objects.get(pk=accountpk)
         return super().dispatch(request, *args, **kwargs)
 
+    @conditional_json(account_projection_validator)
     def get(self, request, *args, **kwargs):
+        today = now()
+        one_year_prior = today + relativedelta(years=-1)
+        dates, balances = self.account.balance_series(one_year_prior, today)
 
-        config = get_line_chart_config(f'{self.account.name} Account Balance vs Time')
-        return_dict = dict()
-        return_dict['config'] = config
+        # Yearly up to five years from today
+        projected_dates = [today + relativedelta(years=+i) for i in range(6)]
+        projected_balances = self.account.estimate_balances(projected_dates)
 
-        xy_actual = []
-        labels_actual = []
-        xy_projected = []
-        labels = []
-        datasets = []
+        return chart_json_response(request, account_balance_payload(
+            self.account, XYSeries(datetime64_to_milliseconds_after_epoch(dates), balances),
+            XYSeries(dts_to_milliseconds_after_epoch(projected_dates), projected_balances)))
 
-        today = now()
 
-        one_year_prior = today + relativedelta(years=-1)
-        five_years_from_today = today + relativedelta(years=+5)
+class RetirementMonteCarloByTime(DetailView):
+    """ Returns a fan chart of the percentile bands of a Monte Carlo simulation of the user's retirement accounts.
 
-        current_date = one_year_prior
-        while current_date <= today:
-            current_date_ts = dt_to_milliseconds_after_epoch(current_date)
-            month = current_date.strftime('%B')
-            year = current_date.strftime('%Y')
-            current_balance = self.account.return_balance_up_to_month_year(month, year)
-            xy_actual.append({'x': current_date_ts, 'y': current_balance})
-            labels_actual.append(current_date_ts)
-            current_date += relativedelta(months=+1)
-
-        datasets.append({
-            'label': 'Account Balance',
-            'backgroundColor': cjs.get_color('black', 0.5),
-            'borderColor': cjs.get_color('black'),
-            'fill': False,
-            'data': xy_actual
-            }
-        )
+        Optional GET parameters: paths (default 10000, up to 100000), years (default 50, up to 100) and seed."""
+    model = User
 
-        f = self.account.return_value_vs_time_function(num_of_years=1, num_of_months=0,
-                                                       kind='cubic', fill_value='extrapolate', months_into_future=12)
+    MAX_PATHS = 100000
+    MAX_YEARS = 100
 
-        current_date = today
+    def dispatch(self, request, *args, **kwargs):
+        userpk = kwargs['pk']
+        self.user = User.objects.get(pk=userpk)
+        return super().dispatch(request, *args, **kwargs)
 
-        while current_date <= five_years_from_today:
-            current_date_ts = dt_to_milliseconds_after_epoch(current_date)
-            current_balance = float(f(current_date_ts))
-            xy_projected.append({'x': current_date_ts, 'y': current_balance})
-            labels_actual.append(current_date_ts)
+    @conditional_json(user_simulation_validator)
+    def get(self, request, *args, **kwargs):
+        try:
+            num_paths = min(max(int(request.GET.get('paths', 10000)), 1), self.MAX_PATHS)
+            num_years = min(max(int(request.GET.get('years', 50)), 1), self.MAX_YEARS)
+            seed = int(request.GET['seed']) if 'seed' in request.GET else None
+        except ValueError as error:
+            return HttpResponseBadRequest(f'Invalid simulation parameter: {error}')
 
-            current_date = current_date + relativedelta(years=+1)
+        start_date, result = self.user.estimate_retirement_monte_carlo(num_paths=num_paths, num_years=num_years,
+                                                                       seed=seed)
 
-        datasets.append({
-            'label': 'Projected Account Balance',
-            'backgroundColor': cjs.get_color('green', 0.5),
-            'borderColor': cjs.get_color('green'),
-            'fill': False,
-            'data': xy_projected
-        }
-        )
+        config = get_line_chart_config(f'{self.user.name} Retirement Simulation '
+                                       f'({result.success_probability * 100:.1f}% success)')
+        return_dict = dict()
+        return_dict['config'] = config
+        return_dict['success_probability'] = result.success_probability
+        return_dict['seed'] = result.seed
+
+        start_dt = datetime.combine(start_date, datetime.min.time())
+        labels = [dt_to_milliseconds_after_epoch(start_dt + relativedelta(months=int(month)))
+                  for month in result.months]
+
+        # Outer band (5th to 95th), inner band (25th to 75th) and the median. 'fill': '-1' fills to the dataset before
+        datasets = []
+        for percentile, color, fill in ((5, 'green', False), (95, 'green', '-1'), (25, 'blue', False),
+                                        (75, 'blue', '-1'), (50, 'black', False)):
+            datasets.append({
+                'label': f'{percentile}th Percentile',
+                'backgroundColor': cjs.get_color(color, 0.2),
+                'borderColor': cjs.get_color(color),
+                'pointRadius': 0,
+                'fill': fill,
+                'data': XYSeries(labels, result.bands[percentile], decimals=2)
+            })
 
         data = {
             'labels': labels,
@@ -657,14 +733,14 @@ class RetirementAccountBalanceByTime(DetailView):
 
         return_dict['data'] = data
 
-        return JsonResponse(return_dict)
+        return chart_json_response(request, return_dict)
 
 
 class DebtAccountBalanceByTime(DetailView):
-    """ Uses the balance vs time function to return
+    """ Uses the amortization schedule to return
         -line plot of
             actual balance vs time (of six months prior to last entry up to today) and,
-            projected value five years into the future."""
+            projected value five years into the future (or up to the payoff)."""
     model = DebtAccount
 
     def dispatch(self, request, *args, **kwargs):
@@ -672,71 +748,28 @@ class DebtAccountBalanceByTime(DetailView):
         self.account = DebtAccount.objects.get(pk=accountpk)
         return super().dispatch(request, *args, **kwargs)
 
+    @conditional_json(account_projection_validator)
     def get(self, request, *args, **kwargs):
-
-        config = get_line_chart_config(f'{self.account.name} Account Balance vs Time')
-        return_dict = dict()
-        return_dict['config'] = config
-
-        xy_actual = []
-        labels_actual = []
-        xy_projected = []
-        labels = []
-        datasets = []
-
         today = now()
-
         one_year_prior = today + relativedelta(years=-1)
-        five_years_from_today = today + relativedelta(years=+5)
+        dates, balances = self.account.balance_series(one_year_prior, today)
 
-        current_date = one_year_prior
-        while current_date <= today:
-            current_date_ts = dt_to_milliseconds_after_epoch(current_date)
-            month = current_date.strftime('%B')
-            year = current_date.strftime('%Y')
-            current_balance = self.account.return_balance_up_to_month_year(month, year)
-            xy_actual.append({'x': current_date_ts, 'y': current_balance})
-            labels_actual.append(current_date_ts)
-            current_date += relativedelta(months=+1)
-
-        datasets.append({
-            'label': 'Account Balance',
-            'backgroundColor': cjs.get_color('black', 0.5),
-            'borderColor': cjs.get_color('black'),
-            'fill': False,
-            'data': xy_actual
-            }
-        )
+        # Every three months up to five years from today (or until the debt is paid off)
+        schedule = self.account.amortization_schedule(max_periods=60)
+        projected_idx = sorted(set(range(0, len(schedule.dates), 3)) | {len(schedule.dates) - 1})
 
-        current_date = today
+        return chart_json_response(request, account_balance_payload(
+            self.account, XYSeries(datetime64_to_milliseconds_after_epoch(dates), balances),
+            XYSeries(datetime64_to_milliseconds_after_epoch(schedule.dates[projected_idx]),
+                     schedule.balances[projected_idx])))
 
-        while current_date <= five_years_from_today:
-            current_date_ts = dt_to_milliseconds_after_epoch(current_date)
-            current_balance = self.account.estimate_balance_dt(current_date)
-            xy_projected.append({'x': current_date_ts, 'y': current_balance})
-            labels_actual.append(current_date_ts)
-            if current_balance <= 0.0:
-                break
 
-            current_date = current_date + relativedelta(months=+3)
+class ReportJobStatus(DetailView):
+    """ Returns the status and progress of a background report job (see ReportService.submit)."""
+    model = ReportJob
 
-        datasets.append({
-            'label': 'Projected Account Balance',
-            'backgroundColor': cjs.get_color('green', 0.5),
-            'borderColor': cjs.get_color('green'),
-            'fill': False,
-            'data': xy_projected
-        }
-        )
-
-        data = {
-            'labels': labels,
-            'datasets': datasets
-        }
-
-        return_dict['data'] = data
-
-        return JsonResponse(return_dict)
+    def get(self, request, *args, **kwargs):
+        return JsonResponse(self.get_object().as_status())
 
 
 class UserReportDataCustom(DetailView):
@@ -744,33 +777,49 @@ class UserReportDataCustom(DetailView):
     model = User
 
 
-class MonthlyBudgetCustomPlotView(DetailView):
-    model = User
+class UserDashboard:
+    """ Builds the Chart.js payloads of the user report charts over a date range (the end date is exclusive).
 
-    def get(self, request, *args, **kwargs):
-        user = User.objects.get(pk=kwargs['pk'])
-        start_date = kwargs['start_date']
-        end_date = kwargs['end_date']
+    The base aggregates (budgets, expenses by budget group, spending breakdown) are queried lazily, once, and shared by
+    all the charts that use them. Each cumulative series takes a single windowed query
+    (see User.return_cumulative_series).
+    The cumulative series are downsampled to max_points.
+    """
+    CHARTS = ('monthly_budget', 'actual_by_budget_group', 'budget_vs_spent', 'top_category', 'top_description',
+              'top_location', 'cumulative_expense', 'cumulative_income', 'cumulative_total')
+
+    def __init__(self, user, start_date, end_date, max_points=DEFAULT_MAX_POINTS):
+        self.user = user
+        self.start_date = start_date
+        self.end_date = end_date
+        self.max_points = max_points
 
-        config = get_pie_chart_config(f'Monthly Budgets from {start_date.strftime("%B %d, %Y")} to {end_date.strftime("%B %d, %Y")}')
+    @cached_property
+    def budgets(self):
+        """ (statutory, mandatory, mortgage, debts/goals/retirement, discretionary) budgeted."""
+        return self.user.return_monthly_budgets(self.start_date, self.end_date)
 
-        stat_tot = 0.0
-        mand_tot = 0.0
-        mort_tot = 0.0
-        dgr_tot = 0.0
-        disc_tot = 0.0
+    @cached_property
+    def expenses_by_budget(self):
+        """ (mandatory, mortgage, debts/goals/retirement, discretionary, statutory) spent."""
+        return self.user.return_tot_expenses_by_budget_startdt_to_enddt(self.start_date, self.end_date)
 
-        mbs = MonthlyBudget.objects.filter(user=user, date__gte=start_date, date__lte=end_date)
-        stats = Statutory.objects.filter(user=user, date__gte=start_date, date__lte=end_date)
+    @cached_property
+    def spending_breakdown(self):
+        """ Top expenses by category, description and location."""
+        return cached_spending_breakdown(self.user, self.start_date, self.end_date)
 
-        for stat in stats:
-            stat_tot += stat.amount
+    def chart(self, name):
+        """ Returns the payload of the chart (one of CHARTS)."""
+        if name not in self.CHARTS:
+            raise ValueError(f'Unknown chart {name}')
+        return getattr(self, f'{name}_chart')()
 
-        for mb in mbs:
-            mand_tot += mb.mandatory
-            mort_tot += mb.mortgage
-            dgr_tot += mb.debts_goals_retirement
-            disc_tot += mb.discretionary
+    def date_range_text(self):
+        return f'{self.start_date.strftime("%B %d, %Y")} to {self.end_date.strftime("%B %d, %Y")}'
+
+    def monthly_budget_chart(self):
+        stat_tot, mand_tot, mort_tot, dgr_tot, disc_tot = self.budgets
 
         data = {
             'labels': ['Mandatory', 'Statutory', 'Mortgage', 'Debts, Goals, Retirement', 'Discretionary'],
@@ -784,24 +833,10 @@ class MonthlyBudgetCustomPlotView(DetailView):
             ]
         }
 
-        return_dict = dict()
-        return_dict['config'] = config
-        return_dict['data'] = data
-
-        return JsonResponse(return_dict)
-
+        return {'config': get_pie_chart_config(f'Monthly Budgets from {self.date_range_text()}'), 'data': data}
 
-class ActualExpenseByBudgetGroupCustomDates(DetailView):
-    model = User
-
-    def get(self, request, *args, **kwargs):
-        user = User.objects.get(pk=kwargs['pk'])
-        start_date = kwargs['start_date']
-        end_date = kwargs['end_date']
-
-        mand_act, mort_act, dgr_act, disc_act, stat_act = user.return_tot_expenses_by_budget_startdt_to_enddt(start_date, end_date)
-
-        config = get_pie_chart_config(f'Actual Expenses by Monthly Budget from {start_date.strftime("%B %d, %Y")} to {end_date.strftime("%B %d, %Y")}')
+    def actual_by_budget_group_chart(self):
+        mand_act, mort_act, dgr_act, disc_act, stat_act = self.expenses_by_budget
 
         data = {
             'labels': ['Mandatory', 'Statutory', 'Mortgage', 'Debts, Goals, Retirement', 'Discretionary'],
@@ -814,263 +849,186 @@ class ActualExpenseByBudgetGroupCustomDates(DetailView):
                 }
             ]
         }
-        return_dict = dict()
-        return_dict['data'] = data
-        return_dict['config'] = config
-
-        return JsonResponse(return_dict)
 
+        return {'data': data,
+                'config': get_pie_chart_config(f'Actual Expenses by Monthly Budget from {self.date_range_text()}')}
 
-class ExpenseSpentAndBudgetPlotViewCustomDates(DetailView):
-    model = User
+    def budget_vs_spent_chart(self):
+        stat_mb, mand_mb, mort_mb, dgr_mb, disc_mb = self.budgets
+        mand_exp, mort_exp, dgr_exp, disc_exp, stat_exp = self.expenses_by_budget
 
-    def get(self, request, *args, **kwargs):
-        user = User.objects.get(pk=kwargs['pk'])
-        start_date = kwargs['start_date']
-        end_date = kwargs['end_date']
         config = get_bar_chart_config('Budgeted vs. Spent')
-        data = dict()
-        labels = ['Mandatory', 'Mortgage', 'Statutory', 'Debts, Goals, Retirement', 'Discretionary']
-        data['labels'] = labels
-
-        stat_mb, mand_mb, mort_mb, dgr_mb, disc_mb = user.return_monthly_budgets(start_date, end_date)
-
-        mand_exp, mort_exp, dgr_exp, disc_exp, stat_exp = user.return_tot_expenses_by_budget_startdt_to_enddt(start_date, end_date)
-
-        datasets = list()
-        budgeted_info = {
-            'label': 'Budgeted',
-            'data': [mand_mb, mort_mb, stat_mb, dgr_mb, disc_mb],
-            'borderColor': cjs.get_color('red'),
-            'backgroundColor': cjs.get_color('red', 0.5)
+        config['data'] = {
+            'labels': ['Mandatory', 'Mortgage', 'Statutory', 'Debts, Goals, Retirement', 'Discretionary'],
+            'datasets': [
+                {
+                    'label': 'Budgeted',
+                    'data': [mand_mb, mort_mb, stat_mb, dgr_mb, disc_mb],
+                    'borderColor': cjs.get_color('red'),
+                    'backgroundColor': cjs.get_color('red', 0.5)
+                },
+                {
+                    'label': 'Actual',
+                    'data': [mand_exp, mort_exp, stat_exp, dgr_exp, disc_exp],
+                    'borderColor': cjs.get_color('blue'),
+                    'backgroundColor': cjs.get_color('blue', 0.5)
+                },
+            ]
         }
-        datasets.append(budgeted_info)
 
-        actual_info = {
-            'label': 'Actual',
-            'data': [mand_exp, mort_exp, stat_exp, dgr_exp, disc_exp],
-            'borderColor': cjs.get_color('blue'),
-            'backgroundColor': cjs.get_color('blue', 0.5)
-        }
-        datasets.append(actual_info)
+        return config
 
-        data['datasets'] = datasets
-        config['data'] = data
+    def top_items_chart(self, name, expense_filter):
+        return top_items_payload(name, expense_filter, self.spending_breakdown)
 
-        return JsonResponse(config)
+    def top_category_chart(self):
+        return self.top_items_chart('Top Expenses by Category', 'category')
 
+    def top_description_chart(self):
+        return self.top_items_chart('Top Expenses by Description', 'description')
 
-class ExpenseByCategoryPlotViewCustomDates(DetailView):
-    model = User
+    def top_location_chart(self):
+        return self.top_items_chart('Top Expenses by Location', 'location')
 
-    def get(self, request, *args, **kwargs):
-        user = User.objects.get(pk=kwargs['pk'])
-        start_date = kwargs['start_date']
-        end_date = kwargs['end_date']
-        config = get_bar_chart_config('Top Expenses by Category')
-        data = dict()
-        top5_cat = user.return_top_category_dt_to_dt(start_date, end_date, 5)
+    def cumulative_chart(self, name, label, color, series):
+        """ Returns the line chart payload of a cumulative series (downsampled to max_points)."""
+        days, cumulative = self.user.return_cumulative_series(self.start_date, self.end_date, series)
+        return cumulative_line_payload(f'{name} from {self.date_range_text()}', label, color, days, cumulative,
+                                       self.max_points)
 
-        labels = list()
-        data_sum = list()
-        for topcat in top5_cat:
-            labels.append(topcat['category'])
-            data_sum.append(topcat['sum'])
+    def cumulative_expense_chart(self):
+        return self.cumulative_chart('Cumulative Expenses', 'Cumulative Expenses', 'red', 'expense')
 
-        data['labels'] = labels
-        datasets = list()
-        cat_sum = {
-            'label': 'Total',
-            'data': data_sum,
-            'borderColor': cjs.get_color('black'),
-            'backgroundColor': cjs.get_color('black', 0.5)
-        }
-        datasets.append(cat_sum)
+    def cumulative_income_chart(self):
+        return self.cumulative_chart('Cumulative Incomes', 'Cumulative Incomes', 'green', 'income')
 
-        data['datasets'] = datasets
-        config['data'] = data
+    def cumulative_total_chart(self):
+        return self.cumulative_chart('Cumulative Total', 'Cumulative Total', 'red', 'total')
 
-        return JsonResponse(config)
 
+class UserDashboardData(DetailView):
+    """ Returns the payloads of the user report charts over a date range in one response: {chart: payload}.
 
-class ExpenseByDescriptionPlotViewCustomDates(DetailView):
+    ?charts=top_category,top_location limits the response to the listed charts (all of UserDashboard.CHARTS by
+    default), ?max_points caps the points of the cumulative series and ?format=columnar encodes them as columns.
+    Each chart is cached under the same key as its own plot view, so the two share their cached payloads.
+    """
+    model = User
 
+    @conditional_json(user_report_validator)
     def get(self, request, *args, **kwargs):
-        user = User.objects.get(pk=kwargs['pk'])
-        start_date = kwargs['start_date']
-        end_date = kwargs['end_date']
-        config = get_bar_chart_config('Top Expenses by Description')
-
-        data = dict()
-        top5_desc = user.return_top_description_dt_to_dt(start_date, end_date, num_of_entries=5)
+        charts = request.GET.get('charts')
+        charts = charts.split(',') if charts else UserDashboard.CHARTS
+        unknown = [chart for chart in charts if chart not in UserDashboard.CHARTS]
+        if unknown:
+            return JsonResponse({'error': f'Unknown charts: {", ".join(unknown)}'}, status=400)
+        if request.GET.get('format', 'points') not in CHART_FORMATS:
+            return JsonResponse({'error': f'Unknown format {request.GET["format"]}'}, status=400)
+
+        user = self.get_object()
+        dashboard = UserDashboard(user, kwargs['start_date'], kwargs['end_date'], return_max_points(request))
+        payloads = []
+        for chart in charts:
+            key = REPORT_CACHE.make_key(user.pk, chart, report_range_key(kwargs, series_params(request, chart)),
+                                        user.report_version)
+            content = REPORT_CACHE.get_or_compute(
+                key, lambda: chart_json_response(request, dashboard.chart(chart)).content)
+            payloads.append(b'"' + chart.encode() + b'": ' + content)
+
+        return HttpResponse(b'{' + b', '.join(payloads) + b'}', content_type='application/json')
 
-        labels = list()
-        data_sum = list()
-        for topdesc in top5_desc:
-            labels.append(topdesc['description'])
-            data_sum.append(topdesc['sum'])
 
-        data['labels'] = labels
-        datasets = list()
-        desc_sum = {
-            'label': 'Total',
-            'data': data_sum,
-            'borderColor': cjs.get_color('black'),
-            'backgroundColor': cjs.get_color('black', 0.5)
-        }
-        datasets.append(desc_sum)
-
-        data['datasets'] = datasets
-        config['data'] = data
+class MonthlyBudgetCustomPlotView(DetailView):
+    model = User
 
-        return JsonResponse(config)
+    @conditional_json(user_report_validator)
+    @cached_report_json('monthly_budget')
+    def get(self, request, *args, **kwargs):
+        user = User.objects.get(pk=kwargs['pk'])
+        return JsonResponse(UserDashboard(user, kwargs['start_date'], kwargs['end_date']).chart('monthly_budget'))
 
 
-class ExpenseByLocationPlotViewCustomDates(DetailView):
+class ActualExpenseByBudgetGroupCustomDates(DetailView):
+    model = User
 
+    @conditional_json(user_report_validator)
+    @cached_report_json('actual_by_budget_group')
     def get(self, request, *args, **kwargs):
         user = User.objects.get(pk=kwargs['pk'])
-        start_date = kwargs['start_date']
-        end_date = kwargs['end_date']
-        config = get_bar_chart_config('Top Expenses by Location')
+        return JsonResponse(UserDashboard(user, kwargs['start_date'], kwargs['end_date']).chart(
+            'actual_by_budget_group'))
 
-        top5_loc = user.return_top_location_dt_to_dt(start_date, end_date, num_of_entries=5)
-        labels = list()
-        data = dict()
-        data_sum = list()
-        for toploc in top5_loc:
-            labels.append(toploc['location'])
-            data_sum.append(toploc['sum'])
-
-        data['labels'] = labels
-        datasets = list()
-        loc_sum = {
-            'label': 'Total',
-            'data': data_sum,
-            'borderColor': cjs.get_color('black'),
-            'backgroundColor': cjs.get_color('black', 0.5)
-        }
-        datasets.append(loc_sum)
 
-        data['datasets'] = datasets
-        config['data'] = data
+class ExpenseSpentAndBudgetPlotViewCustomDates(DetailView):
+    model = User
 
-        return JsonResponse(config)
+    @conditional_json(user_report_validator)
+    @cached_report_json('budget_vs_spent')
+    def get(self, request, *args, **kwargs):
+        user = User.objects.get(pk=kwargs['pk'])
+        return JsonResponse(UserDashboard(user, kwargs['start_date'], kwargs['end_date']).chart('budget_vs_spent'))
 
 
-class IncomeCumulativeMonthYearPlotViewCustomDates(DetailView):
+class ExpenseByCategoryPlotViewCustomDates(DetailView):
     model = User
 
+    @conditional_json(user_report_validator)
+    @cached_report_json('top_category')
     def get(self, request, *args, **kwargs):
         user = User.objects.get(pk=kwargs['pk'])
-        start_date = kwargs['start_date']
-        end_date = kwargs['end_date']
-        config = get_line_chart_config(f'Cumulative Incomes from {start_date.strftime("%B %d, %Y")} to {end_date.strftime("%B %d, %Y")}')
-        cumulative_income = user.return_cumulative_incomes(start_date, end_date)
-
-        return_dict = dict()
-        return_dict['config'] = config
-
-        xy_data = []
-        labels = []
-        for income_day in cumulative_income:
-            income_day_dt = datetime(income_day.year, income_day.month, income_day.day)
-            income_day_ts = dt_to_milliseconds_after_epoch(income_day_dt)
-            labels.append(income_day_ts)
-            xy_data.append(
-                {'x': income_day_ts, 'y': float(cumulative_income[income_day])})
+        return JsonResponse(UserDashboard(user, kwargs['start_date'], kwargs['end_date']).chart('top_category'))
 
-        data = {
-            'labels': labels,
-            'datasets': [{
-                'label': 'Cumulative Incomes',
-                'backgroundColor': cjs.get_color('green', 0.5),
-                'borderColor': cjs.get_color('green'),
-                'fill': False,
-                'data': xy_data
-            }]
-        }
 
-        return_dict['data'] = data
+class ExpenseByDescriptionPlotViewCustomDates(DetailView):
 
-        return JsonResponse(return_dict)
+    @conditional_json(user_report_validator)
+    @cached_report_json('top_description')
+    def get(self, request, *args, **kwargs):
+        user = User.objects.get(pk=kwargs['pk'])
+        return JsonResponse(UserDashboard(user, kwargs['start_date'], kwargs['end_date']).chart('top_description'))
 
 
-class ExpenseCumulativeMonthYearPlotViewCustomDate(DetailView):
-    model = User
+class ExpenseByLocationPlotViewCustomDates(DetailView):
 
+    @conditional_json(user_report_validator)
+    @cached_report_json('top_location')
     def get(self, request, *args, **kwargs):
         user = User.objects.get(pk=kwargs['pk'])
-        start_date = kwargs['start_date']
-        end_date = kwargs['end_date']
+        return JsonResponse(UserDashboard(user, kwargs['start_date'], kwargs['end_date']).chart('top_location'))
 
-        config = get_line_chart_config(f'Cumulative Expenses from {start_date.strftime("%B %d, %Y")} to {end_date.strftime("%B %d, %Y")}')
-        cumulative_expenses = user.return_cumulative_expenses(start_date, end_date)
 
-        return_dict = dict()
-        return_dict['config'] = config
+class IncomeCumulativeMonthYearPlotViewCustomDates(DetailView):
+    model = User
 
-        xy_data = []
-        labels = []
-        for expensedate in cumulative_expenses:
-            expensedate_dt = datetime(expensedate.year, expensedate.month, expensedate.day)
-            expensedate_ts = dt_to_milliseconds_after_epoch(expensedate_dt)
-            labels.append(expensedate_ts)
-            xy_data.append(
-                {'x': expensedate_ts, 'y': float(cumulative_expenses[expensedate])})
+    @conditional_json(user_report_validator)
+    @cached_report_json('cumulative_income')
+    def get(self, request, *args, **kwargs):
+        user = User.objects.get(pk=kwargs['pk'])
+        return chart_json_response(request, UserDashboard(user, kwargs['start_date'], kwargs['end_date'],
+                                                          return_max_points(request)).chart('cumulative_income'))
 
-        data = {
-            'labels': labels,
-            'datasets': [{
-                'label': 'Cumulative Expenses',
-                'backgroundColor': cjs.get_color('red', 0.5),
-                'borderColor': cjs.get_color('red'),
-                'fill': False,
-                'data': xy_data
-            }]
-        }
 
-        return_dict['data'] = data
+class ExpenseCumulativeMonthYearPlotViewCustomDate(DetailView):
+    model = User
 
-        return JsonResponse(return_dict)
+    @conditional_json(user_report_validator)
+    @cached_report_json('cumulative_expense')
+    def get(self, request, *args, **kwargs):
+        user = User.objects.get(pk=kwargs['pk'])
+        return chart_json_response(request, UserDashboard(user, kwargs['start_date'], kwargs['end_date'],
+                                                          return_max_points(request)).chart('cumulative_expense'))
 
 
 class TotalCumulativeMonthYearPlotViewCustomDates(DetailView):
     model = User
 
+    @conditional_json(user_report_validator)
+    @cached_report_json('cumulative_total')
     def get(self, request, *args, **kwargs):
         user = User.objects.get(pk=kwargs['pk'])
-        start_date = kwargs['start_date']
-        end_date = kwargs['end_date']
-        config = get_line_chart_config(f'Cumulative Total from {start_date.strftime("%B %d, %Y")} to {end_date.strftime("%B %d, %Y")}')
-        cumulative_total = user.return_cumulative_total(start_date, end_date)
-
-        return_dict = dict()
-        return_dict['config'] = config
-
-        xy_data = []
-        labels = []
-        for date_key in sorted(cumulative_total.keys()):
-            date_dt = datetime(date_key.year, date_key.month, date_key.day)
-            date_ts = dt_to_milliseconds_after_epoch(date_dt)
-            labels.append(date_ts)
-            xy_data.append(
-                {'x': date_ts, 'y': float(cumulative_total[date_key]['cumulative'])})
+        return chart_json_response(request, UserDashboard(user, kwargs['start_date'], kwargs['end_date'],
+                                                          return_max_points(request)).chart('cumulative_total'))
 
-        data = {
-            'labels': labels,
-            'datasets': [{
-                'label': 'Cumulative Total',
-                'backgroundColor': cjs.get_color('red', 0.5),
-                'borderColor': cjs.get_color('red'),
-                'fill': False,
-                'data': xy_data
-            }]
-        }
-
-        return_dict['data'] = data
-
-        return JsonResponse(return_dict)
 
 class DebugView(TemplateView):
     template_name = 'finances/debug.html'
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+
+# Python Library Imports
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from threading import Lock
+from typing import NamedTuple
+
+# Other Imports
+from django.conf import settings
+from django.db import models, transaction, connection
+from django.db.models import Sum, Q, Value
+from django.utils import timezone
+from dateutil.relativedelta import relativedelta
+
+from finances.models import NetWorth, Withdrawal, Deposit, MonthlyBudget, Statutory, UserMonthlyRollup, ReportJob, \
+    BUDGET_GROUP_MANDATORY, BUDGET_GROUP_MORTGAGE, BUDGET_GROUP_DGR, BUDGET_GROUP_DISC
+from finances.utils.report_cache import ReportCache
+
+# Defined Functions:
+# ReportService.build - Aggregates the user report for a date range
+# ReportService.get - Returns the report for a date range from REPORT_CACHE
+# ReportService.get_all - Returns the report over all of the user's data from REPORT_CACHE
+# ReportService.is_long_range - Whether a report range should be built in the background
+# ReportService.projection_month - The month the projected net worth of a report range was computed in, if any
+# ReportService.submit - Enqueues (or returns the matching) background ReportJob
+# ReportService.run_job - Builds the report of a ReportJob and stores its result
+
+REPORT_CACHE = ReportCache('reports')
+
+# Reports spanning more days than this are built in the background
+REPORT_ASYNC_MIN_DAYS = getattr(settings, 'REPORT_ASYNC_MIN_DAYS', 3 * 365)
+# Pending/running jobs not updated for this long are considered lost (e.g., the process was restarted)
+REPORT_JOB_STALE_SECONDS = getattr(settings, 'REPORT_JOB_STALE_SECONDS', 15 * 60)
+
+_report_executor = None
+_report_executor_lock = Lock()
+
+
+class UserReport(NamedTuple):
+    """ Budget, spending, income and net worth totals of a user from start_date up to (not including) end_date."""
+    start_date: date
+    end_date: date
+    stat_total: float
+    mand_total: float
+    mort_total: float
+    dgr_total: float
+    disc_total: float
+    stat_exp: float
+    mand_exp: float
+    mort_exp: float
+    dgr_exp: float
+    disc_exp: float
+    income: float
+    start_net_worth: NetWorth
+    end_net_worth: NetWorth
+
+    @property
+    def takehome_pay(self):
+        return round(self.income - self.stat_exp, 2)
+
+    def as_context(self):
+        """ Returns the template variables of finances/user_report.html"""
+        return {
+            'stat_total': self.stat_total,
+            'mand_total': self.mand_total,
+            'mort_total': self.mort_total,
+            'dgr_total': self.dgr_total,
+            'disc_total': self.disc_total,
+            'stat_exp': self.stat_exp,
+            'mand_exp': self.mand_exp,
+            'mort_exp': self.mort_exp,
+            'dgr_exp': self.dgr_exp,
+            'disc_exp': self.disc_exp,
+            'leftover_statutory': round(self.stat_total - self.stat_exp, 2),
+            'leftover_mand': round(self.mand_total - self.mand_exp, 2),
+            'leftover_mort': round(self.mort_total - self.mort_exp, 2),
+            'leftover_dgr': round(self.dgr_total - self.dgr_exp, 2),
+            'leftover_disc': round(self.disc_total - self.disc_exp, 2),
+            'start_balance': self.start_net_worth.net_worth,
+            'end_balance': self.end_net_worth.net_worth,
+            'income': self.income,
+            'takehome_pay': self.takehome_pay,
+        }
+
+
+class ReportService:
+    """ Builds the user reports shown by the UserReport* views.
+
+    A report takes three queries whatever the date span:
+        the checking account withdrawals (by budget group) and deposits,
+        the statutory and monthly budgets,
+        the net worth at the start and end dates (see User.return_net_worth_at_dts).
+    Reports of whole months read the spending, income and statutory totals from the UserMonthlyRollups instead of
+    the ledger.
+
+    The views use get/get_all, which serve the reports from REPORT_CACHE keyed by the user's report_version.
+    """
+
+    @staticmethod
+    def get(user, start_date, end_date) -> UserReport:
+        """ Returns the UserReport from start_date up to (not including) end_date, building it on a cache miss."""
+        start_date = models.DateField().to_python(start_date)
+        end_date = models.DateField().to_python(end_date)
+        range_key = (start_date.isoformat(), end_date.isoformat()) + ReportService.projection_month(end_date)
+        key = REPORT_CACHE.make_key(user.pk, 'summary', range_key, user.return_report_version())
+
+        return REPORT_CACHE.get_or_compute(key, lambda: ReportService.build(user, start_date, end_date))
+
+    @staticmethod
+    def get_all(user) -> UserReport:
+        """ Returns the UserReport from the earliest up to (and including) the latest withdrawal/deposit of the user.
+
+        A cache hit takes a single query (the report version), as the date range is cached with the report. The range
+        (and so whether its net worth is projected) is only known once built, so the key always includes the month.
+        """
+        def build_all():
+            start_date, end_date = user.get_earliest_latest_dates()
+            return ReportService.build(user, start_date, end_date + timedelta(days=1))
+
+        key = REPORT_CACHE.make_key(user.pk, 'summary', ('all', timezone.localdate().strftime('%Y-%m')),
+                                    user.return_report_version())
+
+        return REPORT_CACHE.get_or_compute(key, build_all)
+
+    @staticmethod
+    def is_long_range(start_date, end_date):
+        """ Returns whether the report from start_date to end_date should be built by a background ReportJob."""
+        return (end_date - start_date).days > REPORT_ASYNC_MIN_DAYS
+
+    @staticmethod
+    def projection_month(end_date):
+        """ Returns (today's month,) when the report up to end_date projects its end net worth (end_date is past the
+        current month, see User.return_net_worth_at_dts), else ().
+
+        The projection starts from next month, so it changes when the month rolls over while the ledger (and the
+        report version) may not. The month is added to the cache key of such reports.
+        """
+        today = timezone.localdate()
+        if end_date < today.replace(day=1) + relativedelta(months=+1):
+            return ()
+        return (today.strftime('%Y-%m'),)
+
+    @staticmethod
+    def submit(user, start_date, end_date, kind='summary') -> ReportJob:
+        """ Enqueues a ReportJob for the report from start_date up to (not including) end_date and returns it.
+
+        Returns the existing job instead if one for the same user, range and report version is pending, running or
+        done. With REPORT_JOBS_ALWAYS_EAGER set, the job is run before returning.
+        """
+        start_date = models.DateField().to_python(start_date)
+        end_date = models.DateField().to_python(end_date)
+        report_version = user.return_report_version()
+        stale = timezone.now() - timedelta(seconds=REPORT_JOB_STALE_SECONDS)
+
+        with transaction.atomic():
+            jobs = ReportJob.objects.select_for_update().filter(user=user, kind=kind, start_date=start_date,
+                                                                end_date=end_date, report_version=report_version)
+            done = Q(status=ReportJob.STATUS_DONE)
+            if ReportService.projection_month(end_date):
+                # Projected before this month, so stale
+                done &= Q(created__gte=timezone.localtime().replace(day=1, hour=0, minute=0, second=0, microsecond=0))
+            job = jobs.filter(done | Q(status__in=ReportJob.ACTIVE_STATUSES, updated__gte=stale)).order_by(
+                '-created').first()
+            if job is not None:
+                return job
+
+            # Results of older ledgers are never served again
+            ReportJob.objects.filter(user=user, report_version__lt=report_version).exclude(
+                status__in=ReportJob.ACTIVE_STATUSES).delete()
+            job = ReportJob.objects.create(user=user, kind=kind, start_date=start_date, end_date=end_date,
+                                           report_version=report_version)
+            if not getattr(settings, 'REPORT_JOBS_ALWAYS_EAGER', False):
+                transaction.on_commit(lambda: ReportService._executor().submit(ReportService._run_in_worker, job.pk))
+
+        if getattr(settings, 'REPORT_JOBS_ALWAYS_EAGER', False):
+            ReportService.run_job(job.pk)
+            job.refresh_from_db()
+
+        return job
+
+    @staticmethod
+    def run_job(job_id):
+        """ Builds the report of the ReportJob, saving its progress, and stores the template variables as the result."""
+        job = ReportJob.objects.select_related('user').get(pk=job_id)
+        job.set_progress(0.0, ReportJob.STATUS_RUNNING)
+        try:
+            report = ReportService.build(job.user, job.start_date, job.end_date,
+                                         progress=lambda fraction: job.set_progress(0.95 * fraction))
+        except Exception as error:
+            job.set_progress(job.progress, ReportJob.STATUS_FAILED, error=f'{type(error).__name__}: {error}')
+            return job
+
+        job.set_progress(1.0, ReportJob.STATUS_DONE, result=report.as_context())
+        return job
+
+    @staticmethod
+    def _run_in_worker(job_id):
+        try:
+            ReportService.run_job(job_id)
+        finally:
+            # The worker threads have their own connections, which Django only closes for the request threads
+            connection.close()
+
+    @staticmethod
+    def _executor():
+        global _report_executor
+        with _report_executor_lock:
+            if _report_executor is None:
+                _report_executor = ThreadPoolExecutor(max_workers=getattr(settings, 'REPORT_JOB_WORKERS', 2),
+                                                      thread_name_prefix='report-job')
+            return _report_executor
+
+    @staticmethod
+    def build(user, start_date, end_date, progress=None) -> UserReport:
+        """ Returns the UserReport of the user from start_date up to (not including) end_date (dates or datetimes).
+
+        progress is called with the completed fraction after each step, if given.
+        """
+        start_date = models.DateField().to_python(start_date)
+        end_date = models.DateField().to_python(end_date)
+
+        if start_date.day == 1 and end_date.day == 1:
+            spending, budgeted = ReportService._rollup_totals(user, start_date, end_date)
+        else:
+            spending, budgeted = ReportService._ledger_totals(user, start_date, end_date)
+        if progress is not None:
+            progress(0.5)
+
+        tzinfo = timezone.get_current_timezone()
+        start_net_worth, end_net_worth = user.return_net_worth_at_dts(
+            [datetime.combine(start_date, datetime.min.time(), tzinfo=tzinfo),
+             datetime.combine(end_date, datetime.min.time(), tzinfo=tzinfo)])
+        if progress is not None:
+            progress(1.0)
+
+        return UserReport(start_date, end_date,
+                          budgeted['stat'], budgeted['mand'], budgeted['mort'], budgeted['dgr'], budgeted['disc'],
+                          budgeted['stat'], spending['mand'], spending['mort'], spending['dgr'], spending['disc'],
+                          spending['income'], start_net_worth, end_net_worth)
+
+    @staticmethod
+    def _rollup_totals(user, start_date, end_date):
+        """ Returns the spending and budgeted totals of whole months from the UserMonthlyRollups (two queries)."""
+        rollup = UserMonthlyRollup.return_totals(user.pk, start_date, end_date)
+        spending = {'mand': rollup['mandatory'], 'mort': rollup['mortgage'], 'dgr': rollup['debts_goals_retirement'],
+                    'disc': rollup['discretionary'], 'income': rollup['income']}
+
+        budgets = MonthlyBudget.objects.filter(user=user, date__gte=start_date, date__lt=end_date).aggregate(
+            mand=Sum('mandatory'), mort=Sum('mortgage'), dgr=Sum('debts_goals_retirement'), disc=Sum('discretionary'))
+        budgeted = {column: round(float(total or 0.0), 2) for column, total in budgets.items()}
+        budgeted['stat'] = rollup['statutory']
+
+        return spending, budgeted
+
+    @staticmethod
+    def _ledger_totals(user, start_date, end_date):
+        """ Returns the spending and budgeted totals between any dates from the ledger (two queries)."""
+        zero = Value(0.0, output_field=models.FloatField())
+
+        # Checking account spending by budget group and income
+        checking = Q(account__user=user, account__checkingaccount__isnull=False, date__gte=start_date,
+                     date__lt=end_date)
+        expenses = Withdrawal.objects.filter(checking).values('account__user').annotate(
+            mand=Sum('amount', filter=Q(budget_group__contains=BUDGET_GROUP_MANDATORY)),
+            mort=Sum('amount', filter=Q(budget_group__contains=BUDGET_GROUP_MORTGAGE)),
+            dgr=Sum('amount', filter=Q(budget_group__contains=BUDGET_GROUP_DGR)),
+            disc=Sum('amount', filter=Q(budget_group__contains=BUDGET_GROUP_DISC)),
+            income=zero)
+        incomes = Deposit.objects.filter(checking).values('account__user').annotate(
+            mand=zero, mort=zero, dgr=zero, disc=zero, income=Sum('amount'))
+        spending = ReportService._sum_rows(expenses.order_by().union(incomes.order_by(), all=True),
+                                           ['mand', 'mort', 'dgr', 'disc', 'income'])
+
+        # Statutory and budgeted amounts
+        period = Q(user=user, date__gte=start_date, date__lt=end_date)
+        statutory = Statutory.objects.filter(period).values('user').annotate(
+            stat=Sum('amount'), mand=zero, mort=zero, dgr=zero, disc=zero)
+        budgets = MonthlyBudget.objects.filter(period).values('user').annotate(
+            stat=zero, mand=Sum('mandatory'), mort=Sum('mortgage'), dgr=Sum('debts_goals_retirement'),
+            disc=Sum('discretionary'))
+        budgeted = ReportService._sum_rows(statutory.order_by().union(budgets.order_by(), all=True),
+                                           ['stat', 'mand', 'mort', 'dgr', 'disc'])
+
+        return spending, budgeted
+
+    @staticmethod
+    def _sum_rows(rows, columns):
+        """ Adds up the given columns over the rows of a union query (rounded to cents)."""
+        totals = dict.fromkeys(columns, 0.0)
+        for row in rows:
+            for column in columns:
+                totals[column] += float(row[column] or 0.0)
+
+        return {column: round(total, 2) for column, total in totals.items()}
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+
+# Python Library Imports
+import re
+
+# Other Imports
+from django.db import connections
+from django.db.models import Q, Value, FloatField, ExpressionWrapper
+from django.db.models.functions import Greatest
+from django.db.models.expressions import RawSQL
+
+from finances.models import Withdrawal
+
+# Defined Functions:
+# install_search_indexes - Creates the full-text and trigram indexes of the withdrawals (run after migrate)
+# TransactionSearch - Ranked full-text/fuzzy search of the withdrawals by description, location and category
+
+SEARCH_FIELDS = ('description', 'location', 'category')
+# Weights of SEARCH_FIELDS in the SQLite ranking (bm25)
+SEARCH_WEIGHTS = (3.0, 2.0, 1.0)
+SEARCH_FTS_TABLE = 'finances_withdrawal_fts'
+
+
+
+def search_vector():
+    """ Returns the Postgres search document of a withdrawal. The queries use the same expression as the GIN index of
+    postgres_search_indexes for the planner to use it.
+    """
+    from django.contrib.postgres.search import SearchVector
+    return SearchVector(*SEARCH_FIELDS, config='simple')
+
+
+def postgres_search_indexes():
+    """ Returns the Postgres search indexes: a GIN index of the search document for the full-text matches and a
+    trigram GIN index per field for the fuzzy matches.
+    """
+    from django.contrib.postgres.indexes import GinIndex
+    table = Withdrawal._meta.db_table
+    indexes = [GinIndex(search_vector(), name=f'{table}_search_idx')]
+    indexes += [GinIndex(fields=[field], opclasses=['gin_trgm_ops'], name=f'{table}_{field}_trgm_idx')
+                for field in SEARCH_FIELDS]
+    return indexes
+
+
+def sqlite_index_sql():
+    """ Returns the statements creating the SQLite FTS5 index of the withdrawals, which triggers keep in sync with the
+    withdrawals table (including bulk and raw writes).
+    """
+    table = Withdrawal._meta.db_table
+    fields = ', '.join(SEARCH_FIELDS)
+    new_values = ', '.join(f'new.{field}' for field in SEARCH_FIELDS)
+    old_values = ', '.join(f'old.{field}' for field in SEARCH_FIELDS)
+    insert = f'INSERT INTO {SEARCH_FTS_TABLE}(rowid, {fields}) VALUES (new.id, {new_values});'
+    delete = (f"INSERT INTO {SEARCH_FTS_TABLE}({SEARCH_FTS_TABLE}, rowid, {fields}) "
+              f"VALUES ('delete', old.id, {old_values});")
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_FTS_TABLE} USING fts5({fields}, content='{table}', "
+        f"content_rowid='id')",
+        f'CREATE TRIGGER IF NOT EXISTS {SEARCH_FTS_TABLE}_insert AFTER INSERT ON {table} BEGIN {insert} END',
+        f'CREATE TRIGGER IF NOT EXISTS {SEARCH_FTS_TABLE}_delete AFTER DELETE ON {table} BEGIN {delete} END',
+        f'CREATE TRIGGER IF NOT EXISTS {SEARCH_FTS_TABLE}_update AFTER UPDATE ON {table} BEGIN {delete} {insert} END',
+    ]
+
+
+def install_search_indexes(using='default', **kwargs):
+    """ Creates the search indexes of the withdrawals on the database (connected to post_migrate).
+
+    Nothing is done until the withdrawals table exists, and only the missing indexes are created. The pg_trgm extension
+    is created only if missing, which requires a role allowed to create it. The SQLite index is filled from the
+    existing withdrawals when it is created. Other databases have no index and are searched with icontains.
+    """
+    connection = connections[using]
+    table = Withdrawal._meta.db_table
+    with connection.cursor() as cursor:
+        if table not in connection.introspection.table_names(cursor):
+            return
+        if connection.vendor == 'postgresql':
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            if cursor.fetchone() is None:
+                cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            existing = connection.introspection.get_constraints(cursor, table)
+            with connection.schema_editor() as schema_editor:
+                for index in postgres_search_indexes():
+                    if index.name not in existing:
+                        schema_editor.add_index(Withdrawal, index)
+        elif connection.vendor == 'sqlite':
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = %s", [SEARCH_FTS_TABLE])
+            created = cursor.fetchone() is None
+            for statement in sqlite_index_sql():
+                cursor.execute(statement)
+            if created:
+                cursor.execute(f"INSERT INTO {SEARCH_FTS_TABLE}({SEARCH_FTS_TABLE}) VALUES ('rebuild')")
+
+
+class TransactionSearch:
+    """ Ranked search of the withdrawals by description, location and category.
+
+    Postgres matches the words of the query (websearch syntax, e.g., '"gas station" -costco') against the full-text
+    index, or any field whose trigram similarity with the query is above pg_trgm.similarity_threshold, which
+    tolerates typos. The rank adds up the full-text rank and the best trigram similarity.
+    SQLite matches the words of the query as prefixes (e.g., 'groc' matches 'Groceries') against the FTS5 index and
+    ranks with bm25, weighting description over location over category.
+    Both use their indexes, so a search takes milliseconds whatever the size of the ledger.
+    """
+
+    def __init__(self, query, using='default'):
+        self.query = query.strip()
+        self.connection = connections[using]
+
+    def words(self):
+        return re.findall(r'\w+', self.query)
+
+    def filter(self, queryset):
+        """ Returns the withdrawals of the queryset matching the query."""
+        if not self.words():
+            return queryset
+
+        if self.connection.vendor == 'postgresql':
+            matches = Q(search_document=self.search_query())
+            for field in SEARCH_FIELDS:
+                matches |= Q(**{f'{field}__trigram_similar': self.query})
+            return queryset.alias(search_document=search_vector()).filter(matches)
+
+        if self.connection.vendor == 'sqlite':
+            table = self.connection.ops.quote_name(queryset.model._meta.db_table)
+            where = f'{table}.id IN (SELECT rowid FROM {SEARCH_FTS_TABLE} WHERE {SEARCH_FTS_TABLE} MATCH %s)'
+            return queryset.extra(where=[where], params=[self.fts_query()])
+
+        for word in self.words():
+            queryset = queryset.filter(
+                Q(description__icontains=word) | Q(location__icontains=word) | Q(category__icontains=word))
+        return queryset
+
+    def rank(self):
+        """ Returns the expression of the relevance of a withdrawal to the query (higher is better)."""
+        if self.connection.vendor == 'postgresql':
+            from django.contrib.postgres.search import SearchRank, TrigramSimilarity
+            similarity = Greatest(*(TrigramSimilarity(field, self.query) for field in SEARCH_FIELDS))
+            return ExpressionWrapper(SearchRank(search_vector(), self.search_query()) + similarity,
+                                     output_field=FloatField())
+
+        if self.connection.vendor == 'sqlite':
+            table = self.connection.ops.quote_name(Withdrawal._meta.db_table)
+            weights = ', '.join(str(weight) for weight in SEARCH_WEIGHTS)
+            return RawSQL(f'SELECT -bm25({SEARCH_FTS_TABLE}, {weights}) FROM {SEARCH_FTS_TABLE} '
+                          f'WHERE {SEARCH_FTS_TABLE} MATCH %s AND rowid = {table}.id', [self.fts_query()],
+                          output_field=FloatField())
+
+        return Value(0.0, output_field=FloatField())
+
+    def ranked(self, queryset):
+        """ Returns the withdrawals of the queryset matching the query, annotated with their rank and ordered by
+        relevance (then newest first).
+        """
+        if not self.words():
+            return queryset.order_by('-date', '-pk')
+        return self.filter(queryset).annotate(rank=self.rank()).order_by('-rank', '-date', '-pk')
+
+    def search_query(self):
+        """ Returns the Postgres full-text query of the query (websearch syntax)."""
+        from django.contrib.postgres.search import SearchQuery
+        return SearchQuery(self.query, config='simple', search_type='websearch')
+
+    def fts_query(self):
+        """ Returns the FTS5 MATCH expression of the query: every word as a prefix."""
+        return ' '.join(f'"{word}"*' for word in self.words())
@@ -2,8 +2,15 @@
 
 # Python Library Imports
 from django.test import TestCase
+from django.urls import reverse
+from django.utils.timezone import localtime
 
 # Other Imports
+from finances.models import User, CheckingAccount, DebtAccount, RetirementAccount, TradingAccount, Deposit, \
+    Withdrawal, AccountMonthlyBalance, PROJECTION_CACHE
+from datetime import date, datetime
+from dateutil.relativedelta import relativedelta
+import numpy as np
 
 class CheckingAccountTestCase(TestCase):
 
@@ -71,4 +78,256 @@ class RetirementAccountTestCase(TestCase):
         self.skipTest('Need to implement')
 
 
-# TODO: Add trading account tests
+class AccountMonthlyBalanceTestCase(TestCase):
+    """ Checks that the monthly snapshots give the same balances as summing the ledger."""
+
+    def setUp(self):
+        self.user = User.objects.create(name='TestUser', date_of_birth=date(1980, 1, 1))
+        self.account = CheckingAccount.objects.create(user=self.user, name='Test_Checking', starting_balance=100.0,
+                                                      opening_date=date(2022, 1, 1))
+        Deposit.objects.create(account=self.account, date=date(2022, 1, 15), description='Pay', amount=1000.0)
+        Withdrawal.objects.create(account=self.account, date=date(2022, 1, 31), description='Rent', amount=400.0)
+        Deposit.objects.create(account=self.account, date=date(2022, 3, 1), description='Pay', amount=1000.0)
+        Withdrawal.objects.create(account=self.account, date=date(2022, 3, 20), description='Food', amount=50.0)
+
+    def test_snapshots_created_on_save(self):
+        snapshots = AccountMonthlyBalance.objects.filter(account=self.account).order_by('month')
+        self.assertEqual([s.month for s in snapshots], [date(2022, 1, 1), date(2022, 3, 1)])
+        self.assertEqual([s.closing_balance for s in snapshots], [600.0, 1550.0])
+
+    def test_return_balance_up_to_dt(self):
+        self.assertEqual(self.account.return_balance_up_to_dt(date(2022, 1, 1)), 100.0)
+        self.assertEqual(self.account.return_balance_up_to_dt(date(2022, 1, 31)), 1100.0)
+        self.assertEqual(self.account.return_balance_up_to_dt(date(2022, 2, 1)), 700.0)
+        self.assertEqual(self.account.return_balance_up_to_dt(date(2022, 3, 20)), 1700.0)
+        self.assertEqual(self.account.return_balance_up_to_month_year('April', 2022), 1650.0)
+        self.assertEqual(self.account.return_balance_including_month_year('January', 2022), 700.0)
+
+    def test_edit_and_delete(self):
+        rent = Withdrawal.objects.get(account=self.account, description='Rent')
+        rent.date = date(2022, 2, 1)
+        rent.amount = 500.0
+        rent.save()
+        self.assertEqual(self.account.return_balance_up_to_month_year('February', 2022), 1100.0)
+        self.assertEqual(self.account.return_balance_up_to_month_year('March', 2022), 600.0)
+        self.assertEqual(self.account.return_balance_up_to_month_year('April', 2022), 1550.0)
+
+        Deposit.objects.get(account=self.account, date=date(2022, 1, 15)).delete()
+        self.assertEqual(self.account.return_balance_up_to_month_year('April', 2022), 550.0)
+
+    def test_rebuild_monthly_balances(self):
+        AccountMonthlyBalance.objects.all().delete()
+        self.assertEqual(self.account.return_balance_up_to_month_year('April', 2022), 1650.0)
+        self.assertEqual(self.account.rebuild_monthly_balances(), 2)
+        self.assertEqual(self.account.return_balance_up_to_month_year('April', 2022), 1650.0)
+
+    def test_first_snapshot_with_history(self):
+        # Entries written before the snapshots were built, then a new one in an earlier month than some of them
+        AccountMonthlyBalance.objects.all().delete()
+        Deposit.objects.create(account=self.account, date=date(2022, 1, 20), description='Gift', amount=50.0)
+        snapshots = AccountMonthlyBalance.objects.filter(account=self.account).order_by('month')
+        self.assertEqual([s.closing_balance for s in snapshots], [650.0, 1600.0])
+        self.assertEqual(self.account.return_balance_up_to_month_year('February', 2022), 750.0)
+        self.assertEqual(self.account.return_balance_up_to_month_year('April', 2022), 1700.0)
+
+    def test_balance_series(self):
+        with self.assertNumQueries(2):
+            dates, balances = self.account.balance_series(date(2021, 12, 15), date(2022, 5, 2))
+        self.assertEqual([str(d) for d in dates],
+                         ['2021-12-01', '2022-01-01', '2022-02-01', '2022-03-01', '2022-04-01', '2022-05-01'])
+        self.assertEqual(list(balances), [100.0, 100.0, 700.0, 700.0, 1650.0, 1650.0])
+
+        dates, balances = self.account.balance_series(date(2022, 1, 1), date(2022, 12, 1), freq='Q')
+        self.assertEqual(list(balances), [100.0, 1650.0, 1650.0, 1650.0])
+
+    def test_debt_account_balance(self):
+        debt = DebtAccount.objects.create(user=self.user, name='Test_Debt', starting_balance=1000.0,
+                                          opening_date=date(2022, 1, 1))
+        Deposit.objects.create(account=debt, date=date(2022, 1, 10), description='Payment', amount=300.0)
+        Withdrawal.objects.create(account=debt, date=date(2022, 2, 10), description='Charge', amount=50.0)
+        self.assertEqual(debt.return_balance_up_to_month_year('February', 2022), 700.0)
+        self.assertEqual(debt.return_balance_up_to_month_year('March', 2022), 750.0)
+        dates, balances = debt.balance_series(date(2022, 1, 1), date(2022, 3, 1))
+        self.assertEqual(list(balances), [1000.0, 700.0, 750.0])
+
+
+class ProjectionCacheTestCase(TestCase):
+    """ Checks that the fitted projections are reused until the ledger changes."""
+
+    def setUp(self):
+        PROJECTION_CACHE.clear()
+        self.user = User.objects.create(name='TestUser', date_of_birth=date(1980, 1, 1))
+        self.account = CheckingAccount.objects.create(user=self.user, name='Test_Checking', starting_balance=100.0,
+                                                      opening_date=date(2022, 1, 1))
+        Deposit.objects.create(account=self.account, date=date(2022, 1, 15), description='Pay', amount=1000.0)
+        Deposit.objects.create(account=self.account, date=date(2022, 3, 15), description='Pay', amount=1000.0)
+
+    def test_cache_hits_and_invalidation(self):
+        first = self.account.estimate_balance_dt(datetime(2022, 6, 1))
+        with self.assertNumQueries(1):
+            self.assertEqual(self.account.estimate_balance_dt(datetime(2022, 6, 1)), first)
+        self.assertEqual(PROJECTION_CACHE.info()['hits'], 1)
+        self.assertEqual(PROJECTION_CACHE.info()['misses'], 1)
+
+        # A new entry (or an account edit) bumps the ledger version and refits
+        Deposit.objects.create(account=self.account, date=date(2022, 4, 15), description='Bonus', amount=5000.0)
+        self.assertNotEqual(self.account.estimate_balance_dt(datetime(2022, 6, 1)), first)
+        self.account.starting_balance = 0.0
+        self.account.save()
+        self.account.estimate_balance_dt(datetime(2022, 6, 1))
+        self.assertEqual(PROJECTION_CACHE.info()['misses'], 3)
+
+        # Many dates share one fit
+        dts = [datetime(2022, month, 1) for month in range(4, 13)]
+        with self.assertNumQueries(1):
+            balances = self.account.estimate_balances(dts)
+        self.assertEqual([round(b, 6) for b in balances],
+                         [round(self.account.estimate_balance_dt(dt), 6) for dt in dts])
+
+        # Different fit parameters are cached separately
+        self.account.estimate_balance_dt(datetime(2022, 6, 1), num_of_months=3)
+        self.assertEqual(PROJECTION_CACHE.info()['misses'], 4)
+
+    def test_user_edit_refits(self):
+        # Retires in six months, so the retirement projections draw the balance down afterwards
+        today = localtime().date()
+        self.user.date_of_birth = today + relativedelta(years=-69, months=-6)
+        self.user.save()
+        retirement = RetirementAccount.objects.create(user=self.user, name='Test_401k', starting_balance=10000.0,
+                                                      monthly_interest_pct=0.5, yearly_withdrawal_rate=12.0,
+                                                      target_amount=1000000.0, opening_date=today.replace(day=1))
+        for month in range(12):
+            Deposit.objects.create(account=retirement, date=today.replace(day=1) + relativedelta(months=-month),
+                                   description='401k', amount=500.0)
+        next_year = datetime.combine(today + relativedelta(years=+1), datetime.min.time())
+        retiring = retirement.estimate_balance_dt(next_year)
+
+        # The projections depend on the user's retirement date, so editing the user refits them
+        self.user.date_of_birth = date(1980, 1, 1)
+        self.user.save()
+        self.assertGreater(RetirementAccount.objects.get(pk=retirement.pk).estimate_balance_dt(next_year), retiring)
+
+    def test_debt_estimates_stop_at_zero(self):
+        debt = DebtAccount.objects.create(user=self.user, name='Test_Debt', starting_balance=1000.0,
+                                          opening_date=date(2022, 1, 1))
+        Deposit.objects.create(account=debt, date=date(2022, 1, 15), description='Payment', amount=300.0)
+        Deposit.objects.create(account=debt, date=date(2022, 2, 15), description='Payment', amount=300.0)
+        balances = debt.estimate_balances([datetime(2022, 2, 1), datetime(2023, 1, 1)])
+        self.assertAlmostEqual(balances[0], 700.0)
+        self.assertEqual(balances[1], 0.0)
+
+        response = self.client.get(reverse('data_projected_checkingaccount_balance', args=[self.account.pk]))
+        self.assertEqual(len(response.json()['data']['datasets'][1]['data']), 6)
+
+
+class AmortizationTestCase(TestCase):
+    """ Checks the closed form payoff against a month by month calculation."""
+
+    def setUp(self):
+        self.user = User.objects.create(name='TestUser', date_of_birth=date(1980, 1, 1))
+        self.this_month = localtime().date().replace(day=1)
+        self.debt = DebtAccount.objects.create(user=self.user, name='Test_Debt', starting_balance=10000.0,
+                                               yearly_interest_pct=12.0, opening_date=date(2020, 1, 1))
+        # Six months of 500 payments and one 120 charge (average net payment of 480)
+        for months_ago in range(1, 7):
+            Deposit.objects.create(account=self.debt, date=self.this_month + relativedelta(months=-months_ago),
+                                   description='Payment', amount=500.0)
+        Withdrawal.objects.create(account=self.debt, date=self.this_month + relativedelta(months=-2),
+                                  description='Charge', amount=120.0)
+
+    def test_amortization_schedule(self):
+        self.assertAlmostEqual(self.debt.return_monthly_payment(), 480.0)
+        with self.assertNumQueries(2):
+            schedule = self.debt.amortization_schedule()
+
+        balance = 10000.0 - 3000.0 + 120.0
+        self.assertEqual(schedule.balances[0], balance)
+        self.assertEqual(str(schedule.dates[0]), str(self.this_month + relativedelta(months=+1)))
+        month = 0
+        while balance > 0.0:
+            interest = balance * 0.01
+            self.assertAlmostEqual(schedule.interest[month], round(interest, 2))
+            balance = max(balance + interest - 480.0, 0.0)
+            month += 1
+            self.assertAlmostEqual(schedule.balances[month], round(balance, 2))
+        self.assertEqual(len(schedule.balances), month + 1)
+        self.assertEqual(int(np.ceil(schedule.payoff_period)), month)
+        self.assertEqual(self.debt.return_date_debt_paid().date(),
+                         self.this_month + relativedelta(months=month + 1))
+
+    def test_never_paid_off(self):
+        self.debt.yearly_interest_pct = 99.0
+        self.debt.save()
+        self.assertIsNone(self.debt.return_date_debt_paid())
+        self.assertEqual(len(self.debt.amortization_schedule(max_periods=24).balances), 25)
+
+    def test_debt_balance_plot(self):
+        response = self.client.get(reverse('data_projected_debtaccount_balance', args=[self.debt.pk]))
+        self.assertEqual(response.status_code, 200)
+        projected = response.json()['data']['datasets'][1]['data']
+        self.assertEqual(projected[-1]['y'], 0.0)
+        self.assertEqual(projected[0]['y'], 7120.0)
+
+
+class RetirementProjectionTestCase(TestCase):
+    """ Checks the projected balances against a month by month calculation."""
+
+    def setUp(self):
+        self.next_month = localtime().date().replace(day=1) + relativedelta(months=+1)
+        # Latest retirement date (70 years old) at the start of next month
+        self.user = User.objects.create(name='TestUser', date_of_birth=self.next_month + relativedelta(years=-70))
+        self.account = RetirementAccount.objects.create(user=self.user, name='Test_401k', starting_balance=0.0,
+                                                        monthly_interest_pct=1.0, yearly_withdrawal_rate=4.0,
+                                                        target_amount=1000000.0, opening_date=date(2020, 1, 1))
+        Deposit.objects.create(account=self.account, date=self.next_month + relativedelta(years=-1),
+                               description='401k', amount=1000.0)
+        Deposit.objects.create(account=self.account, date=self.next_month + relativedelta(months=+1, days=+14),
+                               description='Scheduled', amount=100.0)
+
+    def test_projected_balance_series(self):
+        with self.assertNumQueries(2):
+            dates, balances = self.account.projected_balance_series(self.next_month + relativedelta(years=+40))
+        self.assertEqual(len(dates), 481)
+        self.assertEqual(str(dates[1]), str(self.next_month + relativedelta(months=+1)))
+
+        expected = [1000.0, 1010.0, round(1110.0 * 1.01 * (1 - 0.04 / 12), 2)]
+        self.assertEqual(list(balances[:3]), expected)
+        self.assertAlmostEqual(balances[-1], 1110.0 * (1.01 * (1 - 0.04 / 12)) ** 479, places=2)
+
+    def test_return_balance_up_to_dt(self):
+        scheduled_month = self.next_month + relativedelta(months=+1)
+        self.assertEqual(self.account.return_balance_up_to_dt(scheduled_month + relativedelta(days=+14)), 1010.0)
+        self.assertEqual(self.account.return_balance_up_to_dt(scheduled_month + relativedelta(days=+15)), 1110.0)
+        self.assertEqual(self.account.return_balance_up_to_dt(self.next_month), 1000.0)
+        dates, balances = self.account.balance_series(self.next_month, scheduled_month + relativedelta(months=+1))
+        self.assertEqual(list(balances), [1000.0, 1010.0, round(1110.0 * 1.01 * (1 - 0.04 / 12), 2)])
+
+
+class TradingForecastTestCase(TestCase):
+    """ Checks the compounded forecast of a trading account growing 10% per month."""
+
+    def setUp(self):
+        self.user = User.objects.create(name='TestUser', date_of_birth=date(1980, 1, 1))
+        self.account = TradingAccount.objects.create(user=self.user, name='Test_Trading', starting_balance=1000.0,
+                                                     opening_date=date(2022, 1, 1))
+        Deposit.objects.create(account=self.account, date=date(2022, 1, 15), description='Gain', amount=100.0)
+        Deposit.objects.create(account=self.account, date=date(2022, 2, 15), description='Gain', amount=110.0)
+        Deposit.objects.create(account=self.account, date=date(2022, 3, 15), description='Gain', amount=121.0)
+
+    def test_forecast(self):
+        with self.assertNumQueries(4):
+            forecast = self.account.forecast([0, 1, 12], num_of_months=2)
+        self.assertAlmostEqual(forecast.roi, 10.0)
+        self.assertAlmostEqual(forecast.roi_std_error, 0.0)
+        self.assertEqual(str(forecast.start_date), '2022-03-01')
+        self.assertEqual(list(forecast.balances), [1210.0, 1331.0, round(1210.0 * 1.1 ** 12, 2)])
+        self.assertAlmostEqual(self.account.get_roi(num_of_months=2), 10.0)
+
+    def test_estimates(self):
+        estimate = self.account.estimate_balance_month_year('March', 2022, num_of_months=2)
+        self.assertEqual(estimate['beginning balance'], 1210.0)
+        self.assertEqual(estimate['end balance'], round(1210.0 * 1.1 ** 2, 2))
+
+        balances = self.account.estimate_balances([datetime(2022, 3, 1), datetime(2022, 4, 1)], num_of_months=2)
+        self.assertEqual(balances[0], 1210.0)
+        self.assertEqual(balances[1], 1331.0)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+
+# Python Library Imports
+from django.test import TestCase
+from django.urls import reverse
+
+# Other Imports
+from finances.models import User, CheckingAccount, Deposit, Withdrawal, BUDGET_GROUP_DISC
+from finances.reports import REPORT_CACHE
+from finances.utils.columnar import XYSeries, PointsJSONEncoder, ColumnarJSONEncoder
+from datetime import date, timedelta
+import json
+
+
+class ColumnarFormatTestCase(TestCase):
+
+    def test_encoders(self):
+        series = XYSeries([1646121600000.0, 1646208000000.0], [10.0, 20.123])
+        self.assertEqual(json.loads(json.dumps({'data': series}, cls=PointsJSONEncoder)),
+                         {'data': [{'x': 1646121600000.0, 'y': 10.0}, {'x': 1646208000000.0, 'y': 20.123}]})
+        self.assertEqual(json.dumps({'data': series}, cls=ColumnarJSONEncoder),
+                         '{"data":{"x":[1646121600000,1646208000000],"y":[10.0,20.12]}}')
+
+    def test_cumulative_endpoint(self):
+        REPORT_CACHE.clear()
+        user = User.objects.create(name='TestUser', date_of_birth=date(1980, 1, 1))
+        checking = CheckingAccount.objects.create(user=user, name='Test_Checking', starting_balance=100.0,
+                                                  opening_date=date(2020, 1, 1))
+        Deposit.objects.create(account=checking, date=date(2020, 1, 1), description='Pay', amount=100000.0)
+        Withdrawal.objects.bulk_create([
+            Withdrawal(account=checking, date=date(2020, 1, 2) + timedelta(days=day), description='Food',
+                       amount=10.1 + day / 7.0, budget_group=BUDGET_GROUP_DISC) for day in range(1000)])
+
+        url = reverse('plot_totals_cumulative_dt_to_dt', args=[user.pk, '2020-01-01', '2023-01-01'])
+        points = self.client.get(url, {'max_points': 2000})
+        columnar = self.client.get(url, {'max_points': 2000, 'format': 'columnar'})
+        self.assertLess(len(columnar.content), len(points.content) / 2)
+
+        # Converted back to points (as columnarToChartData does), the series match up to the rounding
+        point_data = points.json()['data']['datasets'][0]['data']
+        column_data = columnar.json()['data']['datasets'][0]['data']
+        self.assertEqual(len(column_data['x']), 1001)
+        self.assertEqual(column_data['x'], [int(point['x']) for point in point_data])
+        self.assertEqual(column_data['y'], [round(point['y'], 2) for point in point_data])
+
+        self.assertEqual(self.client.get(url, {'format': 'xml'}).status_code, 400)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+# Python Library Imports
+from django.test import TestCase, RequestFactory
+from django.urls import reverse
+
+# Other Imports
+from finances.models import User, CheckingAccount, Withdrawal, BUDGET_GROUP_DISC
+from finances.plot_views import return_max_points, MAX_POINTS_LIMIT
+from finances.reports import REPORT_CACHE
+from finances.utils.downsampling import lttb, lttb_indices
+from datetime import date, timedelta
+import numpy as np
+
+
+class LTTBTestCase(TestCase):
+
+    def test_short_series_are_kept(self):
+        x, y = lttb([0, 1, 2], [5.0, 1.0, 3.0], 10)
+        self.assertEqual((x.tolist(), y.tolist()), ([0, 1, 2], [5.0, 1.0, 3.0]))
+        self.assertEqual(len(lttb_indices([], [], 10)), 0)
+
+    def test_shape_is_preserved(self):
+        x = np.arange(1000)
+        y = np.sin(x / 50.0)
+        y[637] = 25.0
+
+        indices = lttb_indices(x, y, 100)
+        self.assertEqual(len(indices), 100)
+        self.assertEqual((indices[0], indices[-1]), (0, 999))
+        self.assertTrue(np.all(np.diff(indices) > 0))
+        # The spike and the extremes of the curve are kept
+        self.assertIn(637, indices)
+        self.assertAlmostEqual(lttb(x, y, 100)[1].min(), y.min(), places=2)
+
+    def test_cumulative_endpoint_max_points(self):
+        REPORT_CACHE.clear()
+        user = User.objects.create(name='TestUser', date_of_birth=date(1980, 1, 1))
+        checking = CheckingAccount.objects.create(user=user, name='Test_Checking', starting_balance=100.0,
+                                                  opening_date=date(2020, 1, 1))
+        Withdrawal.objects.bulk_create([
+            Withdrawal(account=checking, date=date(2020, 1, 1) + timedelta(days=day), description='Food',
+                       amount=10.0, budget_group=BUDGET_GROUP_DISC) for day in range(600)])
+
+        url = reverse('plot_expenses_cumulative_dt_to_dt', args=[user.pk, '2020-01-01', '2022-01-01'])
+        points = self.client.get(url).json()['data']['datasets'][0]['data']
+        self.assertEqual(len(points), 500)
+        self.assertEqual(points[-1]['y'], 6000.0)
+
+        points = self.client.get(url, {'max_points': 50}).json()['data']['datasets'][0]['data']
+        self.assertEqual(len(points), 50)
+        self.assertEqual((points[0]['y'], points[-1]['y']), (10.0, 6000.0))
+
+        # Invalid values fall back to the default and the others are clamped
+        self.assertEqual(len(self.client.get(url, {'max_points': 'all'}).json()['data']['datasets'][0]['data']), 500)
+        factory = RequestFactory()
+        self.assertEqual(return_max_points(factory.get(url, {'max_points': 10 ** 9})), MAX_POINTS_LIMIT)
+        self.assertEqual(return_max_points(factory.get(url, {'max_points': -1})), 3)
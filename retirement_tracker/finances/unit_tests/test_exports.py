@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+# Python Library Imports
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+# Other Imports
+from finances.models import User, CheckingAccount, DebtAccount, Deposit, Withdrawal, Statutory, Transfer, \
+    BUDGET_GROUP_MANDATORY, BUDGET_GROUP_DGR
+from finances.exports import ledger_rows, csv_lines
+from datetime import date
+from io import StringIO
+import csv
+import json
+
+
+class LedgerExportTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(name='TestUser', date_of_birth=date(1980, 1, 1))
+        self.checking = CheckingAccount.objects.create(user=self.user, name='Test_Checking', starting_balance=100.0,
+                                                       opening_date=date(2022, 1, 1))
+        self.debt = DebtAccount.objects.create(user=self.user, name='Test_Debt', starting_balance=500.0,
+                                               opening_date=date(2022, 1, 1))
+        Deposit.objects.create(account=self.checking, date=date(2022, 3, 1), description='Pay', amount=2000.0)
+        Withdrawal.objects.create(account=self.checking, date=date(2022, 3, 5), description='Rent', amount=800.0,
+                                  budget_group=BUDGET_GROUP_MANDATORY, location='Landlord')
+        Statutory.objects.create(user=self.user, date=date(2022, 3, 1), description='Taxes', amount=400.0)
+        Transfer.objects.create(account_from=self.checking, account_to=self.debt, date=date(2022, 4, 20),
+                                budget_group=BUDGET_GROUP_DGR, description='Payment', amount=150.0)
+
+    def test_ledger_rows(self):
+        rows = list(ledger_rows(self.user, chunk_size=1))
+        # The transfer also created a withdrawal and a deposit
+        self.assertEqual([row[0] for row in rows], ['deposit', 'deposit', 'withdrawal', 'withdrawal', 'statutory',
+                                                    'transfer'])
+        self.assertEqual(rows[-1][3:6], ('Test_Checking', 'Test_Debt', BUDGET_GROUP_DGR))
+
+        rows = list(ledger_rows(self.user, budget_group=BUDGET_GROUP_MANDATORY))
+        self.assertEqual([(row[0], row[7]) for row in rows], [('withdrawal', 'Landlord')])
+
+        rows = list(ledger_rows(self.user, start_date=date(2022, 4, 1), account_id=self.debt.pk))
+        self.assertEqual([row[0] for row in rows], ['deposit', 'transfer'])
+
+        lines = ''.join(csv_lines(ledger_rows(self.user), chunk_size=2)).splitlines()
+        self.assertEqual(lines[0], 'type,id,date,account,account_to,budget_group,category,location,description,'
+                                   'amount,group')
+        self.assertEqual(len(lines), 7)
+
+    def test_export_endpoint(self):
+        url = reverse('user_export_ledger', args=[self.user.pk, 'ndjson'])
+        response = self.client.get(url, {'end': '2022-04-01'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        entries = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([entry['type'] for entry in entries], ['deposit', 'withdrawal', 'statutory'])
+        self.assertEqual(entries[1]['date'], '2022-03-05')
+
+        response = self.client.get(reverse('user_export_ledger', args=[self.user.pk, 'csv']))
+        rows = list(csv.DictReader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[-1]['amount'], '150.0')
+
+        self.assertEqual(self.client.get(url, {'start': 'March'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'budget_group': 'Fun'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('user_export_ledger', args=[self.user.pk, 'xml'])).status_code, 404)
+
+    def test_export_command(self):
+        out = StringIO()
+        call_command('export_ledger', 'TestUser', '--format', 'csv', '--account', 'Test_Debt', stdout=out)
+        rows = list(csv.DictReader(out.getvalue().splitlines()))
+        self.assertEqual([row['type'] for row in rows], ['deposit', 'transfer'])
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+
+# Python Library Imports
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+# Other Imports
+from finances.models import User, CheckingAccount, DebtAccount, Deposit, Withdrawal, Transfer, TransactionFacet, \
+    AUTOCOMPLETE_CACHE, BUDGET_GROUP_MANDATORY, BUDGET_GROUP_DGR, BUDGET_GROUP_DISC
+from finances.utils.prefix_index import PrefixIndex
+from datetime import date
+from io import StringIO
+
+
+class TransactionFacetTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(name='TestUser', date_of_birth=date(1980, 1, 1))
+        self.checking = CheckingAccount.objects.create(user=self.user, name='Test_Checking', starting_balance=100.0,
+                                                       opening_date=date(2022, 1, 1))
+        self.debt = DebtAccount.objects.create(user=self.user, name='Test_Debt', starting_balance=500.0,
+                                               opening_date=date(2022, 1, 1))
+        Deposit.objects.create(account=self.checking, date=date(2022, 3, 1), description='Pay', category='Work',
+                               amount=2000.0)
+        self.rent = Withdrawal.objects.create(account=self.checking, date=date(2022, 3, 5), description='Rent',
+                                              category='Housing', location='Landlord', amount=800.0,
+                                              budget_group=BUDGET_GROUP_MANDATORY)
+        Withdrawal.objects.create(account=self.checking, date=date(2022, 4, 12), description='Movies', amount=30.0,
+                                  category='Fun', location='Cinema', group='Date night',
+                                  budget_group=BUDGET_GROUP_DISC)
+        Withdrawal.objects.create(account=self.checking, date=date(2022, 3, 20), description='Popcorn', amount=5.0,
+                                  category='Fun', location='Cinema', budget_group=BUDGET_GROUP_DISC)
+
+    def assertFacetsMatchLedger(self):
+        fields = ('kind', 'dimension', 'value', 'count', 'last_used')
+        stored = sorted(TransactionFacet.objects.filter(user=self.user).values_list(*fields))
+        ledger = sorted(tuple(getattr(facet, field) for field in fields)
+                        for facet in TransactionFacet.return_ledger_rows([self.user.pk]))
+        self.assertEqual(stored, ledger)
+
+    def test_incremental_updates(self):
+        self.assertFacetsMatchLedger()
+        self.assertEqual(TransactionFacet.objects.get(user=self.user, kind=TransactionFacet.KIND_WITHDRAWAL,
+                                                      dimension='category', value='Fun').count, 2)
+
+        # Only the amount changed, so the facets are left alone
+        self.rent.amount = 850.0
+        with self.assertNumQueries(0):
+            TransactionFacet.apply_entries(TransactionFacet.KIND_WITHDRAWAL, self.rent.facet_entry(),
+                                           self.rent.facet_entry())
+        self.rent.save()
+
+        self.rent.category = 'Home'
+        self.rent.date = date(2022, 5, 5)
+        self.rent.save()
+        self.assertFacetsMatchLedger()
+        self.assertFalse(TransactionFacet.objects.filter(value='Housing').exists())
+
+        Transfer.objects.create(account_from=self.checking, account_to=self.debt, date=date(2022, 4, 20),
+                                budget_group=BUDGET_GROUP_DGR, category='Loans', description='Payment', amount=150.0)
+        self.assertFacetsMatchLedger()
+
+        self.rent.delete()
+        Withdrawal.objects.get(description='Popcorn').delete()
+        self.assertFacetsMatchLedger()
+
+    def test_values_and_views(self):
+        with self.assertNumQueries(1):
+            values = TransactionFacet.return_values(self.user, TransactionFacet.KIND_WITHDRAWAL)
+        self.assertEqual(values, {'category': ['Fun', 'Housing'], 'description': ['Movies', 'Popcorn', 'Rent'],
+                                  'location': ['Cinema', 'Landlord'], 'group': ['Date night']})
+        self.assertEqual(TransactionFacet.return_values(self.user, TransactionFacet.KIND_DEPOSIT, date(2022, 4, 1)),
+                         {'category': [], 'description': [], 'location': [], 'group': []})
+
+        # Users without facets are read from the ledger
+        TransactionFacet.objects.all().delete()
+        self.assertEqual(TransactionFacet.return_values(self.user, TransactionFacet.KIND_WITHDRAWAL), values)
+
+        out = StringIO()
+        call_command('rebuild_transaction_facets', stdout=out)
+        self.assertIn('Rebuilt 10 transaction facets', out.getvalue())
+        self.assertFacetsMatchLedger()
+
+        response = self.client.get(reverse('user_expense_lookup', args=[self.user.pk]))
+        self.assertEqual([choice[0] for choice in response.context['form'].fields['category'].choices],
+                         [None, 'Fun', 'Housing'])
+
+    def test_account_deletion(self):
+        other = CheckingAccount.objects.create(user=self.user, name='Test_Other', starting_balance=0.0,
+                                               opening_date=date(2022, 1, 1))
+        Withdrawal.objects.create(account=other, date=date(2022, 3, 7), description='Tolls', category='Car',
+                                  location='Highway', amount=12.0, budget_group=BUDGET_GROUP_MANDATORY)
+        self.assertIn('Car', TransactionFacet.return_values(self.user, TransactionFacet.KIND_WITHDRAWAL)['category'])
+
+        # The cascade bypasses the delete functions of the withdrawals, so the facets are rebuilt
+        other.delete()
+        self.assertEqual(TransactionFacet.return_values(self.user, TransactionFacet.KIND_WITHDRAWAL),
+                         {'category': ['Fun', 'Housing'], 'description': ['Movies', 'Popcorn', 'Rent'],
+                          'location': ['Cinema', 'Landlord'], 'group': ['Date night']})
+        self.assertFacetsMatchLedger()
+
+        self.checking.delete()
+        self.assertFalse(TransactionFacet.objects.filter(user=self.user).exists())
+
+
+class PrefixIndexTestCase(TestCase):
+
+    def test_complete(self):
+        index = PrefixIndex({'Groceries': 12, 'Gas': 30, 'gardening': 2, 'Gifts': 12, 'Rent': 40, '': 5})
+        self.assertEqual(len(index), 5)
+        self.assertEqual(index.complete('g'), ['Gas', 'Gifts', 'Groceries', 'gardening'])
+        self.assertEqual(index.complete('GA', k=1), ['Gas'])
+        self.assertEqual(index.complete('gro'), ['Groceries'])
+        self.assertEqual(index.complete('x'), [])
+        self.assertEqual(index.complete('', k=2), ['Rent', 'Gas'])
+
+
+class AutocompleteTestCase(TestCase):
+
+    def setUp(self):
+        AUTOCOMPLETE_CACHE.clear()
+        self.user = User.objects.create(name='TestUser', date_of_birth=date(1980, 1, 1))
+        self.checking = CheckingAccount.objects.create(user=self.user, name='Test_Checking', starting_balance=100.0,
+                                                       opening_date=date(2022, 1, 1))
+        for day, description in enumerate(['Gas', 'Groceries', 'Gas', 'Gym', 'Rent'], start=1):
+            Withdrawal.objects.create(account=self.checking, date=date(2022, 3, day), description=description,
+                                      category='Car' if description == 'Gas' else 'Home', amount=float(day),
+                                      budget_group=BUDGET_GROUP_MANDATORY)
+        Deposit.objects.create(account=self.checking, date=date(2022, 3, 1), description='Gift', amount=100.0)
+
+    def test_autocomplete(self):
+        url = reverse('user_autocomplete', args=[self.user.pk, 'description'])
+        self.assertEqual(self.client.get(url, {'q': 'g'}).json(), {'results': ['Gas', 'Groceries', 'Gym']})
+
+        # Cached until the ledger changes
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url, {'q': 'gr'}).json()['results'], ['Groceries'])
+        Withdrawal.objects.create(account=self.checking, date=date(2022, 3, 9), description='Grill', amount=9.0,
+                                  category='Home', budget_group=BUDGET_GROUP_MANDATORY)
+        self.assertEqual(self.client.get(url, {'q': 'gr', 'k': 1}).json()['results'], ['Grill'])
+
+        self.assertEqual(self.client.get(url, {'q': 'g', 'kind': TransactionFacet.KIND_DEPOSIT}).json()['results'],
+                         ['Gift'])
+        self.assertEqual(self.client.get(url, {'kind': 'transfer'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'k': 'all'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('user_autocomplete', args=[self.user.pk, 'amount'])).status_code,
+                         404)
+
+        response = self.client.get(reverse('user_add_withdrawal', args=[self.user.pk]))
+        self.assertNotIn('distinct_desc', response.context)
+        self.assertContains(response, f'/finances/user/{self.user.pk}/autocomplete/FIELD')
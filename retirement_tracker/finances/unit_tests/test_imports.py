@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+# Python Library Imports
+from unittest.mock import patch
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import TestCase
+
+# Other Imports
+from finances.models import User, RetirementAccount, CheckingAccount, Deposit, Withdrawal, AccountMonthlyBalance, \
+    TransactionFacet, BUDGET_GROUP_DGR
+from finances.imports import LedgerImportRow, bulk_import_ledger_rows
+from datetime import date
+from io import StringIO
+from pathlib import Path
+import tempfile
+
+
+class BulkImportTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(name='TestUser', date_of_birth=date(1980, 1, 1))
+        self.hsa = RetirementAccount.objects.create(user=self.user, name='Test_HSA', starting_balance=0.0,
+                                                    opening_date=date(2020, 1, 1), target_amount=1000000.0)
+        # Builds the user's facets, which the bulk import then keeps current
+        checking = CheckingAccount.objects.create(user=self.user, name='Test_Checking', starting_balance=0.0,
+                                                  opening_date=date(2020, 1, 1))
+        Deposit.objects.create(account=checking, date=date(2021, 1, 1), description='Pay', amount=100.0)
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write_csv(self, lines):
+        path = Path(self.directory.name) / 'anthem.csv'
+        path.write_text('Transaction Date,Description,Amount\n' + '\n'.join(lines) + '\n')
+        return path
+
+    def import_anthem(self, lines, *args):
+        out = StringIO()
+        call_command('import_anthem_hsa_info', 'TestUser', 'Test_HSA', self.write_csv(lines), *args, stdout=out)
+        return out.getvalue()
+
+    def test_bulk_matches_row_by_row(self):
+        lines = [f'01/{day:02d}/2022,Contribution,{day * 10.0}' for day in range(1, 29)] + \
+                ['02/03/2022,Doctor,-45.5', '02/03/2022,Doctor,-45.5']
+        self.assertIn('Created 29, updated 0 and skipped 1 entries', self.import_anthem(lines, '--bulk'))
+        bulk = sorted(Deposit.objects.filter(account=self.hsa).values_list(
+            'date', 'description', 'amount', 'slug_field'))
+        balances = list(AccountMonthlyBalance.objects.filter(account=self.hsa).order_by('month').values_list(
+            'month', 'deposits', 'withdrawals'))
+        self.assertEqual(balances, [(date(2022, 1, 1), 4060.0, 0.0), (date(2022, 2, 1), 0.0, 45.5)])
+        self.assertTrue(TransactionFacet.objects.filter(user=self.user, value='Doctor').exists())
+
+        Deposit.objects.filter(account=self.hsa).delete()
+        Withdrawal.objects.filter(account=self.hsa).delete()
+        self.assertIn('Created 29, updated 1 and skipped 0 entries', self.import_anthem(lines))
+        self.assertEqual(sorted(Deposit.objects.filter(account=self.hsa).values_list(
+            'date', 'description', 'amount', 'slug_field')), bulk)
+
+    def test_bulk_diff(self):
+        self.import_anthem(['01/05/2022,Contribution,100', '01/06/2022,Pharmacy,-20'], '--bulk')
+        Withdrawal.objects.filter(description='Pharmacy').update(category='Health')
+
+        rows = [LedgerImportRow(Withdrawal, date(2022, 1, 6), 'Pharmacy', 20.0,
+                                {'budget_group': BUDGET_GROUP_DGR, 'category': 'Retirement'}),
+                LedgerImportRow(Deposit, date(2022, 1, 5), 'Contribution', 100.0, {'category': 'Retirement'})]
+        rows += [LedgerImportRow(Deposit, date(2022, 3, day), 'Contribution', 50.0, {'category': 'Retirement'})
+                 for day in range(1, 29)]
+        # Diffing, inserting and updating take a fixed number of queries whatever the number of rows
+        with self.assertNumQueries(32):
+            result = bulk_import_ledger_rows(self.hsa, rows)
+        self.assertEqual((result.created, result.updated, result.skipped), (28, 1, 1))
+        self.assertEqual(Withdrawal.objects.get(description='Pharmacy').category, 'Retirement')
+        self.assertEqual(AccountMonthlyBalance.objects.get(account=self.hsa, month=date(2022, 3, 1)).deposits, 1400.0)
+
+    def test_bulk_conflict_rolls_back(self):
+        rows = [LedgerImportRow(Deposit, date(2022, 1, day), 'Contribution', 10.0, {'category': 'Retirement'})
+                for day in range(1, 4)]
+        bulk_create = Deposit.objects.bulk_create
+
+        def concurrent_bulk_create(objs, *args, **kwargs):
+            # Another process inserts one of the new entries between the diff and the insert
+            bulk_create([Deposit(account=self.hsa, date=objs[0].date, description='Contribution', amount=10.0)])
+            return bulk_create(objs, *args, **kwargs)
+
+        with patch.object(Deposit.objects, 'bulk_create', concurrent_bulk_create):
+            with self.assertRaises(IntegrityError):
+                bulk_import_ledger_rows(self.hsa, rows)
+        self.assertFalse(Deposit.objects.filter(account=self.hsa).exists())
+        self.assertFalse(AccountMonthlyBalance.objects.filter(account=self.hsa).exists())
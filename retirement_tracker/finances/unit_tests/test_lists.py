@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+# Python Library Imports
+from django.test import TestCase
+from django.urls import reverse
+
+# Other Imports
+from finances.models import User, CheckingAccount, Withdrawal, Statutory, BUDGET_GROUP_MANDATORY
+from finances.utils.pagination import KeysetPaginator
+from datetime import date
+
+
+class KeysetPaginationTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(name='TestUser', date_of_birth=date(1980, 1, 1))
+        self.checking = CheckingAccount.objects.create(user=self.user, name='Test_Checking', starting_balance=100.0,
+                                                       opening_date=date(2022, 1, 1))
+        # Pairs of withdrawals share a date, so the pages have to break the ties on the pk
+        for day in range(1, 61):
+            Withdrawal.objects.create(account=self.checking, date=date(2022, 3, (day + 1) // 2),
+                                      description=f'Food {day}', amount=float(day),
+                                      budget_group=BUDGET_GROUP_MANDATORY)
+        self.newest_first = list(Withdrawal.objects.order_by('-date', '-pk').values_list('pk', flat=True))
+
+    def test_paginator_walks_both_ways(self):
+        paginator = KeysetPaginator(Withdrawal.objects.all(), 7)
+
+        pages = [paginator.page()]
+        while pages[-1].has_next:
+            pages.append(paginator.page(after=pages[-1].next_cursor))
+        self.assertEqual([obj.pk for page in pages for obj in page], self.newest_first)
+        self.assertFalse(pages[0].has_previous)
+        self.assertEqual(len(pages[-1]), 60 % 7)
+
+        previous = paginator.page(before=pages[3].previous_cursor)
+        self.assertEqual([obj.pk for obj in previous], [obj.pk for obj in pages[2]])
+        self.assertEqual(previous.next_cursor, pages[2].next_cursor)
+        self.assertFalse(paginator.page(before=pages[1].previous_cursor).has_previous)
+
+        with self.assertRaises(ValueError):
+            paginator.page(after='March')
+
+    def test_list_views(self):
+        url = reverse('user_available_expenses', args=[self.user.pk])
+        with self.assertNumQueries(1):
+            payload = self.client.get(url, {'format': 'json'}).json()
+        self.assertEqual([row['id'] for row in payload['results']], self.newest_first[:50])
+        self.assertIsNone(payload['previous'])
+
+        payload = self.client.get(url, {'format': 'json', 'after': payload['next']}).json()
+        self.assertEqual([row['id'] for row in payload['results']], self.newest_first[50:])
+        self.assertIsNone(payload['next'])
+
+        response = self.client.get(url)
+        self.assertEqual(len(response.context['page_obj']), 50)
+        self.assertContains(response, f'?after={response.context["page_obj"].next_cursor}')
+        self.assertEqual(self.client.get(url, {'after': 'bad'}).status_code, 404)
+
+        Statutory.objects.create(user=self.user, date=date(2022, 3, 1), description='Taxes', amount=400.0)
+        response = self.client.get(reverse('user_available_statutory', args=[self.user.pk]), {'format': 'json'})
+        self.assertEqual(response.json()['results'][0]['description'], 'Taxes')
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+# Python Library Imports
+from django.test import TestCase
+from django.urls import reverse
+
+# Other Imports
+from finances.models import User, RetirementAccount, Deposit
+from finances.utils.monte_carlo import simulate_retirement
+from datetime import date
+import numpy as np
+
+
+class MonteCarloTestCase(TestCase):
+
+    def test_deterministic_paths(self):
+        # No volatility: every path withdraws 1% of the starting balance per month and stays flat otherwise
+        result = simulate_retirement(1000.0, 0.0, 0, 12.0, 0.0, 0.0, num_years=1, num_paths=10)
+        self.assertEqual(list(result.months), [0, 12])
+        self.assertEqual(list(result.bands[50]), [1000.0, 880.0])
+        self.assertEqual(result.success_probability, 1.0)
+
+        result = simulate_retirement(1000.0, 0.0, 0, 240.0, 0.0, 0.0, num_years=1, num_paths=10)
+        self.assertEqual(result.success_probability, 0.0)
+
+    def test_seeded_runs_match(self):
+        args = (100000.0, 500.0, 120, 4.0, 0.005, 0.04)
+        serial = simulate_retirement(*args, num_years=30, num_paths=5000, seed=7)
+        again = simulate_retirement(*args, num_years=30, num_paths=5000, seed=7)
+        np.testing.assert_array_equal(serial.bands[50], again.bands[50])
+        self.assertEqual(serial.seed, 7)
+
+        # Chunks keep their own seeds, so the process pool gives the same paths
+        pooled = simulate_retirement(*args, num_years=30, num_paths=25000, seed=7, max_workers=2)
+        single = simulate_retirement(*args, num_years=30, num_paths=25000, seed=7, max_workers=1)
+        np.testing.assert_array_equal(pooled.bands[95], single.bands[95])
+        self.assertEqual(pooled.success_probability, single.success_probability)
+
+    def test_monte_carlo_endpoint(self):
+        user = User.objects.create(name='TestUser', date_of_birth=date(1980, 1, 1))
+        account = RetirementAccount.objects.create(user=user, name='Test_401k', starting_balance=10000.0,
+                                                   monthly_interest_pct=0.5, target_amount=1000000.0,
+                                                   opening_date=date(2020, 1, 1))
+        Deposit.objects.create(account=account, date=date(2022, 1, 1), description='401k', amount=1000.0)
+
+        url = reverse('data_user_retirement_monte_carlo', args=[user.pk])
+        response = self.client.get(url, {'paths': 1000, 'years': 10, 'seed': 3})
+        self.assertEqual(response.status_code, 200)
+        payload = response.json()
+        self.assertEqual(payload['seed'], 3)
+        self.assertEqual(len(payload['data']['datasets']), 5)
+        self.assertEqual(len(payload['data']['labels']), 11)
+        self.assertEqual(payload, self.client.get(url, {'paths': 1000, 'years': 10, 'seed': 3}).json())
+
+        # Out of range sizes are clamped and invalid numbers rejected
+        response = self.client.get(url, {'paths': -5, 'years': 100000, 'seed': 3})
+        self.assertEqual(len(response.json()['data']['labels']), 101)
+        self.assertEqual(self.client.get(url, {'years': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'seed': '3.5'}).status_code, 400)
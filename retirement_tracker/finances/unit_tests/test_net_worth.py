@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+
+# Python Library Imports
+from django.test import TestCase
+from django.utils.timezone import make_aware
+
+# Other Imports
+from finances.models import User, CheckingAccount, RetirementAccount, TradingAccount, DebtAccount, Deposit, \
+    Withdrawal, NetWorth
+from datetime import date, datetime
+
+
+class NetWorthTestCase(TestCase):
+    """ Checks that the single query net worth matches the per account balances."""
+
+    def setUp(self):
+        self.user = User.objects.create(name='TestUser', date_of_birth=date(1980, 1, 1))
+        self.checking = CheckingAccount.objects.create(user=self.user, name='Test_Checking', starting_balance=100.0,
+                                                       opening_date=date(2022, 1, 1))
+        self.retirement = RetirementAccount.objects.create(user=self.user, name='Test_401k', starting_balance=0.0,
+                                                           target_amount=1000000.0, opening_date=date(2022, 1, 1))
+        self.trading = TradingAccount.objects.create(user=self.user, name='Test_Trading', starting_balance=500.0,
+                                                     opening_date=date(2022, 1, 1))
+        self.debt = DebtAccount.objects.create(user=self.user, name='Test_Debt', starting_balance=200.0,
+                                               opening_date=date(2022, 1, 1))
+
+        Deposit.objects.create(account=self.checking, date=date(2022, 1, 15), description='Pay', amount=1000.0)
+        Withdrawal.objects.create(account=self.checking, date=date(2022, 2, 1), description='Rent', amount=400.0)
+        Deposit.objects.create(account=self.retirement, date=date(2022, 1, 15), description='401k', amount=300.0)
+        Withdrawal.objects.create(account=self.trading, date=date(2022, 2, 10), description='Loss', amount=25.0)
+        Deposit.objects.create(account=self.debt, date=date(2022, 1, 20), description='Payment', amount=150.0)
+        Deposit.objects.create(account=self.debt, date=date(2022, 2, 20), description='Payment', amount=150.0)
+
+    def test_return_net_worth_at_dts(self):
+        with self.assertNumQueries(1):
+            start, middle, end = self.user.return_net_worth_at_dts([date(2022, 1, 1), date(2022, 2, 1),
+                                                                    date(2022, 3, 1)])
+
+        self.assertEqual(start, NetWorth(100.0, 0.0, 500.0, 200.0, 400.0))
+        self.assertEqual(middle, NetWorth(1100.0, 300.0, 500.0, 50.0, 1850.0))
+        # Debt payments past the balance do not make the debt negative
+        self.assertEqual(end, NetWorth(700.0, 300.0, 475.0, 0.0, 1475.0))
+
+        for account in (self.checking, self.retirement, self.trading, self.debt):
+            self.assertEqual(account.return_balance_up_to_dt(make_aware(datetime(2022, 2, 1))),
+                             getattr(middle, type(account).__name__.replace('Account', '').lower()))
+
+    def test_return_net_worth_month_year(self):
+        net_worth = self.user.return_net_worth_month_year('January', 2022)
+        self.assertEqual(net_worth.net_worth, 1850.0)
+        tot_checking, tot_retirement, tot_trading, tot_debt, net_worth = net_worth
+        self.assertEqual((tot_checking, tot_retirement, tot_trading, tot_debt), (1100.0, 300.0, 500.0, 50.0))
+
+    def test_return_report_info_acct_balance(self):
+        info = self.user.return_report_info_acct_balance(date(2022, 1, 1), date(2022, 3, 1))
+        self.assertEqual(info['tot_checking_diff'], 600.0)
+        self.assertEqual(info['tot_debt_diff'], -200.0)
+        self.assertEqual(info['net_diff'], 1075.0)
+
+    def test_estimate_net_worth_series(self):
+        dts = [datetime(2022, 2, 1), datetime(2022, 3, 1)]
+        estimates = self.user.estimate_net_worth_series(dts)
+        self.assertEqual(len(estimates), 2)
+        for estimate in estimates:
+            self.assertAlmostEqual(estimate.net_worth,
+                                   estimate.checking + estimate.retirement + estimate.trading - estimate.debt, places=1)
+        self.assertEqual(self.user.estimate_net_worth_month_year('March', 2022), estimates[1])
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+
+# Python Library Imports
+from unittest.mock import patch
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.timezone import localtime
+
+# Other Imports
+from finances.models import User, CheckingAccount, DebtAccount, RetirementAccount, Deposit, Withdrawal, MonthlyBudget, \
+    Statutory, Transfer, ReportJob, BUDGET_GROUP_MANDATORY, BUDGET_GROUP_DISC
+from finances.reports import ReportService, REPORT_CACHE
+from finances.plot_views import UserDashboard
+from datetime import date
+from dateutil.relativedelta import relativedelta
+
+
+class ReportServiceTestCase(TestCase):
+
+    def setUp(self):
+        REPORT_CACHE.clear()
+        self.user = User.objects.create(name='TestUser', date_of_birth=date(1980, 1, 1))
+        checking = CheckingAccount.objects.create(user=self.user, name='Test_Checking', starting_balance=100.0,
+                                                  opening_date=date(2022, 1, 1))
+        debt = DebtAccount.objects.create(user=self.user, name='Test_Debt', starting_balance=500.0,
+                                          opening_date=date(2022, 1, 1))
+        Deposit.objects.create(account=checking, date=date(2022, 3, 1), description='Pay', amount=2000.0)
+        Withdrawal.objects.create(account=checking, date=date(2022, 3, 5), description='Rent', amount=800.0,
+                                  budget_group=BUDGET_GROUP_MANDATORY)
+        Withdrawal.objects.create(account=checking, date=date(2022, 3, 31), description='Movies', amount=30.0,
+                                  budget_group=BUDGET_GROUP_DISC)
+        # Outside of the report
+        Withdrawal.objects.create(account=checking, date=date(2022, 4, 1), description='Rent', amount=800.0,
+                                  budget_group=BUDGET_GROUP_MANDATORY)
+        Deposit.objects.create(account=debt, date=date(2022, 3, 10), description='Payment', amount=100.0)
+        Statutory.objects.create(user=self.user, date=date(2022, 3, 1), description='Taxes', amount=400.0)
+        MonthlyBudget.objects.create(user=self.user, date=date(2022, 3, 1), mandatory=1000.0, discretionary=200.0)
+
+    def test_build(self):
+        with self.assertNumQueries(3):
+            report = ReportService.build(self.user, date(2022, 3, 1), date(2022, 4, 1))
+
+        self.assertEqual((report.mand_exp, report.mort_exp, report.dgr_exp, report.disc_exp), (800.0, 0.0, 0.0, 30.0))
+        self.assertEqual((report.mand_total, report.disc_total, report.stat_total), (1000.0, 200.0, 400.0))
+        self.assertEqual(report.income, 2000.0)
+        self.assertEqual(report.takehome_pay, 1600.0)
+        self.assertEqual(report.start_net_worth.net_worth, -400.0)
+        self.assertEqual(report.end_net_worth.net_worth, 870.0)
+
+        context = report.as_context()
+        self.assertEqual(context['leftover_mand'], 200.0)
+        self.assertEqual(context['end_balance'], 870.0)
+        with self.assertRaises(AttributeError):
+            report.income = 0.0
+
+    def test_report_views(self):
+        response = self.client.get(reverse('user_month_year', args=[self.user.pk, 'March', 2022]))
+        self.assertEqual(response.context['mand_exp'], 800.0)
+        self.assertEqual(response.context['takehome_pay'], 1600.0)
+
+        response = self.client.get(reverse('user_year', args=[self.user.pk, 2022]))
+        self.assertEqual(response.context['mand_exp'], 1600.0)
+
+        response = self.client.get(reverse('user_all', args=[self.user.pk]))
+        self.assertEqual(response.context['start_date'], '2022-03-01')
+        self.assertEqual(response.context['end_balance'], 70.0)
+
+
+class ReportCacheTestCase(TestCase):
+
+    def setUp(self):
+        REPORT_CACHE.clear()
+        self.user = User.objects.create(name='TestUser', date_of_birth=date(1980, 1, 1))
+        self.checking = CheckingAccount.objects.create(user=self.user, name='Test_Checking', starting_balance=100.0,
+                                                       opening_date=date(2022, 1, 1))
+        self.debt = DebtAccount.objects.create(user=self.user, name='Test_Debt', starting_balance=500.0,
+                                               opening_date=date(2022, 1, 1))
+        Deposit.objects.create(account=self.checking, date=date(2022, 3, 1), description='Pay', amount=2000.0)
+        Withdrawal.objects.create(account=self.checking, date=date(2022, 3, 5), description='Rent', amount=800.0,
+                                  budget_group=BUDGET_GROUP_MANDATORY)
+
+    def test_all_report_is_cached(self):
+        report = ReportService.get_all(self.user)
+        self.assertEqual(report.mand_exp, 800.0)
+        with self.assertNumQueries(1):
+            self.assertEqual(ReportService.get_all(self.user), report)
+        self.assertEqual((REPORT_CACHE.info()['hits'], REPORT_CACHE.info()['misses']), (1, 1))
+        self.assertEqual(REPORT_CACHE.info()['hit_rate'], 0.5)
+
+        response = self.client.get(reverse('user_all', args=[self.user.pk]))
+        self.assertEqual(response.context['end_date'], '2022-03-05')
+        self.assertEqual(REPORT_CACHE.info()['hits'], 2)
+
+    def test_projected_report_expires_monthly(self):
+        today = localtime().date()
+        start_date, end_date = today.replace(day=1), today.replace(day=1) + relativedelta(months=+2)
+        ReportService.get(self.user, start_date, end_date)
+        ReportService.get(self.user, date(2022, 3, 1), date(2022, 4, 1))
+        ReportService.get(self.user, start_date, end_date)
+        self.assertEqual((REPORT_CACHE.info()['hits'], REPORT_CACHE.info()['misses']), (1, 2))
+
+        # Next month, the report projecting its end net worth is rebuilt, the past one is still served
+        with patch.object(timezone, 'localdate', return_value=today + relativedelta(months=+1)):
+            ReportService.get(self.user, start_date, end_date)
+            ReportService.get(self.user, date(2022, 3, 1), date(2022, 4, 1))
+        self.assertEqual((REPORT_CACHE.info()['hits'], REPORT_CACHE.info()['misses']), (2, 3))
+
+    def test_writes_bump_report_version(self):
+        writes = [
+            lambda: Withdrawal.objects.create(account=self.checking, date=date(2022, 3, 9), description='Food',
+                                              amount=50.0, budget_group=BUDGET_GROUP_MANDATORY),
+            lambda: Deposit.objects.create(account=self.checking, date=date(2022, 3, 15), description='Pay',
+                                           amount=2000.0),
+            lambda: Statutory.objects.create(user=self.user, date=date(2022, 3, 1), description='Taxes', amount=400.0),
+            lambda: MonthlyBudget.objects.create(user=self.user, date=date(2022, 3, 1), mandatory=1000.0),
+            lambda: Transfer.objects.create(account_from=self.checking, account_to=self.debt, date=date(2022, 3, 20),
+                                            budget_group=BUDGET_GROUP_DISC, description='Payment', amount=100.0),
+            lambda: Withdrawal.objects.get(description='Food').delete(),
+        ]
+        for write in writes:
+            version = self.user.return_report_version()
+            write()
+            self.assertGreater(self.user.return_report_version(), version)
+
+        report = ReportService.get(self.user, date(2022, 3, 1), date(2022, 4, 1))
+        self.assertEqual((report.mand_exp, report.disc_exp, report.stat_exp), (800.0, 100.0, 400.0))
+        self.assertEqual(report.income, 4000.0)
+
+        Withdrawal.objects.create(account=self.checking, date=date(2022, 3, 25), description='Food', amount=25.0,
+                                  budget_group=BUDGET_GROUP_MANDATORY)
+        report = ReportService.get(self.user, date(2022, 3, 1), date(2022, 4, 1))
+        self.assertEqual(report.mand_exp, 825.0)
+        self.assertEqual(REPORT_CACHE.info()['hits'], 0)
+
+    def test_conditional_plot_requests(self):
+        url = reverse('plot_expenses_by_budget_group', args=[self.user.pk, 'March', 2022])
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+
+        # Answered after the user lookup of dispatch and the validator, without building the payload
+        with self.assertNumQueries(2):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertNotEqual(self.client.get(url + '?other=1', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Withdrawal.objects.create(account=self.checking, date=date(2022, 3, 9), description='Food', amount=50.0,
+                                  budget_group=BUDGET_GROUP_MANDATORY)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        url = reverse('data_projected_checkingaccount_balance', args=[self.checking.pk])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Deposit.objects.create(account=self.checking, date=date(2022, 3, 15), description='Pay', amount=2000.0)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_conditional_retirement_projection(self):
+        # Retires in six months, so the projected balances are drawn down afterwards
+        today = localtime().date()
+        self.user.date_of_birth = today + relativedelta(years=-69, months=-6)
+        self.user.save()
+        retirement = RetirementAccount.objects.create(user=self.user, name='Test_401k', starting_balance=10000.0,
+                                                      monthly_interest_pct=0.5, yearly_withdrawal_rate=12.0,
+                                                      target_amount=1000000.0, opening_date=today.replace(day=1))
+        for month in range(12):
+            Deposit.objects.create(account=retirement, date=today.replace(day=1) + relativedelta(months=-month),
+                                   description='401k', amount=500.0)
+
+        url = reverse('data_projected_retirementaccount_balance', args=[retirement.pk])
+        response = self.client.get(url)
+        etag = response['ETag']
+        projected = response.json()['data']['datasets'][1]['data']
+
+        # Editing the user changes the retirement date, so both the validator and the projection change
+        self.user.date_of_birth = date(1980, 1, 1)
+        self.user.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertGreater(response.json()['data']['datasets'][1]['data'][1]['y'], projected[1]['y'])
+
+    def test_plot_payload_is_cached(self):
+        url = reverse('plot_expenses_by_budget_group', args=[self.user.pk, 'March', 2022])
+        payload = self.client.get(url).json()
+        self.assertEqual(payload['data']['datasets'][0]['data'][0], 800.0)
+        self.assertEqual(self.client.get(url).json(), payload)
+        self.assertEqual(REPORT_CACHE.info()['hits'], 1)
+
+        Withdrawal.objects.create(account=self.checking, date=date(2022, 3, 9), description='Food', amount=50.0,
+                                  budget_group=BUDGET_GROUP_MANDATORY)
+        self.assertEqual(self.client.get(url).json()['data']['datasets'][0]['data'][0], 850.0)
+
+
+class ReportJobTestCase(TestCase):
+
+    def setUp(self):
+        REPORT_CACHE.clear()
+        self.user = User.objects.create(name='TestUser', date_of_birth=date(1980, 1, 1))
+        self.checking = CheckingAccount.objects.create(user=self.user, name='Test_Checking', starting_balance=100.0,
+                                                       opening_date=date(2010, 1, 1))
+        Deposit.objects.create(account=self.checking, date=date(2012, 3, 1), description='Pay', amount=2000.0)
+        Withdrawal.objects.create(account=self.checking, date=date(2022, 3, 5), description='Rent', amount=800.0,
+                                  budget_group=BUDGET_GROUP_MANDATORY)
+
+    @override_settings(REPORT_JOBS_ALWAYS_EAGER=True)
+    def test_submit_runs_and_deduplicates(self):
+        job = ReportService.submit(self.user, date(2012, 3, 1), date(2022, 3, 6))
+        self.assertEqual((job.status, job.progress), (ReportJob.STATUS_DONE, 1.0))
+        self.assertEqual(job.result['mand_exp'], 800.0)
+        self.assertEqual(job.result['end_balance'], 1300.0)
+
+        # Same range and ledger, so the finished job is reused
+        self.assertEqual(ReportService.submit(self.user, date(2012, 3, 1), date(2022, 3, 6)).pk, job.pk)
+
+        Withdrawal.objects.create(account=self.checking, date=date(2022, 3, 5), description='Food', amount=50.0,
+                                  budget_group=BUDGET_GROUP_MANDATORY)
+        new_job = ReportService.submit(self.user, date(2012, 3, 1), date(2022, 3, 6))
+        self.assertNotEqual(new_job.pk, job.pk)
+        self.assertEqual(new_job.result['mand_exp'], 850.0)
+        self.assertFalse(ReportJob.objects.filter(pk=job.pk).exists())
+
+    def test_running_job_is_deduplicated(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            job = ReportService.submit(self.user, date(2012, 3, 1), date(2022, 3, 6))
+            self.assertEqual(ReportService.submit(self.user, date(2012, 3, 1), date(2022, 3, 6)).pk, job.pk)
+            response = self.client.get(reverse('user_all', args=[self.user.pk]))
+        self.assertEqual(len(callbacks), 1)
+        self.assertTemplateUsed(response, 'finances/user_report_pending.html')
+        self.assertEqual(response.context['report_job'].pk, job.pk)
+        self.assertEqual(job.status, ReportJob.STATUS_PENDING)
+
+        response = self.client.get(reverse('data_report_job_status', args=[job.pk]))
+        self.assertEqual(response.json()['status'], ReportJob.STATUS_PENDING)
+
+        ReportService.run_job(job.pk)
+        self.assertEqual(self.client.get(reverse('data_report_job_status', args=[job.pk])).json()['progress'], 1.0)
+
+    @override_settings(REPORT_JOBS_ALWAYS_EAGER=True)
+    def test_all_view_uses_job(self):
+        response = self.client.get(reverse('user_all', args=[self.user.pk]))
+        self.assertEqual(response.context['report_job'].status, ReportJob.STATUS_DONE)
+        self.assertEqual(response.context['mand_exp'], 800.0)
+        self.assertTemplateUsed(response, 'finances/user_report.html')
+
+
+class UserDashboardTestCase(TestCase):
+
+    def setUp(self):
+        REPORT_CACHE.clear()
+        self.user = User.objects.create(name='TestUser', date_of_birth=date(1980, 1, 1))
+        checking = CheckingAccount.objects.create(user=self.user, name='Test_Checking', starting_balance=100.0,
+                                                  opening_date=date(2022, 1, 1))
+        Deposit.objects.create(account=checking, date=date(2022, 3, 1), description='Pay', amount=2000.0)
+        Withdrawal.objects.create(account=checking, date=date(2022, 3, 1), description='Rent', amount=800.0,
+                                  category='Housing', budget_group=BUDGET_GROUP_MANDATORY)
+        Withdrawal.objects.create(account=checking, date=date(2022, 3, 12), description='Movies', amount=30.0,
+                                  category='Fun', budget_group=BUDGET_GROUP_DISC)
+        Statutory.objects.create(user=self.user, date=date(2022, 3, 1), description='Taxes', amount=400.0)
+        MonthlyBudget.objects.create(user=self.user, date=date(2022, 3, 1), mandatory=1000.0, discretionary=200.0)
+        self.dates = [self.user.pk, '2022-03-01', '2022-04-01']
+
+    def test_dashboard_matches_plot_views(self):
+        with self.assertNumQueries(13):
+            dashboard = self.client.get(reverse('data_user_dashboard_startdate_enddate', args=self.dates)).json()
+
+        self.assertEqual(list(dashboard), list(UserDashboard.CHARTS))
+        self.assertEqual(dashboard['budget_vs_spent']['data']['datasets'][1]['data'], [800.0, 0.0, 400.0, 0.0, 30.0])
+        self.assertEqual([point['y'] for point in dashboard['cumulative_total']['data']['datasets'][0]['data']],
+                         [1200.0, 1170.0])
+
+        REPORT_CACHE.clear()
+        for name, url_name in (('monthly_budget', 'plot_user_monthlybudget_startdate_enddate'),
+                               ('actual_by_budget_group', 'plot_user_expenses_by_mb_startdate_enddate'),
+                               ('top_category', 'plot_top5_by_category_dt_to_dt'),
+                               ('cumulative_expense', 'plot_expenses_cumulative_dt_to_dt'),
+                               ('cumulative_income', 'plot_incomes_cumulative_dt_to_dt')):
+            self.assertEqual(self.client.get(reverse(url_name, args=self.dates)).json(), dashboard[name])
+
+        # The plot views cached their payloads, which the dashboard reuses
+        url = reverse('data_user_dashboard_startdate_enddate', args=self.dates)
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'charts': 'top_category,monthly_budget'})
+        self.assertEqual(response.json(), {'top_category': dashboard['top_category'],
+                                           'monthly_budget': dashboard['monthly_budget']})
+
+        self.assertEqual(self.client.get(url, {'charts': 'top_category,pie'}).status_code, 400)
+
+    def test_cache_key_ignores_stray_parameters(self):
+        url = reverse('plot_expenses_cumulative_dt_to_dt', args=self.dates)
+        payload = self.client.get(url).json()
+        # Unrelated and equivalent parameters are served from the same cached payload
+        for params in ({'_': '1650000000'}, {'max_points': 'abc'}, {'max_points': 500, 'format': 'points'}):
+            self.assertEqual(self.client.get(url, params).json(), payload)
+        self.assertEqual(REPORT_CACHE.info()['hits'], 3)
+        self.client.get(url, {'max_points': 10 ** 9})
+        self.client.get(url, {'max_points': 5000})
+        self.assertEqual(REPORT_CACHE.info()['hits'], 4)
+
+        top_url = reverse('plot_top5_by_category_dt_to_dt', args=self.dates)
+        self.client.get(top_url)
+        self.client.get(top_url, {'max_points': 50, 'format': 'columnar'})
+        self.assertEqual(REPORT_CACHE.info()['hits'], 5)
+
+    def test_cumulative_series(self):
+        checking = CheckingAccount.objects.get(name='Test_Checking')
+        Withdrawal.objects.create(account=checking, date=date(2022, 3, 12), description='Food', amount=20.0,
+                                  budget_group=BUDGET_GROUP_MANDATORY)
+        Deposit.objects.create(account=checking, date=date(2022, 3, 15), description='Gift', amount=100.0)
+
+        with self.assertNumQueries(1):
+            days, totals = self.user.return_cumulative_series(date(2022, 3, 1), date(2022, 4, 1))
+        self.assertEqual(days, [date(2022, 3, 1), date(2022, 3, 12), date(2022, 3, 15)])
+        self.assertEqual(totals, [1200.0, 1150.0, 1250.0])
+
+        self.assertEqual(self.user.return_cumulative_series(date(2022, 3, 1), date(2022, 4, 1), 'expense'),
+                         ([date(2022, 3, 1), date(2022, 3, 12)], [800.0, 850.0]))
+        self.assertEqual(self.user.return_cumulative_expenses(date(2022, 3, 2), date(2022, 4, 1), BUDGET_GROUP_DISC),
+                         {date(2022, 3, 12): 30.0})
+        self.assertEqual(self.user.return_cumulative_incomes(date(2022, 3, 1), date(2022, 3, 15)),
+                         {date(2022, 3, 1): 2000.0})
+
+    def test_spending_breakdown(self):
+        checking = CheckingAccount.objects.get(name='Test_Checking')
+        Withdrawal.objects.create(account=checking, date=date(2022, 3, 2), description='Movies', amount=20.0,
+                                  category='Fun', location='Cinema', budget_group=BUDGET_GROUP_DISC)
+        Withdrawal.objects.create(account=checking, date=date(2022, 3, 3), description='Groceries', amount=60.0,
+                                  category='Food', location='Market', budget_group=BUDGET_GROUP_MANDATORY)
+
+        with self.assertNumQueries(1):
+            breakdown = self.user.return_spending_breakdown(date(2022, 3, 1), date(2022, 4, 1), num_of_entries=2)
+        self.assertEqual(breakdown['category'].top, [{'category': 'Housing', 'sum': 800.0},
+                                                     {'category': 'Food', 'sum': 60.0}])
+        self.assertEqual(breakdown['category'].other, 50.0)
+        self.assertEqual(breakdown['description'].top, [{'description': 'Rent', 'sum': 800.0},
+                                                        {'description': 'Groceries', 'sum': 60.0}])
+        self.assertEqual(breakdown['description'].other, 50.0)
+        self.assertEqual(breakdown['location'].top, [{'location': '', 'sum': 830.0},
+                                                     {'location': 'Market', 'sum': 60.0}])
+        self.assertEqual(breakdown['location'].other, 20.0)
+
+        self.assertEqual(list(self.user.return_top_category('March', 2022, 1)), [{'category': 'Housing', 'sum': 800.0}])
+
+        # The top category, description and location plots of a month share the breakdown's query
+        args = [self.user.pk, 'March', 2022]
+        with self.assertNumQueries(4):
+            category = self.client.get(reverse('plot_top5_by_category', args=args)).json()
+        with self.assertNumQueries(3):
+            location = self.client.get(reverse('plot_top5_by_location', args=args)).json()
+        self.assertEqual(category['data']['labels'], ['Housing', 'Food', 'Fun'])
+        self.assertEqual(location['data']['datasets'][0]['data'], [830.0, 60.0, 20.0])
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+# Python Library Imports
+from django.core.management import call_command
+from django.test import TestCase
+
+# Other Imports
+from finances.models import User, CheckingAccount, DebtAccount, Deposit, Withdrawal, Statutory, Transfer, \
+    UserMonthlyRollup, BUDGET_GROUP_MANDATORY, BUDGET_GROUP_DGR, BUDGET_GROUP_DISC
+from datetime import date
+from io import StringIO
+
+
+class UserMonthlyRollupTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(name='TestUser', date_of_birth=date(1980, 1, 1))
+        self.checking = CheckingAccount.objects.create(user=self.user, name='Test_Checking', starting_balance=100.0,
+                                                       opening_date=date(2022, 1, 1))
+        self.debt = DebtAccount.objects.create(user=self.user, name='Test_Debt', starting_balance=500.0,
+                                               opening_date=date(2022, 1, 1))
+        Deposit.objects.create(account=self.checking, date=date(2022, 3, 1), description='Pay', amount=2000.0)
+        self.rent = Withdrawal.objects.create(account=self.checking, date=date(2022, 3, 5), description='Rent',
+                                              amount=800.0, budget_group=BUDGET_GROUP_MANDATORY)
+        Withdrawal.objects.create(account=self.checking, date=date(2022, 4, 12), description='Movies', amount=30.0,
+                                  budget_group=BUDGET_GROUP_DISC)
+        Statutory.objects.create(user=self.user, date=date(2022, 3, 1), description='Taxes', amount=400.0)
+        # Not a checking account, so not rolled up
+        Deposit.objects.create(account=self.debt, date=date(2022, 3, 10), description='Payment', amount=100.0)
+
+    def assertRollupsMatchLedger(self):
+        fields = ('month',) + UserMonthlyRollup.TOTAL_FIELDS
+        # Months whose entries were all removed keep a rollup of zeros
+        stored = [row for row in UserMonthlyRollup.objects.filter(user=self.user).order_by('month').values_list(*fields)
+                  if any(row[1:])]
+        ledger = [tuple(getattr(rollup, field) for field in fields)
+                  for rollup in UserMonthlyRollup.return_ledger_rows([self.user.pk])]
+        self.assertEqual(stored, ledger)
+
+    def test_incremental_updates(self):
+        march = UserMonthlyRollup.objects.get(user=self.user, month=date(2022, 3, 1))
+        self.assertEqual((march.income, march.statutory, march.mandatory), (2000.0, 400.0, 800.0))
+        self.assertRollupsMatchLedger()
+
+        # Moving an entry to another month and budget group
+        self.rent.date = date(2022, 5, 5)
+        self.rent.budget_group = BUDGET_GROUP_DGR
+        self.rent.save()
+        self.assertRollupsMatchLedger()
+
+        Transfer.objects.create(account_from=self.checking, account_to=self.debt, date=date(2022, 4, 20),
+                                budget_group=BUDGET_GROUP_DGR, description='Payment', amount=150.0)
+        april = UserMonthlyRollup.objects.get(user=self.user, month=date(2022, 4, 1))
+        self.assertEqual((april.transfers_out, april.transfers_in, april.debts_goals_retirement), (150.0, 0.0, 150.0))
+        self.assertRollupsMatchLedger()
+
+        self.rent.delete()
+        Statutory.objects.get(description='Taxes').delete()
+        self.assertRollupsMatchLedger()
+
+    def test_month_year_totals(self):
+        self.assertEqual(self.user.return_tot_expenses_by_budget_month_year('March', 2022),
+                         (800.0, 0.0, 0.0, 0.0, 400.0))
+        self.assertEqual(self.user.return_takehome_pay_month_year('March', 2022), 1600.0)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.user.return_statutory_month_year('March', 2022), 400.0)
+
+    def test_backfill(self):
+        UserMonthlyRollup.objects.all().delete()
+
+        # Without rollups, the totals come from the ledger
+        self.assertEqual(self.user.return_takehome_pay_month_year('March', 2022), 1600.0)
+
+        out = StringIO()
+        call_command('backfill_monthly_rollups', stdout=out)
+        self.assertIn('Rebuilt 2 monthly rollups', out.getvalue())
+        self.assertRollupsMatchLedger()
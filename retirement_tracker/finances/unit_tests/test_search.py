@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+# Python Library Imports
+from unittest.mock import patch
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+# Other Imports
+from finances.models import User, CheckingAccount, Withdrawal, BUDGET_GROUP_MANDATORY, BUDGET_GROUP_DISC
+from finances.search import TransactionSearch, install_search_indexes
+from finances.views import ExpenseLookupForUserView
+from datetime import date
+
+
+class TransactionSearchTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(name='TestUser', date_of_birth=date(1980, 1, 1))
+        self.checking = CheckingAccount.objects.create(user=self.user, name='Test_Checking', starting_balance=100.0,
+                                                       opening_date=date(2022, 1, 1))
+        for day in range(1, 29):
+            Withdrawal.objects.create(account=self.checking, date=date(2022, 3, day), description=f'Groceries {day}',
+                                      location='Market', category='Food', amount=10.0,
+                                      budget_group=BUDGET_GROUP_MANDATORY)
+        self.movies = Withdrawal.objects.create(account=self.checking, date=date(2022, 3, 5), description='Movies',
+                                                location='Cinema', category='Groceries', amount=25.0,
+                                                budget_group=BUDGET_GROUP_DISC)
+
+    def test_search(self):
+        withdrawals = Withdrawal.objects.filter(account__user=self.user)
+        self.assertEqual(TransactionSearch('groc').filter(withdrawals).count(), 29)
+        self.assertEqual(list(TransactionSearch('cinema movie').filter(withdrawals)), [self.movies])
+        self.assertFalse(TransactionSearch('rent').filter(withdrawals).exists())
+
+        # Matching descriptions rank above matching categories
+        ranked = list(TransactionSearch('groceries').ranked(withdrawals))
+        self.assertEqual(ranked[-1], self.movies)
+        self.assertEqual(ranked[0].date, date(2022, 3, 28))
+
+        # Writes keep the index up to date
+        self.movies.description = 'Concert'
+        self.movies.save()
+        self.assertFalse(TransactionSearch('movies').filter(withdrawals).exists())
+        self.assertEqual(TransactionSearch('concert').filter(withdrawals).get(), self.movies)
+
+    def test_install_before_tables(self):
+        # migrate sends post_migrate before the finances tables exist when the app has no migrations
+        with patch.object(connection.introspection, 'table_names', return_value=[]), \
+                patch('finances.search.sqlite_index_sql') as index_sql:
+            install_search_indexes()
+        index_sql.assert_not_called()
+
+    def test_lookup_view_pages(self):
+        url = reverse('user_expense_lookup', args=[self.user.pk])
+        response = self.client.post(url, {'search': 'groceries'})
+        self.assertEqual(response.context['num_withdrawals'], 29)
+        self.assertEqual(len(response.context['table_data']), 29)
+        self.assertTrue(response.context['chart_data'])
+        self.assertEqual(response.context['table_data'][-1]['withdrawal_id'], self.movies.pk)
+
+        # Without a search, the table is oldest first and its cumulative amounts carry over the pages
+        with patch.object(ExpenseLookupForUserView, 'paginate_by', 10):
+            response = self.client.post(url, {'category': 'Food'})
+            self.assertEqual(response.context['page_query'], 'category=Food')
+            self.assertEqual(response.context['table_data'][0]['date'], date(2022, 3, 1))
+            response = self.client.get(url, {'category': 'Food', 'page': 3})
+        self.assertEqual(response.context['page_obj'].number, 3)
+        self.assertEqual([row['cumulative'] for row in response.context['table_data']],
+                         [210.0, 220.0, 230.0, 240.0, 250.0, 260.0, 270.0, 280.0])
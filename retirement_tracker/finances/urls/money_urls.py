@@ -44,7 +44,7 @@ urlpatterns = [
     # Ex. /finances/user/1/statutory
     path('user/<int:pk>/statutory_entries', views.UserStatutoryAvailable.as_view(), name='user_available_statutory'),
     # Ex. /finances/user/1/transfers
-    path('user/<int:pk>/transfers', views.UserTransfersAvailable.as_view(), name='user_available_statutory'),
+    path('user/<int:pk>/transfers', views.UserTransfersAvailable.as_view(), name='user_available_transfers'),
     # Ex. /finances/user/1/reports
     path('user/<int:pk>/reports', views.UserReportsAvailable.as_view(), name='user_available_reports'),
     # Ex. /finances/user/1/monthly_budgets
@@ -55,6 +55,8 @@ urlpatterns = [
     path('user/<int:pk>/<int:year>', views.UserReportYearView.as_view(), name='user_year'),
     # Ex. /finances/usr/1/January/2022
     path('user/<int:pk>/<str:month>/<int:year>/', views.UserReportMonthYearView.as_view(), name='user_month_year'),
+    # Ex. /finances/user/1/export.csv?start=2022-01-01&end=2023-01-01&budget_group=Mandatory
+    path('user/<int:pk>/export.<str:fmt>', views.UserLedgerExportView.as_view(), name='user_export_ledger'),
     # Ex. /finances/user/1/CustomReport
     path('user/<int:pk>/CustomReport', views.UserCustomReportView.as_view(), name='user_report_custom'),
     # Ex. /finances/user/1/January/2022/view_monthly_budget
@@ -62,6 +64,8 @@ urlpatterns = [
          name='user_monthly_budget'),
     # Ex. /finances/user/1/lookup_expenses
     path('user/<int:pk>/lookup_expenses', views.ExpenseLookupForUserView.as_view(), name='user_expense_lookup'),
+    # Ex. /finances/user/1/autocomplete/category?q=gro&kind=withdrawal
+    path('user/<int:pk>/autocomplete/<str:field>', views.UserAutocompleteView.as_view(), name='user_autocomplete'),
     # Ex. /finances/user/1/add_work_income
     path('user/<int:pk>/add_work_income', views.UserWorkRelatedIncomeView.as_view(), name='user_work_income'),
     # Ex. /finances/user/1/add_work_income_file
@@ -58,9 +58,14 @@ urlpatterns = [
     # Ex. /finances/data/account/1/projected_retirementbalance
     path('data/account/<int:pk>/projected_retirementbalance', pv.RetirementAccountBalanceByTime.as_view(),
          name='data_projected_retirementaccount_balance'),
+    # Ex. /finances/data/user/1/retirement_monte_carlo?paths=10000&years=50&seed=1
+    path('data/user/<int:pk>/retirement_monte_carlo', pv.RetirementMonteCarloByTime.as_view(),
+         name='data_user_retirement_monte_carlo'),
     # Ex. /finances/data/account/1/projected_debtbalance
     path('data/account/<int:pk>/projected_debtbalance', pv.DebtAccountBalanceByTime.as_view(),
          name='data_projected_debtaccount_balance'),
+    # Ex. /finances/data/report_job/1
+    path('data/report_job/<int:pk>', pv.ReportJobStatus.as_view(), name='data_report_job_status'),
     # Ex. /finances/data/user/1/report/all
     path('data/user/<int:pk>/report/<str:all>', pv.UserReportDataCustom.as_view(), name='data_user_all'),
     # Ex. /finances/data/user/1/report/2022/2023
@@ -72,6 +77,9 @@ urlpatterns = [
     # Ex. /finances/data/user/1/report/2022/March/2023/March
     path('data/user/<int:pk>/report/<int:start_year>/<str:start_month>/<int:end_year>/<str:end_month>',
          pv.UserReportDataCustom.as_view(), name='data_user_yearmonth_to_yearmonth'),
+    # Ex. /finances/data/user/1/dashboard/2022-01-01/2023-01-01?charts=top_category,top_location
+    path('data/user/<int:pk>/dashboard/<yyyy:start_date>/<yyyy:end_date>',
+         pv.UserDashboardData.as_view(), name='data_user_dashboard_startdate_enddate'),
     # Ex. /finances/plot/user/1/monthly_budget/2022-01-01/2023-01-31
     path('plot/user/<int:pk>/monthly_budget/<yyyy:start_date>/<yyyy:end_date>',
          pv.MonthlyBudgetCustomPlotView.as_view(), name='plot_user_monthlybudget_startdate_enddate'),
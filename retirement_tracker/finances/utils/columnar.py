@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+# Python Library Imports
+import numpy as np
+
+# Other Imports
+from django.core.serializers.json import DjangoJSONEncoder
+
+# Defined Functions:
+# XYSeries - x/y arrays of a Chart.js time series dataset
+# PointsJSONEncoder - Encodes the XYSeries as lists of {'x', 'y'} points (the Chart.js format)
+# ColumnarJSONEncoder - Encodes the XYSeries as {'x': [...], 'y': [...]} columns
+# CHART_FORMATS - ?format value to encoder
+
+# Decimals of the y values in the columnar format (unless the series sets its own)
+COLUMNAR_DECIMALS = 2
+
+
+class XYSeries:
+    """ The x (milliseconds after epoch) and y arrays of a Chart.js time series dataset, used as the dataset's data.
+
+    The arrays are kept as NumPy arrays until the payload is encoded, so the columnar format never builds the points.
+    decimals rounds the y values in both formats.
+    """
+    __slots__ = ('x', 'y', 'decimals')
+
+    def __init__(self, x, y, decimals=None):
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.decimals = decimals
+
+
+class PointsJSONEncoder(DjangoJSONEncoder):
+    """ Encodes the XYSeries as lists of {'x': x, 'y': y} points, which Chart.js reads directly."""
+
+    def default(self, o):
+        if isinstance(o, XYSeries):
+            y = o.y if o.decimals is None else np.round(o.y, o.decimals)
+            return [{'x': x, 'y': y} for x, y in zip(o.x.tolist(), y.tolist())]
+        return super().default(o)
+
+
+class ColumnarJSONEncoder(DjangoJSONEncoder):
+    """ Encodes the XYSeries as {'x': [...], 'y': [...]} with integer timestamps and rounded values, without spaces.
+
+    The templates convert them back to points with columnarToChartData (finances/chartjs_columnar.html).
+    """
+    item_separator = ','
+    key_separator = ':'
+
+    def default(self, o):
+        if isinstance(o, XYSeries):
+            decimals = COLUMNAR_DECIMALS if o.decimals is None else o.decimals
+            return {'x': np.rint(o.x).astype(np.int64).tolist(), 'y': np.round(o.y, decimals).tolist()}
+        return super().default(o)
+
+
+CHART_FORMATS = {
+    'points': PointsJSONEncoder,
+    'columnar': ColumnarJSONEncoder,
+}
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+
+# Python Library Imports
+import numpy as np
+
+# Other Imports
+
+# Defined Functions:
+# lttb_indices - Returns the indices of the points kept by Largest-Triangle-Three-Buckets downsampling
+# lttb - Downsamples a series to at most max_points points with Largest-Triangle-Three-Buckets
+
+
+def lttb_indices(x, y, max_points):
+    """ Returns the indices of the points kept by Largest-Triangle-Three-Buckets (LTTB) downsampling.
+
+    The first and last points are always kept. The points in between are split into max_points - 2 buckets and the
+    point of each bucket forming the largest triangle with the previously kept point and the average of the next
+    bucket is kept, which preserves the peaks and the shape of the curve. x must be sorted.
+
+    All the indices are returned when the series has no more than max_points points (or max_points is below 3).
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    num_points = len(x)
+    if max_points >= num_points or max_points < 3:
+        return np.arange(num_points)
+
+    # Bucket edges of the inner points: bucket i is [edges[i], edges[i + 1])
+    num_buckets = max_points - 2
+    edges = (np.arange(num_buckets + 1) * (num_points - 2) / num_buckets).astype(int) + 1
+    edges[-1] = num_points - 1
+
+    # Averages of the buckets (the next bucket of the last bucket is the last point)
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x[1:-1], edges[:-1] - 1) / counts
+    avg_y = np.add.reduceat(y[1:-1], edges[:-1] - 1) / counts
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    indices = np.empty(max_points, dtype=int)
+    indices[0] = 0
+    indices[-1] = num_points - 1
+    kept = 0
+    for bucket in range(num_buckets):
+        start, end = edges[bucket], edges[bucket + 1]
+        # Twice the area of the triangles (kept point, bucket point, next average)
+        areas = np.abs((x[kept] - next_x[bucket]) * (y[start:end] - y[kept]) -
+                       (x[kept] - x[start:end]) * (next_y[bucket] - y[kept]))
+        kept = start + int(np.argmax(areas))
+        indices[bucket + 1] = kept
+
+    return indices
+
+
+def lttb(x, y, max_points):
+    """ Returns the (x, y) arrays of the series downsampled to at most max_points points (see lttb_indices)."""
+    x = np.asarray(x)
+    y = np.asarray(y)
+    indices = lttb_indices(x, y, max_points)
+    return x[indices], y[indices]
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+
+# Python Library Imports
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+import os
+
+# Other Imports
+import numpy as np
+
+# Defined Functions:
+# simulate_retirement - Runs the Monte Carlo simulation and summarizes it into percentile bands
+# simulate_chunk - Simulates one chunk of paths (run in the worker processes)
+
+# Paths per chunk. Each chunk has its own seed, so the results do not depend on the number of processes.
+CHUNK_SIZE = 10000
+# Runs with more chunks than this are split across a process pool
+MAX_SERIAL_CHUNKS = 1
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+class MonteCarloResult(NamedTuple):
+    """ Summary of a Monte Carlo retirement simulation.
+
+    months - Month offsets (from the start of the simulation) of the samples
+    bands - Percentile to balance at each sample
+    success_probability - Fraction of the paths that were not depleted by the end of the simulation
+    seed - Seed to reproduce the run
+    """
+    months: np.ndarray
+    bands: dict
+    success_probability: float
+    seed: int
+
+
+def simulate_chunk(seed_sequence, num_paths, initial_balance, monthly_contribution, retirement_month,
+                   withdrawal_pct, mean_monthly_return, monthly_volatility, num_months, sample_every):
+    """ Simulates num_paths balance paths and returns the balances sampled every sample_every months.
+
+    Each month adds the contribution (before retirement_month) and grows by a normally distributed return.
+    From retirement_month on, each path withdraws withdrawal_pct / 12 percent of its balance at retirement every
+    month. Depleted paths stay at zero.
+    """
+    rng = np.random.default_rng(seed_sequence)
+    growth = 1 + rng.normal(mean_monthly_return, monthly_volatility, size=(num_months, num_paths))
+
+    sample_months = np.arange(0, num_months + 1, sample_every)
+    samples = np.empty((len(sample_months), num_paths))
+    samples[0] = initial_balance
+
+    balances = np.full(num_paths, float(initial_balance))
+    withdrawals = np.zeros(num_paths)
+    for month in range(num_months):
+        if month < retirement_month:
+            balances += monthly_contribution
+        else:
+            if month == retirement_month:
+                withdrawals = balances * withdrawal_pct / 100 / 12
+            balances -= withdrawals
+        balances *= growth[month]
+        np.maximum(balances, 0.0, out=balances)
+
+        if (month + 1) % sample_every == 0:
+            samples[(month + 1) // sample_every] = balances
+
+    return samples
+
+
+def simulate_retirement(initial_balance, monthly_contribution, retirement_month, withdrawal_pct,
+                        mean_monthly_return, monthly_volatility, num_years=50, num_paths=10000, seed=None,
+                        sample_every=12, max_workers=None):
+    """ Runs a Monte Carlo simulation of a retirement balance and returns a MonteCarloResult.
+
+    initial_balance - Balance at the start of the simulation
+    monthly_contribution - Amount added every month before retirement
+    retirement_month - Month offset (from the start of the simulation) of the retirement date
+    withdrawal_pct - Yearly withdrawal as a percent of the balance at retirement
+    mean_monthly_return, monthly_volatility - Mean and standard deviation of the monthly returns (fractions)
+    seed - Seed for reproducible runs. A random seed is used (and returned in the result) if None.
+    """
+    num_months = int(num_years * 12)
+    seed_sequence = np.random.SeedSequence(seed)
+    chunk_sizes = [CHUNK_SIZE] * (num_paths // CHUNK_SIZE)
+    if num_paths % CHUNK_SIZE:
+        chunk_sizes.append(num_paths % CHUNK_SIZE)
+
+    args = (initial_balance, monthly_contribution, retirement_month, withdrawal_pct, mean_monthly_return,
+            monthly_volatility, num_months, sample_every)
+    chunk_seeds = seed_sequence.spawn(len(chunk_sizes))
+
+    if len(chunk_sizes) <= MAX_SERIAL_CHUNKS:
+        chunks = [simulate_chunk(chunk_seed, chunk_size, *args)
+                  for chunk_seed, chunk_size in zip(chunk_seeds, chunk_sizes)]
+    else:
+        max_workers = max_workers or min(len(chunk_sizes), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(simulate_chunk, chunk_seed, chunk_size, *args)
+                       for chunk_seed, chunk_size in zip(chunk_seeds, chunk_sizes)]
+            chunks = [future.result() for future in futures]
+
+    samples = np.concatenate(chunks, axis=1)
+    bands = dict(zip(PERCENTILES, np.percentile(samples, PERCENTILES, axis=1)))
+    success_probability = float(np.mean(samples[-1] > 0.0))
+
+    return MonteCarloResult(np.arange(0, num_months + 1, sample_every), bands, success_probability,
+                            seed_sequence.entropy)
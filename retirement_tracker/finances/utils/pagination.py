@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+# Python Library Imports
+from datetime import date
+
+# Other Imports
+from django.db.models import Q
+
+# Defined Functions:
+# KeysetPaginator - Paginates a queryset newest first on (date, pk) cursors instead of page numbers
+# KeysetPage - One page of a KeysetPaginator
+
+
+class KeysetPage:
+    """ One page of a KeysetPaginator.
+
+    next_cursor/previous_cursor are the cursors of the adjacent pages (None at either end). Iterating the page
+    iterates its objects, so the list templates can use it like a Django Page.
+    """
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """ Paginates a queryset newest first on (date, pk), filtering on the cursor instead of using an offset.
+
+    Each page takes a single query on the date index whatever its position, and no count query is made.
+    Cursors are '<date>_<pk>' strings (e.g., '2022-03-05_41').
+    """
+
+    def __init__(self, queryset, per_page, date_field='date'):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.date_field = date_field
+
+    def cursor(self, obj):
+        return f'{getattr(obj, self.date_field).isoformat()}_{obj.pk}'
+
+    @staticmethod
+    def parse_cursor(cursor):
+        """ Returns the (date, pk) of a cursor. Raises ValueError for malformed cursors."""
+        cursor_date, cursor_pk = cursor.split('_')
+        return date.fromisoformat(cursor_date), int(cursor_pk)
+
+    def page(self, after=None, before=None):
+        """ Returns the page of the objects older than the after cursor, the page of the objects newer than the before
+        cursor, or the first page without either.
+        """
+        if before is not None:
+            cursor_date, cursor_pk = self.parse_cursor(before)
+            queryset = self.queryset.filter(Q(**{f'{self.date_field}__gt': cursor_date}) |
+                                            Q(**{self.date_field: cursor_date, 'pk__gt': cursor_pk}))
+            objects = list(queryset.order_by(self.date_field, 'pk')[:self.per_page + 1])
+            has_previous = len(objects) > self.per_page
+            objects = objects[:self.per_page][::-1]
+            return KeysetPage(objects, self.cursor(objects[-1]) if objects else None,
+                              self.cursor(objects[0]) if has_previous else None)
+
+        queryset = self.queryset
+        if after is not None:
+            cursor_date, cursor_pk = self.parse_cursor(after)
+            queryset = queryset.filter(Q(**{f'{self.date_field}__lt': cursor_date}) |
+                                       Q(**{self.date_field: cursor_date, 'pk__lt': cursor_pk}))
+        objects = list(queryset.order_by(f'-{self.date_field}', '-pk')[:self.per_page + 1])
+        has_next = len(objects) > self.per_page
+        objects = objects[:self.per_page]
+        return KeysetPage(objects, self.cursor(objects[-1]) if has_next else None,
+                          self.cursor(objects[0]) if after is not None and objects else None)
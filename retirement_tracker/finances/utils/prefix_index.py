@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+
+# Python Library Imports
+from bisect import bisect_left
+import heapq
+
+# Other Imports
+
+# Defined Functions:
+# PrefixIndex - Case-insensitive prefix completion of a set of values ranked by frequency
+
+
+class PrefixIndex:
+    """ Case-insensitive prefix completion of a set of values, the most frequent values first.
+
+    The casefolded values are kept in a sorted list, so the values starting with a prefix are the contiguous run found
+    with two binary searches, and the top k of the run are picked with a heap. The values with the empty prefix are
+    pre-ranked. Building takes O(n log n) and a completion O(log n + m log k) for m matching values.
+    """
+
+    def __init__(self, counts):
+        """ counts - {value: frequency}"""
+        entries = sorted((value.casefold(), -count, value) for value, count in counts.items() if value)
+        self.keys = [key for key, _, _ in entries]
+        self.values = [value for _, _, value in entries]
+        self.counts = [-negative_count for _, negative_count, _ in entries]
+        by_frequency = sorted(range(len(entries)), key=lambda index: (-self.counts[index], index))
+        self.ranked = [self.values[index] for index in by_frequency]
+
+    def __len__(self):
+        return len(self.values)
+
+    def complete(self, prefix, k=10):
+        """ Returns up to k values starting with prefix (ignoring case), the most frequent first."""
+        prefix = prefix.casefold()
+        if not prefix:
+            return self.ranked[:k]
+
+        start = bisect_left(self.keys, prefix)
+        # Every key starting with prefix sorts before prefix followed by the largest code point
+        end = bisect_left(self.keys, prefix + '\U0010ffff', start)
+        top = heapq.nsmallest(k, range(start, end), key=lambda index: (-self.counts[index], index))
+        return [self.values[index] for index in top]
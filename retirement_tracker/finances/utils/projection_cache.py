@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+
+# Python Library Imports
+from collections import OrderedDict
+from threading import Lock
+
+# Other Imports
+
+# Defined Functions:
+# LRUCache - Bounded least recently used cache with hit/miss counters
+
+
+class LRUCache:
+    """ Bounded least recently used cache with hit/miss counters.
+
+    Used for the fitted projection functions of the accounts (see Account.return_value_vs_time_function), which
+    are keyed on the account's ledger_version so entries for old ledgers are never hit again and age out.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get_or_compute(self, key, compute):
+        """ Returns the cached value for key, calling compute() and caching its result on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        value = compute()
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+        return value
+
+    def info(self):
+        """ Returns the hit/miss counters and the current/maximum size."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries), 'maxsize': self.maxsize}
+
+    def clear(self):
+        """ Removes all entries and resets the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+# Python Library Imports
+from threading import Lock
+
+# Other Imports
+from django.conf import settings
+from django.core.cache import caches
+
+# Defined Functions:
+# ReportCache - Versioned cache of the user reports on top of a Django cache backend
+
+
+class ReportCache:
+    """ Cache of the user reports and report plot payloads on top of a Django cache backend.
+
+    Entries are keyed by (user, report kind, range, report version). Writes to the user's ledger bump the report
+    version (see User.bump_report_version), so stale entries are never hit again and are evicted by the backend,
+    which bounds the number of entries (MAX_ENTRIES of the local memory and file backends).
+
+    The hit/miss counters are per process.
+    """
+
+    def __init__(self, alias='reports'):
+        self.alias = alias
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+
+    @property
+    def cache(self):
+        return caches[self.alias if self.alias in settings.CACHES else 'default']
+
+    @staticmethod
+    def make_key(user_pk, kind, range_key, version):
+        range_key = range_key if isinstance(range_key, (list, tuple)) else [range_key]
+        return 'report:{}:{}:{}:{}'.format(user_pk, kind, ':'.join(str(part) for part in range_key), version)
+
+    def get(self, key):
+        """ Returns the cached value for key, or None on a miss."""
+        value = self.cache.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self.cache.set(key, value)
+
+    def get_or_compute(self, key, compute):
+        """ Returns the cached value for key, calling compute() and caching its result on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def info(self):
+        """ Returns the hit/miss counters and the hit rate of this process."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses,
+                    'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                    'backend': type(self.cache).__name__}
+
+    def clear(self):
+        """ Removes all entries of the backend and resets the counters."""
+        self.cache.clear()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
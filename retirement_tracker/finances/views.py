@@ -8,10 +8,14 @@ import json
 # Other Imports
 from django.db.models.functions import TruncDay
 from django.db.models import Sum
+from django.db import models
+from django.http import StreamingHttpResponse, HttpResponseBadRequest, Http404, JsonResponse
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
 from django.shortcuts import render, HttpResponseRedirect, HttpResponse
 # from django.core.exceptions import BadRequest
 from django.forms import formset_factory
-from django.views.generic import DetailView, TemplateView, FormView, ListView
+from django.views.generic import DetailView, TemplateView, FormView, ListView, View
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
 from django.shortcuts import get_object_or_404
 from django.urls import reverse_lazy
@@ -21,14 +25,25 @@ from datetime import datetime
 
 from finances.models import User, Account, CheckingAccount, DebtAccount, TradingAccount, \
     RetirementAccount, MonthlyBudget, BUDGET_GROUP_MANDATORY, BUDGET_GROUP_MORTGAGE, BUDGET_GROUP_DGR, \
-    BUDGET_GROUP_DISC, Transfer, Deposit, Withdrawal, Statutory, dt_to_milliseconds_after_epoch
+    BUDGET_GROUP_DISC, BUDGET_GROUP_CHOICES, Transfer, Deposit, Withdrawal, Statutory, TransactionFacet, \
+    dt_to_milliseconds_after_epoch
 from finances.forms import MonthlyBudgetForUserForm, UserWorkIncomeExpenseForm, \
     UserExpenseLookupForm, MonthlyBudgetForUserMonthYearForm, AddDebtAccountForm, \
     AddCheckingAccountForm, AddRetirementAccountForm, AddTradingAccountForm, TransferBetweenAccountsForm, \
     WithdrawalForUserForm, DepositForUserForm, StatutoryForUserForm, \
     DateLocationForm, WithdrawalByLocationFormset, UserReportSelectForm, UserFileUploadForm
-from finances.plot_views import get_line_chart_config
+from finances.plot_views import get_line_chart_config, return_max_points
+from finances.reports import ReportService
+from finances.exports import ledger_rows, EXPORT_FORMATS
+from finances.search import TransactionSearch
 from finances.utils import chartjs_utils as cjs
+from finances.utils.pagination import KeysetPaginator
+from finances.utils.downsampling import lttb
+
+
+# Completions returned by UserAutocompleteView unless the request sets k (and the most it returns)
+AUTOCOMPLETE_DEFAULT_RESULTS = 10
+AUTOCOMPLETE_MAX_RESULTS = 50
 
 
 # Create your views here.
@@ -92,10 +107,7 @@ class UserCustomReportView(FormView):
         context['user_pk'] = user.pk
         form_data = form.cleaned_data
         start_date = form_data['start_date']
-        tzinfo = timezone.get_current_timezone()
-        start_dt = datetime.combine(start_date, datetime.min.time(), tzinfo=tzinfo)
         end_date = form_data['end_date']
-        end_dt = datetime.combine(end_date, datetime.min.time(), tzinfo=tzinfo)
         context['create_plots'] = True
 
         context['start_date'] = start_date.strftime('%Y-%m-%d')
@@ -110,42 +122,8 @@ class UserCustomReportView(FormView):
 
         context['report_message'] = f'{start_date} to {end_date}'
 
-        stat_tot, mand_tot, mort_tot, dgr_tot, disc_tot = user.return_monthly_budgets(start_date, end_date)
-        context['stat_total'] = stat_tot
-        context['mand_total'] = mand_tot
-        context['mort_total'] = mort_tot
-        context['dgr_total'] = dgr_tot
-        context['disc_total'] = disc_tot
-
-        mand_exp, mort_exp, dgr_exp, disc_exp, stat_exp = user.return_tot_expenses_by_budget_startdt_to_enddt(
-            start_date, end_date)
-        context['stat_exp'] = stat_exp
-        context['mand_exp'] = mand_exp
-        context['mort_exp'] = mort_exp
-        context['dgr_exp'] = dgr_exp
-        context['disc_exp'] = disc_exp
-
-        context['leftover_statutory'] = round(stat_tot - stat_exp, 2)
-        context['leftover_mand'] = round(mand_tot - mand_exp, 2)
-        context['leftover_mort'] = round(mort_tot - mort_exp, 2)
-        context['leftover_dgr'] = round(dgr_tot - dgr_exp, 2)
-        context['leftover_disc'] = round(disc_tot - disc_exp, 2)
-
-        account_balances = user.return_report_info_acct_balance(start_dt, end_dt)
-
-        starting_balance = account_balances['tot_checking_start'] + \
-                           account_balances['tot_retirement_start'] + \
-                           account_balances['tot_trading_start'] - \
-                           account_balances['tot_debt_start']
-
-        end_balance = starting_balance + account_balances['net_diff']
-
-        context['start_balance'] = round(starting_balance, 2)
-        context['end_balance'] = round(end_balance, 2)
-
-        user_income_tot = user.return_income_total(start_date, end_date)
-        context['income'] = user_income_tot
-        context['takehome_pay'] = round(user_income_tot - stat_exp, 2)
+        report = ReportService.get(user, start_date, end_date)
+        context.update(report.as_context())
 
         return self.render_to_response(context)
 
@@ -164,54 +142,28 @@ class UserReportAllView(DetailView):
         context['report_message'] = 'All'
 
         start_date, end_date = self.object.get_earliest_latest_dates()
-
-        tzinfo = timezone.get_current_timezone()
-        start_dt = datetime.combine(start_date, datetime.min.time(), tzinfo=tzinfo)
-        end_dt = datetime.combine(end_date, datetime.min.time(), tzinfo=tzinfo)
-
-        context['create_plots'] = True
-
         context['start_date'] = start_date.strftime('%Y-%m-%d')
         context['end_date'] = end_date.strftime('%Y-%m-%d')
 
-        stat_tot, mand_tot, mort_tot, dgr_tot, disc_tot = self.object.return_monthly_budgets(start_date, end_date)
-        context['stat_total'] = stat_tot
-        context['mand_total'] = mand_tot
-        context['mort_total'] = mort_tot
-        context['dgr_total'] = dgr_tot
-        context['disc_total'] = disc_tot
-
-        mand_exp, mort_exp, dgr_exp, disc_exp, stat_exp = self.object.return_tot_expenses_by_budget_startdt_to_enddt(
-            start_date, end_date)
-        context['stat_exp'] = stat_exp
-        context['mand_exp'] = mand_exp
-        context['mort_exp'] = mort_exp
-        context['dgr_exp'] = dgr_exp
-        context['disc_exp'] = disc_exp
-
-        context['leftover_statutory'] = round(stat_tot - stat_exp, 2)
-        context['leftover_mand'] = round(mand_tot - mand_exp, 2)
-        context['leftover_mort'] = round(mort_tot - mort_exp, 2)
-        context['leftover_dgr'] = round(dgr_tot - dgr_exp, 2)
-        context['leftover_disc'] = round(disc_tot - disc_exp, 2)
-
-        account_balances = self.object.return_report_info_acct_balance(start_dt, end_dt)
-
-        starting_balance = account_balances['tot_checking_start'] + \
-                           account_balances['tot_retirement_start'] + \
-                           account_balances['tot_trading_start'] - \
-                           account_balances['tot_debt_start']
-
-        end_balance = starting_balance + account_balances['net_diff']
-
-        context['start_balance'] = round(starting_balance, 2)
-        context['end_balance'] = round(end_balance, 2)
-
-        user_income_tot = self.object.return_income_total(start_date, end_date)
-        context['income'] = user_income_tot
-        context['takehome_pay'] = round(user_income_tot - stat_exp, 2)
+        if ReportService.is_long_range(start_date, end_date) or self.request.GET.get('async'):
+            # Built by a background job, so the page polls the job until it is done
+            self.report_job = ReportService.submit(self.object, start_date, end_date + relativedelta(days=+1))
+            context['report_job'] = self.report_job
+            if not self.report_job.is_done:
+                return context
+            context.update(self.report_job.result)
+        else:
+            context.update(ReportService.get_all(self.object).as_context())
+
+        context['create_plots'] = True
         return context
 
+    def get_template_names(self):
+        report_job = getattr(self, 'report_job', None)
+        if report_job is not None and not report_job.is_done:
+            return ['finances/user_report_pending.html']
+        return super().get_template_names()
+
 
 class UserReportYearView(DetailView):
     model = User
@@ -228,52 +180,15 @@ class UserReportYearView(DetailView):
         context['report_message'] = f'{self.year}'
 
         start_date = datetime.strptime(f'January 1, {self.year}', '%B %d, %Y')
-        tzinfo = timezone.get_current_timezone()
-        start_dt = datetime.combine(start_date, datetime.min.time(), tzinfo=tzinfo)
         end_date = start_date + relativedelta(years=+1, seconds=-1)
-        end_dt = datetime.combine(end_date, datetime.min.time(), tzinfo=tzinfo)
 
         context['create_plots'] = True
 
         context['start_date'] = start_date.strftime('%Y-%m-%d')
         context['end_date'] = end_date.strftime('%Y-%m-%d')
 
-        stat_tot, mand_tot, mort_tot, dgr_tot, disc_tot = self.object.return_monthly_budgets(start_date, end_date)
-        context['stat_total'] = stat_tot
-        context['mand_total'] = mand_tot
-        context['mort_total'] = mort_tot
-        context['dgr_total'] = dgr_tot
-        context['disc_total'] = disc_tot
-
-        mand_exp, mort_exp, dgr_exp, disc_exp, stat_exp = self.object.return_tot_expenses_by_budget_startdt_to_enddt(
-            start_date, end_date)
-        context['stat_exp'] = stat_exp
-        context['mand_exp'] = mand_exp
-        context['mort_exp'] = mort_exp
-        context['dgr_exp'] = dgr_exp
-        context['disc_exp'] = disc_exp
-
-        context['leftover_statutory'] = round(stat_tot - stat_exp, 2)
-        context['leftover_mand'] = round(mand_tot - mand_exp, 2)
-        context['leftover_mort'] = round(mort_tot - mort_exp, 2)
-        context['leftover_dgr'] = round(dgr_tot - dgr_exp, 2)
-        context['leftover_disc'] = round(disc_tot - disc_exp, 2)
-
-        account_balances = self.object.return_report_info_acct_balance(start_dt, end_dt)
-
-        starting_balance = account_balances['tot_checking_start'] + \
-                           account_balances['tot_retirement_start'] + \
-                           account_balances['tot_trading_start'] - \
-                           account_balances['tot_debt_start']
-
-        end_balance = starting_balance + account_balances['net_diff']
-
-        context['start_balance'] = round(starting_balance, 2)
-        context['end_balance'] = round(end_balance, 2)
-
-        user_income_tot = self.object.return_income_total(start_date, end_date)
-        context['income'] = user_income_tot
-        context['takehome_pay'] = round(user_income_tot - stat_exp, 2)
+        report = ReportService.get(self.object, start_date, start_date + relativedelta(years=+1))
+        context.update(report.as_context())
 
         return context
 
@@ -294,55 +209,71 @@ class UserReportMonthYearView(DetailView):
         context['report_message'] = f'{self.month}, {self.year}'
 
         start_date = datetime.strptime(f'{self.month} 1, {self.year}', '%B %d, %Y')
-        tzinfo = timezone.get_current_timezone()
-        start_dt = datetime.combine(start_date, datetime.min.time(), tzinfo=tzinfo)
         end_date = start_date + relativedelta(months=+1, seconds=-1)
-        end_dt = datetime.combine(end_date, datetime.min.time(), tzinfo=tzinfo)
 
         context['create_plots'] = True
 
         context['start_date'] = start_date.strftime('%Y-%m-%d')
         context['end_date'] = end_date.strftime('%Y-%m-%d')
 
-        stat_tot, mand_tot, mort_tot, dgr_tot, disc_tot = self.object.return_monthly_budgets(start_date.date(),
-                                                                                             end_date.date())
-        context['stat_total'] = stat_tot
-        context['mand_total'] = mand_tot
-        context['mort_total'] = mort_tot
-        context['dgr_total'] = dgr_tot
-        context['disc_total'] = disc_tot
+        report = ReportService.get(self.object, start_date, start_date + relativedelta(months=+1))
+        context.update(report.as_context())
 
-        mand_exp, mort_exp, dgr_exp, disc_exp, stat_exp = self.object.return_tot_expenses_by_budget_startdt_to_enddt(
-            start_date, end_date)
-        context['stat_exp'] = stat_exp
-        context['mand_exp'] = mand_exp
-        context['mort_exp'] = mort_exp
-        context['dgr_exp'] = dgr_exp
-        context['disc_exp'] = disc_exp
+        return context
 
-        context['leftover_statutory'] = round(stat_tot - stat_exp, 2)
-        context['leftover_mand'] = round(mand_tot - mand_exp, 2)
-        context['leftover_mort'] = round(mort_tot - mort_exp, 2)
-        context['leftover_dgr'] = round(dgr_tot - dgr_exp, 2)
-        context['leftover_disc'] = round(disc_tot - disc_exp, 2)
 
-        account_balances = self.object.return_report_info_acct_balance(start_dt, end_dt)
+class UserLedgerExportView(View):
+    """ Streams the user's deposits, withdrawals, statutory entries and transfers as CSV or NDJSON.
 
-        starting_balance = account_balances['tot_checking_start'] + \
-                           account_balances['tot_retirement_start'] + \
-                           account_balances['tot_trading_start'] - \
-                           account_balances['tot_debt_start']
+    Optional GET parameters: start (inclusive) and end (exclusive) dates (YYYY-MM-DD), account (pk) and budget_group.
+    """
 
-        end_balance = starting_balance + account_balances['net_diff']
+    def get(self, request, *args, **kwargs):
+        user = get_object_or_404(User, pk=kwargs['pk'])
+        if kwargs['fmt'] not in EXPORT_FORMATS:
+            raise Http404(f"Unknown export format {kwargs['fmt']}")
+        formatter, content_type = EXPORT_FORMATS[kwargs['fmt']]
 
-        context['start_balance'] = round(starting_balance, 2)
-        context['end_balance'] = round(end_balance, 2)
+        try:
+            start_date = models.DateField().to_python(request.GET.get('start') or None)
+            end_date = models.DateField().to_python(request.GET.get('end') or None)
+            account_id = int(request.GET['account']) if request.GET.get('account') else None
+        except (ValidationError, ValueError) as error:
+            return HttpResponseBadRequest(f'Invalid export filter: {error}')
+        budget_group = request.GET.get('budget_group') or None
+        if budget_group is not None and budget_group not in dict(BUDGET_GROUP_CHOICES):
+            return HttpResponseBadRequest(f'Unknown budget group {budget_group}')
+
+        rows = ledger_rows(user, start_date, end_date, account_id, budget_group)
+        response = StreamingHttpResponse(formatter(rows), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{user.name}_ledger.{kwargs["fmt"]}"'
+        return response
+
+
+class UserAutocompleteView(View):
+    """ Returns the completions of a withdrawal/deposit field (category, description, location or group) of the user
+    as {'results': [...]}, the most used values first.
+
+    GET parameters: q (prefix, case-insensitive), kind (withdrawal, the default, or deposit) and k (number of
+    results, at most AUTOCOMPLETE_MAX_RESULTS). Served from the cached PrefixIndex of the field
+    (see TransactionFacet.return_prefix_index).
+    """
 
-        user_income_tot = self.object.return_income_total(start_date, end_date)
-        context['income'] = user_income_tot
-        context['takehome_pay'] = round(user_income_tot - stat_exp, 2)
+    def get(self, request, *args, **kwargs):
+        if kwargs['field'] not in TransactionFacet.DIMENSIONS:
+            raise Http404(f"Unknown field {kwargs['field']}")
+        kind = request.GET.get('kind', TransactionFacet.KIND_WITHDRAWAL)
+        if kind not in dict(TransactionFacet.KIND_CHOICES):
+            return HttpResponseBadRequest(f'Unknown kind {kind}')
+        try:
+            k = min(int(request.GET.get('k', AUTOCOMPLETE_DEFAULT_RESULTS)), AUTOCOMPLETE_MAX_RESULTS)
+        except ValueError as error:
+            return HttpResponseBadRequest(f'Invalid number of results: {error}')
 
-        return context
+        index = TransactionFacet.return_prefix_index(kwargs['pk'], kind, kwargs['field'])
+        if index is None:
+            raise Http404('User does not exist')
+        return JsonResponse({'results': index.complete(request.GET.get('q', ''), max(k, 0))})
 
 
 class UserTransferView(FormView):
@@ -402,63 +333,74 @@ class UserAccountsAvailable(DetailView):
         return context
 
 
-class UserExpensesAvailable(ListView):
-    model = Withdrawal
-    template_name = 'finances/withdrawal_list.html'
+class KeysetListMixin:
+    """ Keyset pagination (newest first, see KeysetPaginator) for the transaction list views.
+
+    The pages are requested with the after/before cursors of the adjacent pages. With format=json, the page is
+    returned as {'results': [...], 'next': cursor, 'previous': cursor} (json_fields of each object) for infinite
+    scrolling.
+    """
     paginate_by = 50
+    json_fields = ('id', 'date', 'description', 'amount')
 
     def dispatch(self, request, *args, **kwargs):
         self.userpk = kwargs['pk']
         return super().dispatch(request, *args, **kwargs)
 
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size)
+        try:
+            page = paginator.page(after=self.request.GET.get('after'), before=self.request.GET.get('before'))
+        except ValueError:
+            raise Http404('Invalid page cursor')
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def render_to_response(self, context, **response_kwargs):
+        if self.request.GET.get('format') != 'json':
+            return super().render_to_response(context, **response_kwargs)
+
+        page = context['page_obj']
+        results = [{field: getattr(obj, field) for field in self.json_fields} for obj in page]
+        return JsonResponse({'results': results, 'next': page.next_cursor, 'previous': page.previous_cursor})
+
+
+class UserExpensesAvailable(KeysetListMixin, ListView):
+    model = Withdrawal
+    template_name = 'finances/withdrawal_list.html'
+    json_fields = ('id', 'date', 'location', 'description', 'amount', 'budget_group')
+
     def get_queryset(self):
-        userobj = User.objects.get(pk=self.userpk)
-        user_accts = userobj.return_all_accounts()
-        return Withdrawal.objects.filter(account__in=user_accts).order_by('-date')
+        return Withdrawal.objects.filter(account__user_id=self.userpk).select_related('account').only(
+            'date', 'location', 'description', 'amount', 'budget_group', 'account__name')
 
 
-class UserIncomesAvailable(ListView):
+class UserIncomesAvailable(KeysetListMixin, ListView):
     model = Deposit
     template_name = 'finances/deposit_list.html'
     paginate_by = 25
 
-    def dispatch(self, request, *args, **kwargs):
-        self.userpk = kwargs['pk']
-        return super().dispatch(request, *args, **kwargs)
-
     def get_queryset(self):
-        userobj = User.objects.get(pk=self.userpk)
-        user_accounts = userobj.return_all_accounts()
-        return Deposit.objects.filter(account__in=user_accounts).order_by('-date')
+        return Deposit.objects.filter(account__user_id=self.userpk).select_related('account').only(
+            'date', 'location', 'description', 'amount', 'account__name')
 
 
-class UserStatutoryAvailable(ListView):
+class UserStatutoryAvailable(KeysetListMixin, ListView):
     model = Statutory
     template_name = 'finances/statutory_list.html'
     paginate_by = 25
 
-    def dispatch(self, request, *args, **kwargs):
-        self.userpk = kwargs['pk']
-        return super().dispatch(request, *args, **kwargs)
-
     def get_queryset(self):
-        userobj = User.objects.get(pk=self.userpk)
-        return Statutory.objects.filter(user=userobj).order_by('-date')
+        return Statutory.objects.filter(user_id=self.userpk).only('date', 'description', 'amount')
 
 
-class UserTransfersAvailable(ListView):
+class UserTransfersAvailable(KeysetListMixin, ListView):
     model = Transfer
     template_name = 'finances/transfer_list.html'
     paginate_by = 25
 
-    def dispatch(self, request, *args, **kwargs):
-        self.userpk = kwargs['pk']
-        return super().dispatch(request, *args, **kwargs)
-
     def get_queryset(self):
-        userobj = User.objects.get(pk=self.userpk)
-        user_accounts = userobj.return_all_accounts()
-        return Transfer.objects.filter(account_from__in=user_accounts, account_to__in=user_accounts).order_by('-date')
+        return Transfer.objects.filter(account_from__user_id=self.userpk, account_to__user_id=self.userpk).only(
+            'date', 'description', 'amount')
 
 
 class UserReportsAvailable(DetailView):
@@ -530,12 +472,11 @@ class AccountView(DetailView):
         latest_date = self.object.return_latest_date()
         one_year_later = latest_date + relativedelta(years=+1)
         five_years_later = latest_date + relativedelta(years=+5)
-        one_year_balance = self.object.estimate_balance_month_year(one_year_later.strftime('%B'),
-                                                                   int(one_year_later.strftime('%Y')))
-        one_year_balance = round(one_year_balance, 2)
-        five_year_balance = self.object.estimate_balance_month_year(five_years_later.strftime('%B'),
-                                                                    int(five_years_later.strftime('%Y')))
-        five_year_balance = round(five_year_balance, 2)
+        one_year_balance, five_year_balance = self.object.estimate_balances(
+            [datetime(one_year_later.year, one_year_later.month, 1),
+             datetime(five_years_later.year, five_years_later.month, 1)])
+        one_year_balance = round(float(one_year_balance), 2)
+        five_year_balance = round(float(five_year_balance), 2)
         context['one_year_later'] = one_year_later.strftime('%B-%Y')
         context['five_years_later'] = five_years_later.strftime('%B-%Y')
         context['one_year_balance'] = one_year_balance
@@ -568,12 +509,11 @@ class CheckingAccountView(DetailView):
             return context
         one_year_later = latest_date + relativedelta(years=+1)
         five_years_later = latest_date + relativedelta(years=+5)
-        one_year_balance = self.object.estimate_balance_month_year(one_year_later.strftime('%B'),
-                                                                   int(one_year_later.strftime('%Y')))
-        one_year_balance = round(one_year_balance, 2)
-        five_year_balance = self.object.estimate_balance_month_year(five_years_later.strftime('%B'),
-                                                                    int(five_years_later.strftime('%Y')))
-        five_year_balance = round(five_year_balance, 2)
+        one_year_balance, five_year_balance = self.object.estimate_balances(
+            [datetime(one_year_later.year, one_year_later.month, 1),
+             datetime(five_years_later.year, five_years_later.month, 1)])
+        one_year_balance = round(float(one_year_balance), 2)
+        five_year_balance = round(float(five_year_balance), 2)
         context['one_year_later'] = one_year_later.strftime('%B-%Y')
         context['five_years_later'] = five_years_later.strftime('%B-%Y')
         context['one_year_balance'] = one_year_balance
@@ -598,12 +538,11 @@ class RetirementAccountView(DetailView):
         latest_date = self.object.return_latest_date()
         one_year_later = latest_date + relativedelta(years=+1)
         five_years_later = latest_date + relativedelta(years=+5)
-        one_year_balance = self.object.estimate_balance_month_year(one_year_later.strftime('%B'),
-                                                                   int(one_year_later.strftime('%Y')))
-        one_year_balance = round(one_year_balance, 2)
-        five_year_balance = self.object.estimate_balance_month_year(five_years_later.strftime('%B'),
-                                                                    int(five_years_later.strftime('%Y')))
-        five_year_balance = round(five_year_balance, 2)
+        one_year_balance, five_year_balance = self.object.estimate_balances(
+            [datetime(one_year_later.year, one_year_later.month, 1),
+             datetime(five_years_later.year, five_years_later.month, 1)])
+        one_year_balance = round(float(one_year_balance), 2)
+        five_year_balance = round(float(five_year_balance), 2)
         context['one_year_later'] = one_year_later.strftime('%B-%Y')
         context['five_years_later'] = five_years_later.strftime('%B-%Y')
         context['one_year_balance'] = one_year_balance
@@ -628,12 +567,11 @@ class DebtAccountView(DetailView):
         latest_date = self.object.return_latest_date()
         one_year_later = latest_date + relativedelta(years=+1)
         five_years_later = latest_date + relativedelta(years=+5)
-        one_year_balance = self.object.estimate_balance_month_year(one_year_later.strftime('%B'),
-                                                                   int(one_year_later.strftime('%Y')))
-        one_year_balance = round(one_year_balance, 2)
-        five_year_balance = self.object.estimate_balance_month_year(five_years_later.strftime('%B'),
-                                                                    int(five_years_later.strftime('%Y')))
-        five_year_balance = round(five_year_balance, 2)
+        one_year_balance, five_year_balance = self.object.estimate_balances(
+            [datetime(one_year_later.year, one_year_later.month, 1),
+             datetime(five_years_later.year, five_years_later.month, 1)])
+        one_year_balance = round(float(one_year_balance), 2)
+        five_year_balance = round(float(five_year_balance), 2)
         context['one_year_later'] = one_year_later.strftime('%B-%Y')
         context['five_years_later'] = five_years_later.strftime('%B-%Y')
         context['one_year_balance'] = one_year_balance
@@ -777,18 +715,10 @@ class WithdrawalForUserView(FormView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        six_months_prior = timezone.now() + relativedelta(months=-6)
-        user_accounts = self.user.return_all_accounts()
-        expenses_six_mo_prior = Withdrawal.objects.filter(account__in=user_accounts, date__gte=six_months_prior)
-        distinct_cat = list(expenses_six_mo_prior.values_list('category', flat=True).distinct())
-        distinct_desc = list(expenses_six_mo_prior.values_list('description', flat=True).distinct())
-        distinct_where = list(expenses_six_mo_prior.values_list('location', flat=True).distinct())
-        distinct_group = list(expenses_six_mo_prior.values_list('group', flat=True).distinct())
         context['user'] = self.user
-        context['distinct_cat'] = distinct_cat
-        context['distinct_desc'] = distinct_desc
-        context['distinct_where'] = distinct_where
-        context['distinct_group'] = distinct_group
+        # The category, description, location and group inputs complete from UserAutocompleteView
+        context['autocomplete_kind'] = TransactionFacet.KIND_WITHDRAWAL
+        context['autocomplete_fields'] = TransactionFacet.DIMENSIONS
         return context
 
     def form_valid(self, form):
@@ -803,7 +733,7 @@ class WithdrawalForUserView(FormView):
                                                description=post['description'],
                                                amount=post['amount'],
                                                slug_field=post['slug_field'],
-                                               group=['group'],
+                                               group=post['group'],
                                                )
         newexpense.save()
         self.success_url = f'/finances/user/{self.user.pk}/add_withdrawal'
@@ -811,8 +741,12 @@ class WithdrawalForUserView(FormView):
 
 
 class ExpenseLookupForUserView(FormView):
+    """ Looks up the withdrawals of a user by date, budget group, category, description, location and search words
+    (see TransactionSearch), with a chart of their cumulative amount and a paged table.
+    """
     form_class = UserExpenseLookupForm
     template_name = 'finances/expense_lookup_form_for_user.html'
+    paginate_by = 50
 
     def dispatch(self, request, *args, **kwargs):
         pk = kwargs.get('pk')
@@ -824,10 +758,17 @@ class ExpenseLookupForUserView(FormView):
         kwargs['user'] = self.user
         return kwargs
 
+    def get(self, request, *args, **kwargs):
+        # The other pages of the results are requested with the lookup in the query string
+        if 'page' in request.GET:
+            form = self.get_form_class()(request.GET, user=self.user)
+            if form.is_valid():
+                return self.form_valid(form)
+        return super().get(request, *args, **kwargs)
+
     def form_valid(self, form, **kwargs):
-        context = self.get_context_data(**kwargs)
-        user_accts = self.user.return_all_accounts()
-        withdrawals = Withdrawal.objects.filter(account__in=user_accts).order_by('date')
+        context = self.get_context_data(form=form, **kwargs)
+        withdrawals = Withdrawal.objects.filter(account__user=self.user)
         title_txt = ''
         if form.cleaned_data['start_year']:
             title_txt += f'Start date: '
@@ -872,19 +813,37 @@ class ExpenseLookupForUserView(FormView):
             title_txt += f'Location: {form.cleaned_data["where_bought"]} '
             withdrawals = withdrawals.filter(location=form.cleaned_data['where_bought'])
 
+        # The table is ranked by relevance when searching, oldest first otherwise
+        table_withdrawals = withdrawals.order_by('date', 'pk')
+        if form.cleaned_data['search']:
+            title_txt += f'Search: {form.cleaned_data["search"]} '
+            search = TransactionSearch(form.cleaned_data['search'])
+            table_withdrawals = search.ranked(withdrawals)
+            withdrawals = search.filter(withdrawals)
+
         title_txt = title_txt.strip()
 
-        if len(withdrawals) > 2:
+        # The count of the paginator is the only count of the withdrawals
+        table_withdrawals = table_withdrawals.only('date', 'category', 'description', 'amount')
+        page = Paginator(table_withdrawals, self.paginate_by).get_page(self.request.GET.get('page'))
+        num_withdrawals = page.paginator.count
+        context['num_withdrawals'] = num_withdrawals
+
+        if num_withdrawals > 2:
             context['chart_data'] = True
             datasets = list()
             xydata = list()
-            summed_withdrawals = withdrawals.annotate(day=TruncDay('date')).values('day').annotate(cumsum=Sum('amount'))
+            summed_withdrawals = withdrawals.annotate(day=TruncDay('date')).values('day').annotate(
+                cumsum=Sum('amount')).order_by('day')
             total = 0.0
             for withdrawal in summed_withdrawals:
                 total += withdrawal['cumsum']
                 withdrawal_dt = datetime.combine(withdrawal['day'], datetime.min.time())
                 wdate = dt_to_milliseconds_after_epoch(withdrawal_dt)
-                xydata.append({'x': wdate, 'y': total})
+                xydata.append((wdate, total))
+            # Long lookups are downsampled (the table below keeps every withdrawal)
+            wdates, totals = lttb(*zip(*xydata), return_max_points(self.request))
+            xydata = [{'x': wdate, 'y': total} for wdate, total in zip(wdates.tolist(), totals.tolist())]
             datasets.append({
                 'data': xydata,
                 'backgroundColor': cjs.get_color('red', 0.5),
@@ -901,17 +860,24 @@ class ExpenseLookupForUserView(FormView):
             context['chart_data'] = False
 
         context['table_data'] = False
-        if len(withdrawals) > 2:
+        if num_withdrawals:
+            # The cumulative amounts of a page start from the total of the previous pages
             total = 0.0
+            if page.start_index() > 1:
+                total = table_withdrawals[:page.start_index() - 1].aggregate(total=Sum('amount'))['total']
             context['include_table'] = True
+            context['page_obj'] = page
+            page_query = form.data.copy()
+            for name in ('csrfmiddlewaretoken', 'page'):
+                page_query.pop(name, None)
+            context['page_query'] = page_query.urlencode()
             context['table_data'] = list()
-            table_withdrawals = withdrawals.annotate(day=TruncDay('date')).annotate(cumsum=Sum('amount'))
-            for twithdrawal in table_withdrawals:
+            for twithdrawal in page:
                 total += twithdrawal.amount
                 context['table_data'].append(
-                    {'date': twithdrawal.day, 'category': twithdrawal.category,
+                    {'date': twithdrawal.date, 'category': twithdrawal.category,
                      'description': twithdrawal.description, 'withdrawal_id': twithdrawal.id,
-                     'amount': twithdrawal.amount, 'cumulative': round(total,2)})
+                     'amount': twithdrawal.amount, 'cumulative': round(total, 2)})
 
         return self.render_to_response(context)
 
@@ -1243,18 +1209,10 @@ class DepositForUserView(FormView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        six_months_prior = timezone.now() + relativedelta(months=-6)
-        user_accounts = self.user.return_all_accounts()
-        incomes_six_months_prior = Deposit.objects.filter(account__in=user_accounts, date__gte=six_months_prior)
-        distinct_cat = list(incomes_six_months_prior.values_list('category', flat=True).distinct())
-        distinct_desc = list(incomes_six_months_prior.values_list('description', flat=True).distinct())
-        distinct_where = list(incomes_six_months_prior.values_list('location', flat=True).distinct())
-        distinct_group = list(incomes_six_months_prior.values_list('group', flat=True).distinct())
         context['user'] = self.user
-        context['distinct_cat'] = distinct_cat
-        context['distinct_desc'] = distinct_desc
-        context['distinct_where'] = distinct_where
-        context['distinct_group'] = distinct_group
+        # The category, description, location and group inputs complete from UserAutocompleteView
+        context['autocomplete_kind'] = TransactionFacet.KIND_DEPOSIT
+        context['autocomplete_fields'] = TransactionFacet.DIMENSIONS
 
         return context
 
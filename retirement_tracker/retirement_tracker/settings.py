@@ -41,6 +41,8 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    # Full-text and trigram search of the withdrawals (finances.search)
+    'django.contrib.postgres',
 ]
 
 MIDDLEWARE = [
@@ -89,6 +91,34 @@ DATABASES = {
 }
 
 
+# Caches
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# The user reports are cached in memory, or on disk when REPORT_CACHE_DIR is set (shared between the processes).
+
+REPORT_CACHE_DIR = os.environ.get('REPORT_CACHE_DIR', env('REPORT_CACHE_DIR', default=''))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'reports': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache' if REPORT_CACHE_DIR else
+                   'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': REPORT_CACHE_DIR or 'reports',
+        'TIMEOUT': 7 * 24 * 60 * 60,
+        'OPTIONS': {
+            'MAX_ENTRIES': 2000,
+        },
+    },
+}
+
+# Reports spanning more days than this are built by background jobs (finances.reports.ReportService.submit)
+REPORT_ASYNC_MIN_DAYS = 3 * 365
+REPORT_JOB_WORKERS = 2
+# Run the report jobs inside the request instead (e.g., for debugging)
+REPORT_JOBS_ALWAYS_EAGER = False
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 